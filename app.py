@@ -249,7 +249,8 @@ with col4:
             <div class="feature-icon">🎯</div>
             <div class="feature-title">Aide à la Décision</div>
             <div class="feature-desc">
-                Outils de prévention et de sensibilisation.
+                Score de risque par commune (fréquence, surface brûlée,
+                tendance récente, saisonnalité) affiché sur la carte.
                 Identification des pics historiques (2003, 1989, 1979).
                 Support pour les politiques de gestion forestière.
             </div>
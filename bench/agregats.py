@@ -0,0 +1,140 @@
+"""Banc d'essai des agrégations groupées : pandas (référence), Arrow et Polars.
+
+Chaque scénario est le plan (`pyroviz.plans`) d'une requête des pages
+(`agregat`, `cube_communes`) avec ses filtres et son top-N, exécuté par :
+- `pandas` : moteur de référence sans index (masques NumPy puis `groupby`) ;
+- `pandas+index` : idem avec l'index bitmap, comme dans les pages ;
+- `arrow` : `pyroviz.moteur_arrow` (masques `pyarrow.compute` puis `Table.group_by`) ;
+- `polars` : `LazyFrame` Polars, si le paquet est installé.
+
+Les résultats de tous les chemins sont comparés avant la mesure ; le rapport
+donne la médiane de `--repetitions` exécutions par scénario, sur la base réelle
+puis sur des bases synthétiques de `--lignes` lignes (tirage avec remise des
+lignes réelles, mêmes distributions de valeurs).
+
+    python bench/agregats.py                                   # base réelle + 10 M lignes
+    python bench/agregats.py --lignes 1000000 10000000 --repetitions 5 --json agregats.json
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from pandas.testing import assert_frame_equal
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from pyroviz import moteur_arrow  # noqa: E402
+from pyroviz.donnees import charger_incendies  # noqa: E402
+from pyroviz.index import indexer  # noqa: E402
+from pyroviz.plans import lazy_de, plan_requete  # noqa: E402
+
+try:
+    import polars  # noqa: F401
+    AVEC_POLARS = True
+except ImportError:  # pragma: no cover
+    AVEC_POLARS = False
+
+# (libellé, requête, paramètres)
+SCENARIOS = [
+    ("Total région", "agregat", {}),
+    ("Par année", "agregat", {"par": ["annee"]}),
+    ("Par mois, un département", "agregat", {"par": ["mois"], "departements": ["13"]}),
+    ("Par département, 2000-2022", "agregat", {"par": ["departement"], "annees": [2000, 2022]}),
+    ("Année × mois, deux départements", "agregat", {"par": ["annee", "mois"], "departements": ["83", "06"]}),
+    ("Par commune, 2000-2022", "agregat", {"par": ["code_insee"], "annees": [2000, 2022]}),
+    ("Cube communes, 2000-2022", "cube_communes", {"annees": [2000, 2022]}),
+    ("Top 10 années (surface)", "agregat", {"par": ["annee"], "tri": "surface_brulee", "n": 10}),
+    ("Top 10 communes, 2000-2022", "agregat",
+     {"par": ["code_insee"], "tri": "nb_incendies", "n": 10, "annees": [2000, 2022]}),
+]
+
+
+# =====================
+# DONNÉES
+# =====================
+def synthetique(df, lignes, graine=0):
+    """Base de `lignes` lignes tirées avec remise dans `df` (colonnes des agrégations)."""
+    tirage = np.random.default_rng(graine).integers(0, len(df), lignes)
+    return df[moteur_arrow.COLONNES_ARROW].take(tirage).reset_index(drop=True)
+
+
+# =====================
+# MESURE
+# =====================
+def chronometrer(fonction, repetitions):
+    durees = []
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        fonction()
+        durees.append(time.perf_counter() - debut)
+    return 1000 * statistics.median(durees)
+
+
+def mesurer(df, repetitions):
+    """Préparation (index, table Arrow, cadre Polars) puis médianes par scénario et par chemin, en ms."""
+    preparation = {}
+    debut = time.perf_counter()
+    df_index = indexer(df.copy(deep=False))
+    preparation["index"] = round(time.perf_counter() - debut, 3)
+    debut = time.perf_counter()
+    table = moteur_arrow.table_de(df)
+    preparation["table_arrow"] = round(time.perf_counter() - debut, 3)
+    if AVEC_POLARS:
+        debut = time.perf_counter()
+        lazy = lazy_de(df)
+        preparation["cadre_polars"] = round(time.perf_counter() - debut, 3)
+
+    lignes = []
+    for libelle, nom, params in SCENARIOS:
+        plan = plan_requete(nom, **params)
+        chemins = {
+            "pandas": lambda: plan.pandas(df),
+            "pandas+index": lambda: plan.pandas(df_index),
+            "arrow": lambda: plan.arrow(table),
+        }
+        if AVEC_POLARS:
+            chemins["polars"] = lambda: plan.polars(lazy)
+        reference = chemins["pandas"]().reset_index(drop=True)
+        for chemin, fonction in chemins.items():
+            assert_frame_equal(reference, fonction().reset_index(drop=True), rtol=1e-9, obj=f"{chemin} {plan}")
+        durees = {chemin: round(chronometrer(f, repetitions), 2) for chemin, f in chemins.items()}
+        lignes.append({"scenario": libelle, **durees})
+    return {"lignes": len(df), "preparation_s": preparation, "scenarios": lignes}
+
+
+def afficher(resultat):
+    preparation = ", ".join(f"{nom} {duree:.2f} s" for nom, duree in resultat["preparation_s"].items())
+    print(f"\n{resultat['lignes']:,} lignes — préparation : {preparation}")
+    chemins = [c for c in resultat["scenarios"][0] if c != "scenario"]
+    ligne = "{:<32}" + " {:>13}" * len(chemins)
+    print(ligne.format("", *[f"{c} ms" for c in chemins]))
+    for s in resultat["scenarios"]:
+        print(ligne.format(s["scenario"], *[s[c] for c in chemins]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Agrégations des pages : pandas, Arrow et Polars")
+    parser.add_argument("--lignes", type=int, nargs="*", default=[10_000_000],
+                        help="tailles des bases synthétiques (aucune : base réelle seule)")
+    parser.add_argument("--repetitions", type=int, default=7)
+    parser.add_argument("--graine", type=int, default=0)
+    parser.add_argument("--json", type=Path, help="écrit les résultats au format JSON")
+    args = parser.parse_args()
+
+    df = charger_incendies()
+    resultats = [mesurer(df, args.repetitions)]
+    afficher(resultats[-1])
+    for lignes in args.lignes:
+        resultats.append(mesurer(synthetique(df, lignes, args.graine), args.repetitions))
+        afficher(resultats[-1])
+    if args.json:
+        args.json.write_text(json.dumps(resultats, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
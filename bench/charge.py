@@ -0,0 +1,342 @@
+"""Test de charge : sessions simultanées qui changent les filtres des pages.
+
+Chaque session virtuelle est un client websocket du serveur Streamlit qui parle
+le même protocole que le navigateur (`/_stcore/stream`, messages protobuf
+BackMsg / ForwardMsg) : elle ouvre une page, relève les widgets affichés, puis
+modifie un filtre, attend la fin du rerun, « réfléchit » (temps log-normal) et
+recommence. Un widget placé dans un fragment ne relance que ce fragment,
+comme dans le navigateur.
+
+Le rapport donne, par page et par action, les percentiles p50 / p95 / p99 de
+latence de rerun, le débit, la mémoire par session et la RSS du serveur au
+cours du temps.
+
+    python bench/charge.py --sessions 30 --duree 120 --pages Carte Analyses
+    python bench/charge.py --url ws://127.0.0.1:8501 --pid 12345   # serveur déjà lancé
+
+Nécessite le paquet `websockets` (installé avec Streamlit sur la plupart des
+environnements).
+"""
+import argparse
+import asyncio
+import json
+import random
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+try:
+    import websockets
+except ImportError:  # pragma: no cover
+    sys.exit("Le test de charge nécessite le paquet websockets : pip install websockets")
+
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DELAI_RERUN = 60
+FIN_OK = (ForwardMsg.FINISHED_SUCCESSFULLY, ForwardMsg.FINISHED_FRAGMENT_RUN_SUCCESSFULLY)
+
+# Actions réalistes par page : (libellé du widget, poids)
+SCENARIOS = {
+    "Carte": [("Plage d'années", 4), ("Mois", 2), ("Département", 3), ("Rendu de la carte", 1)],
+    "Analyses": [("Département", 4), ("Vue", 4), ("Fenêtre glissante", 2)],
+    "Comparaison": [("Plage d'années", 1)],
+}
+
+
+# =====================
+# MESURE MÉMOIRE
+# =====================
+def rss_mo(pid):
+    """RSS du processus `pid` en Mo (Linux, /proc)."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for ligne in f:
+                if ligne.startswith("VmRSS:"):
+                    return int(ligne.split()[1]) / 1024
+    except OSError:
+        return None
+
+
+# =====================
+# SESSION WEBSOCKET
+# =====================
+class Session:
+    """Une session navigateur simulée sur une page du dashboard."""
+
+    def __init__(self, numero, url, page, rng):
+        self.numero, self.url, self.page, self.rng = numero, url, page, rng
+        self.ws = None
+        # id -> (type, proto du widget, fragment_id) ; id -> WidgetState courant
+        self.widgets, self.etats = {}, {}
+        # fragment -> fragments imbriqués observés lors de ses reruns
+        self.sous_fragments = {}
+        self.erreurs = []
+
+    async def ouvrir(self):
+        self.ws = await websockets.connect(
+            f"{self.url}/_stcore/stream", subprotocols=["streamlit"], max_size=None
+        )
+        return await self.relancer()
+
+    async def fermer(self):
+        if self.ws is not None:
+            await self.ws.close()
+
+    async def relancer(self, fragment_id=""):
+        """Envoie un rerun avec l'état courant des widgets et attend sa fin ; renvoie la durée."""
+        message = BackMsg()
+        message.rerun_script.query_string = ""
+        message.rerun_script.page_name = self.page
+        message.rerun_script.fragment_id = fragment_id
+        message.rerun_script.widget_states.widgets.extend(self.etats.values())
+
+        debut = time.perf_counter()
+        await self.ws.send(message.SerializeToString())
+        vus = {}
+        while True:
+            reponse = ForwardMsg()
+            reponse.ParseFromString(await asyncio.wait_for(self.ws.recv(), DELAI_RERUN))
+            genre = reponse.WhichOneof("type")
+            if genre == "delta" and reponse.delta.WhichOneof("type") == "new_element":
+                element = reponse.delta.new_element
+                nature = element.WhichOneof("type")
+                if nature in ("selectbox", "radio", "slider"):
+                    widget = getattr(element, nature)
+                    vus[widget.id] = (nature, widget, reponse.delta.fragment_id)
+                elif nature == "exception":
+                    self.erreurs.append(element.exception.message)
+            elif genre == "script_finished":
+                if reponse.script_finished == ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                    continue
+                duree = time.perf_counter() - debut
+                break
+
+        # Un rerun complet redéfinit la liste des widgets ; un rerun de fragment
+        # redéfinit ceux du fragment et de ses fragments imbriqués (ex. changement
+        # d'onglet : les widgets de l'ancien onglet disparaissent, comme dans le navigateur)
+        if not fragment_id:
+            self.widgets = vus
+        else:
+            portee = self.sous_fragments.setdefault(fragment_id, {fragment_id})
+            portee.update(frag for _, _, frag in vus.values())
+            self.widgets = {i: w for i, w in self.widgets.items() if w[2] not in portee}
+            self.widgets.update(vus)
+        self.etats = {i: e for i, e in self.etats.items() if i in self.widgets}
+        return duree
+
+    def _choisir_valeur(self, nature, widget):
+        etat = WidgetState(id=widget.id)
+        if nature == "slider":
+            bas, haut = int(widget.min), int(widget.max)
+            if len(widget.default) == 2:
+                debut = self.rng.randint(bas, haut)
+                etat.double_array_value.data[:] = [debut, self.rng.randint(debut, haut)]
+            else:
+                etat.double_array_value.data[:] = [self.rng.randint(bas, haut)]
+        else:
+            etat.string_value = self.rng.choice(list(widget.options))
+        return etat
+
+    async def action(self):
+        """Modifie un widget du scénario de la page ; renvoie (nom, durée du rerun)."""
+        par_libelle = {w.label: (i, nature, w, frag) for i, (nature, w, frag) in self.widgets.items()}
+        possibles = [(libelle, poids) for libelle, poids in SCENARIOS[self.page] if libelle in par_libelle]
+        libelle = self.rng.choices([l for l, _ in possibles], [p for _, p in possibles])[0]
+        identifiant, nature, widget, fragment_id = par_libelle[libelle]
+        self.etats[identifiant] = self._choisir_valeur(nature, widget)
+        return libelle, await self.relancer(fragment_id)
+
+
+async def prechauffer(url, page):
+    """Ouvre une session puis la ferme : remplit les caches du serveur avant la mesure."""
+    session = Session(-1, url, page, random.Random(0))
+    try:
+        await session.ouvrir()
+    finally:
+        await session.fermer()
+
+
+async def simuler(numero, url, page, fin, reflexion, graine, mesures):
+    rng = random.Random(graine)
+    session = Session(numero, url, page, rng)
+
+    def enregistrer(action, duree, erreur=None):
+        mesures.append({"session": numero, "page": page, "action": action,
+                        "t": time.time(), "latence": duree, "erreur": erreur})
+
+    try:
+        enregistrer("ouverture", await session.ouvrir())
+        while time.time() < fin:
+            # Temps de réflexion log-normal de moyenne `reflexion` secondes
+            await asyncio.sleep(rng.lognormvariate(np.log(reflexion) - 0.125, 0.5))
+            if time.time() >= fin:
+                break
+            nb_erreurs = len(session.erreurs)
+            action, duree = await session.action()
+            nouvelles = session.erreurs[nb_erreurs:]
+            enregistrer(action, duree, nouvelles[0] if nouvelles else None)
+    except Exception as e:
+        enregistrer("erreur", 0.0, f"{type(e).__name__}: {e}")
+    finally:
+        await session.fermer()
+
+
+async def echantillonner_rss(pid, fin, releves):
+    while time.time() < fin + 5:
+        releves.append((time.time(), rss_mo(pid)))
+        await asyncio.sleep(1.0)
+
+
+# =====================
+# RAPPORT
+# =====================
+def percentiles(latences):
+    if not latences:
+        return {"n": 0}
+    ms = np.asarray(latences) * 1000
+    return {
+        "n": len(ms),
+        "p50_ms": round(float(np.percentile(ms, 50)), 1),
+        "p95_ms": round(float(np.percentile(ms, 95)), 1),
+        "p99_ms": round(float(np.percentile(ms, 99)), 1),
+        "max_ms": round(float(ms.max()), 1),
+    }
+
+
+def rapport(mesures, releves, rss_initiale, rss_ouvertes, sessions, duree):
+    reruns = [m for m in mesures if m["action"] not in ("ouverture", "erreur")]
+    resultat = {
+        "sessions": sessions,
+        "duree_s": duree,
+        "debit_reruns_par_s": round(len(reruns) / duree, 2),
+        "erreurs": sum(1 for m in mesures if m["erreur"]),
+        "ouverture": percentiles([m["latence"] for m in mesures if m["action"] == "ouverture"]),
+        "reruns": percentiles([m["latence"] for m in reruns]),
+        "par_page": {},
+        "par_action": {},
+    }
+    for page in sorted({m["page"] for m in reruns}):
+        resultat["par_page"][page] = percentiles([m["latence"] for m in reruns if m["page"] == page])
+    for action in sorted({m["action"] for m in reruns}):
+        resultat["par_action"][action] = percentiles([m["latence"] for m in reruns if m["action"] == action])
+
+    rss = [r for _, r in releves if r is not None]
+    t0 = releves[0][0] if releves else 0
+    resultat["rss_mo"] = {
+        "initiale": rss_initiale,
+        "max": round(max(rss), 1) if rss else None,
+        "finale": round(rss[-1], 1) if rss else None,
+        "par_session": round((rss_ouvertes - rss_initiale) / sessions, 1)
+        if rss_initiale is not None and rss_ouvertes is not None else None,
+        "courbe": [(round(t - t0, 1), r) for t, r in releves],
+    }
+    return resultat
+
+
+def afficher(resultat):
+    print(f"\n{resultat['sessions']} sessions, {resultat['duree_s']:.0f} s — "
+          f"{resultat['debit_reruns_par_s']} reruns/s, {resultat['erreurs']} erreur(s)")
+    ligne = "{:<28} {:>6} {:>9} {:>9} {:>9} {:>9}"
+    print(ligne.format("", "n", "p50 ms", "p95 ms", "p99 ms", "max ms"))
+    lignes = [("ouverture", resultat["ouverture"]), ("reruns", resultat["reruns"])]
+    lignes += [(f"  page {p}", v) for p, v in resultat["par_page"].items()]
+    lignes += [(f"  {a}", v) for a, v in resultat["par_action"].items()]
+    for nom, p in lignes:
+        if p["n"]:
+            print(ligne.format(nom, p["n"], p["p50_ms"], p["p95_ms"], p["p99_ms"], p["max_ms"]))
+    rss = resultat["rss_mo"]
+    if rss["max"] is not None:
+        print(f"RSS serveur : {rss['initiale']:.0f} Mo au départ, {rss['max']:.0f} Mo max, "
+              f"{rss['finale']:.0f} Mo à la fin (~{rss['par_session']} Mo par session ouverte)")
+        courbe = [(t, r) for t, r in rss["courbe"] if r is not None]
+        pas = max(1, len(courbe) // 10)
+        print("RSS au cours du temps : " + ", ".join(f"{t:.0f}s={r:.0f}" for t, r in courbe[::pas]))
+
+
+# =====================
+# SERVEUR
+# =====================
+def lancer_serveur():
+    """Démarre `streamlit run app.py` sur un port libre ; renvoie (processus, url)."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    processus = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", str(BASE_DIR / "app.py"),
+         "--server.headless", "true", "--server.port", str(port),
+         "--browser.gatherUsageStats", "false"],
+        cwd=BASE_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    for _ in range(300):
+        with socket.socket() as s:
+            if s.connect_ex(("127.0.0.1", port)) == 0:
+                return processus, f"ws://127.0.0.1:{port}"
+        time.sleep(0.1)
+    processus.terminate()
+    raise RuntimeError("Le serveur Streamlit n'a pas démarré")
+
+
+async def executer(args, url, pid):
+    mesures, releves = [], []
+    rss_initiale = rss_mo(pid) if pid else None
+    fin = time.time() + args.montee + args.duree
+    moniteur = asyncio.create_task(echantillonner_rss(pid, fin, releves)) if pid else None
+
+    taches = []
+    for i in range(args.sessions):
+        page = args.pages[i % len(args.pages)]
+        taches.append(asyncio.create_task(
+            simuler(i, url, page, fin, args.reflexion, args.graine * 1000 + i, mesures)
+        ))
+        await asyncio.sleep(args.montee / max(1, args.sessions))
+    # Toutes les sessions sont ouvertes après la montée en charge
+    await asyncio.sleep(1.0)
+    rss_ouvertes = rss_mo(pid) if pid else None
+
+    await asyncio.gather(*taches)
+    if moniteur:
+        moniteur.cancel()
+    return rapport(mesures, releves, rss_initiale, rss_ouvertes, args.sessions, args.montee + args.duree), mesures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Test de charge du dashboard (sessions simultanées)")
+    parser.add_argument("--url", help="serveur déjà lancé (ws://hote:port) ; par défaut un serveur local est démarré")
+    parser.add_argument("--pid", type=int, help="PID du serveur déjà lancé, pour suivre sa RSS")
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--duree", type=float, default=60, help="durée de la phase de charge (s)")
+    parser.add_argument("--pages", nargs="+", default=["Carte", "Analyses"], choices=sorted(SCENARIOS))
+    parser.add_argument("--reflexion", type=float, default=3.0, help="temps de réflexion moyen (s)")
+    parser.add_argument("--montee", type=float, default=10.0, help="étalement de l'arrivée des sessions (s)")
+    parser.add_argument("--graine", type=int, default=0)
+    parser.add_argument("--json", type=Path, help="écrit le rapport complet (avec mesures brutes)")
+    args = parser.parse_args()
+
+    processus = None
+    url, pid = args.url, args.pid
+    if url is None:
+        processus, url = lancer_serveur()
+        pid = processus.pid
+    try:
+        if processus is not None:
+            asyncio.run(prechauffer(url, args.pages[0]))
+        resultat, mesures = asyncio.run(executer(args, url, pid))
+    finally:
+        if processus is not None:
+            processus.terminate()
+            processus.wait(timeout=30)
+
+    afficher(resultat)
+    if args.json:
+        args.json.write_text(json.dumps({**resultat, "mesures": mesures}, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
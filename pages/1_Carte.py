@@ -1,12 +1,23 @@
 import streamlit as st
-import pandas as pd
 import geopandas as gpd
 import folium
 from folium.plugins import HeatMap
 from streamlit_folium import st_folium
+import streamlit.components.v1 as components
 import os
 from pathlib import Path
 
+from pyroviz.export import FORMATS, filtre_selection, exporter_contenu
+from pyroviz.donnees import CHEMIN_PROPRES
+from pyroviz.communes import centroides_communes
+from pyroviz.risque import COULEURS_CLASSES
+from pyroviz.points import couche_points
+from pyroviz.animation import DUREES, NIVEAUX, PAS, carte_animee, encoder, images
+from pyroviz.requetes import compter
+from pyroviz.client import load_incendie_data, requete
+from pyroviz.cache import cache_disque
+from pyroviz.memoire import afficher_rapport, debut_rerun, mesurer_fragment
+
 # =====================
 # CONFIGURATION PAGE & CSS
 # =====================
@@ -17,6 +28,9 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Allocations du rerun, mesurées si PYROVIZ_MEMOIRE est défini
+mesure_memoire = debut_rerun("Carte")
+
 # CSS moderne - Thème Feu
 st.markdown("""
 <style>
@@ -129,37 +143,6 @@ DATA_DIR = BASE_DIR / "data"
 # =====================
 # CHARGEMENT DONNÉES
 # =====================
-@st.cache_data
-def load_incendie_data():
-    """Charge les données d'incendies depuis le fichier Parquet"""
-    data_path = DATA_DIR / "incendies" / "incendies.parquet"
-    
-    if data_path.exists():
-        df = pd.read_parquet(data_path)
-        # Renommer les colonnes pour simplifier
-        df = df.rename(columns={
-            'Année': 'annee',
-            'Département': 'departement',
-            'Code INSEE': 'code_insee',
-            'Commune': 'commune',
-            'mois': 'mois',
-            'surf_ha': 'surface_brulee',
-            'Surface parcourue (m2)': 'surface_m2'
-        })
-        # Nettoyer les données
-        df = df.dropna(subset=['annee', 'departement'])
-        df['annee'] = df['annee'].astype(int)
-        df['mois'] = df['mois'].fillna(1).astype(int)
-        df['surface_brulee'] = df['surface_brulee'].fillna(0)
-        # Filtrer uniquement PACA (04, 05, 06, 13, 83, 84)
-        deps_paca = ['04', '05', '06', '13', '83', '84']
-        df = df[df['departement'].astype(str).isin(deps_paca)]
-        df['departement'] = df['departement'].astype(str).str.zfill(2)
-        return df
-    else:
-        st.error(f"Fichier non trouvé: {data_path}")
-        return pd.DataFrame()
-
 @st.cache_data
 def load_shp_departements():
     """Charge le shapefile des départements"""
@@ -172,6 +155,11 @@ def load_shp_departements():
         return gdf
     return None
 
+@st.cache_data
+def calcul_centroides(df):
+    """Centroïdes des communes (contours SHP_meteo, à défaut carreaux DFCI)"""
+    return centroides_communes(df, load_shp_departements())
+
 # Charger les données
 df = load_incendie_data()
 gdf_dept = load_shp_departements()
@@ -259,6 +247,29 @@ with st.sidebar:
             ["Tous"] + list(deps_list),
             format_func=lambda x: "🌍 Toute la région PACA" if x == "Tous" else f"📍 {x} - {DEPT_NOMS.get(x, x)}"
         )
+        
+        st.markdown("---")
+        st.markdown("### 💾 Export")
+        
+        format_export = st.selectbox("Format", list(FORMATS), format_func=str.upper)
+        if st.button("📦 Préparer l'export"):
+            centroides = calcul_centroides(df) if format_export == "geojson" else None
+            contenu_export = exporter_contenu(
+                CHEMIN_PROPRES,
+                format_export,
+                filtre_selection(
+                    annees=year_range,
+                    mois=None if month == "Tous" else month,
+                    departements=None if selected_dep == "Tous" else [selected_dep]
+                ),
+                centroides
+            )
+            st.download_button(
+                "⬇️ Télécharger la sélection",
+                data=contenu_export,
+                file_name=f"incendies_carte{FORMATS[format_export][1]}",
+                mime=FORMATS[format_export][0]
+            )
     
     st.markdown("---")
     
@@ -279,16 +290,17 @@ with st.sidebar:
 # =====================
 # FILTRAGE DES DONNÉES
 # =====================
-if len(df) > 0:
-    df_filtered = df[(df["annee"] >= year_range[0]) & (df["annee"] <= year_range[1])]
-    
-    if month != "Tous":
-        df_filtered = df_filtered[df_filtered["mois"] == month]
-    
-    if selected_dep != "Tous":
-        df_filtered = df_filtered[df_filtered["departement"] == selected_dep]
-else:
-    df_filtered = df
+# Paramètres des requêtes d'agrégation ; la sélection n'est jamais matérialisée,
+# seules ses lignes sont comptées
+filtres = {"annees": list(year_range)}
+if month != "Tous":
+    filtres["mois"] = month
+if selected_dep != "Tous":
+    filtres["departements"] = [selected_dep]
+nb_selection = compter(df, **filtres) if len(df) > 0 else 0
+
+# KPIs, carte et bilan sont des fragments indépendants : une interaction avec la
+# carte ne relance que la carte, pas les indicateurs ni le tableau
 
 # =====================
 # PAGE PRINCIPALE
@@ -316,164 +328,337 @@ if len(df) > 0:
 # =====================
 # KPIs
 # =====================
-st.markdown("### 📊 Indicateurs Clés")
+@st.fragment
+@mesurer_fragment
+def section_kpis(filtres, nb_selection):
+    """Indicateurs clés de la sélection"""
+    st.markdown("### 📊 Indicateurs Clés")
 
-if len(df_filtered) > 0:
-    k1, k2, k3, k4 = st.columns(4)
-    
-    total_incendies = len(df_filtered)
-    total_surface = df_filtered["surface_brulee"].sum()
-    moy_surface = df_filtered["surface_brulee"].mean()
-    
-    # Année avec le plus de surface brûlée
-    surface_par_annee = df_filtered.groupby("annee")["surface_brulee"].sum()
-    annee_max = int(surface_par_annee.idxmax()) if len(surface_par_annee) > 0 else "N/A"
-    
-    with k1:
-        st.metric("🔥 Total Incendies", f"{total_incendies:,}")
-    with k2:
-        st.metric("🌲 Surface Brûlée", f"{total_surface:,.0f} ha")
-    with k3:
-        st.metric("📏 Moyenne/Incendie", f"{moy_surface:.2f} ha")
-    with k4:
-        st.metric("⚠️ Année Record", str(annee_max))
+    if nb_selection > 0:
+        k1, k2, k3, k4 = st.columns(4)
+        
+        total = requete("agregat", **filtres).iloc[0]
+        total_incendies = int(total["nb_incendies"])
+        total_surface = total["surface_brulee"]
+        moy_surface = total_surface / total_incendies
+        
+        # Année avec le plus de surface brûlée
+        surface_par_annee = requete("agregat", par=["annee"], **filtres).set_index("annee")["surface_brulee"]
+        annee_max = int(surface_par_annee.idxmax()) if len(surface_par_annee) > 0 else "N/A"
+        
+        with k1:
+            st.metric("🔥 Total Incendies", f"{total_incendies:,}")
+        with k2:
+            st.metric("🌲 Surface Brûlée", f"{total_surface:,.0f} ha")
+        with k3:
+            st.metric("📏 Moyenne/Incendie", f"{moy_surface:.2f} ha")
+        with k4:
+            st.metric("⚠️ Année Record", str(annee_max))
 
-st.markdown("<br>", unsafe_allow_html=True)
+    st.markdown("<br>", unsafe_allow_html=True)
+
+section_kpis(filtres, nb_selection)
 
 # =====================
-# CARTE INTERACTIVE
+# CONSTRUCTION DE LA CARTE
 # =====================
-st.markdown("### 🗺️ Carte Interactive des Incendies")
-
-# Agrégation par département pour la carte
-if len(df_filtered) > 0:
-    dept_stats = df_filtered.groupby("departement").agg({
-        "surface_brulee": ["sum", "count"]
-    }).reset_index()
-    dept_stats.columns = ["departement", "surface_totale", "nb_incendies"]
-    
-    # Ajouter les coordonnées
-    dept_stats["lat"] = dept_stats["departement"].apply(lambda x: DEPT_COORDS.get(x, {}).get("lat", 43.5))
-    dept_stats["lon"] = dept_stats["departement"].apply(lambda x: DEPT_COORDS.get(x, {}).get("lon", 6.0))
-    dept_stats["nom"] = dept_stats["departement"].map(DEPT_NOMS)
-
-# Centre de la carte (PACA)
-if selected_dep != "Tous" and selected_dep in DEPT_COORDS:
-    center = [DEPT_COORDS[selected_dep]["lat"], DEPT_COORDS[selected_dep]["lon"]]
-    zoom = 9
-else:
-    center = [43.8, 6.0]
-    zoom = 7
-
-# Créer la carte avec style sombre
-m = folium.Map(
-    location=center,
-    zoom_start=zoom,
-    tiles="CartoDB dark_matter",
-    control_scale=True
-)
+def construire_carte(filtres, selected_dep, avec_donnees):
+    """Carte folium (départements, tendances, densité, épisodes) pour un état des filtres"""
+    gdf_dept = load_shp_departements()
 
-# Couche GeoJSON des départements si disponible
-if gdf_dept is not None:
-    gdf_map = gdf_dept.copy()
-    # Filtrer par département si nécessaire
-    if selected_dep != "Tous" and "dep" in gdf_map.columns:
-        gdf_map = gdf_map[gdf_map["dep"] == selected_dep]
-    
-    folium.GeoJson(
-        gdf_map,
-        name="🗺️ Départements",
-        style_function=lambda x: {
-            "fillColor": "#ff6b35",
-            "fillOpacity": 0.1,
-            "color": "#ff6b35",
-            "weight": 2,
-        },
-        highlight_function=lambda x: {
-            "fillColor": "#ffcc00",
-            "fillOpacity": 0.3,
-            "color": "#ffffff",
-            "weight": 3,
-        },
-        tooltip=folium.GeoJsonTooltip(
-            fields=["nom", "dep"] if "nom" in gdf_map.columns and "dep" in gdf_map.columns else [],
-            aliases=["📍 Département:", "🔢 Code:"],
-            style="background-color: rgba(0,0,0,0.8); color: white; border-radius: 10px; padding: 10px;"
+    # Agrégation par département pour la carte
+    if avec_donnees:
+        dept_stats = requete("agregat", par=["departement"], **filtres)
+        dept_stats = dept_stats.rename(columns={"surface_brulee": "surface_totale"})
+    
+        # Ajouter les coordonnées
+        dept_stats["lat"] = dept_stats["departement"].apply(lambda x: DEPT_COORDS.get(x, {}).get("lat", 43.5))
+        dept_stats["lon"] = dept_stats["departement"].apply(lambda x: DEPT_COORDS.get(x, {}).get("lon", 6.0))
+        dept_stats["nom"] = dept_stats["departement"].map(DEPT_NOMS)
+
+    # Centre de la carte (PACA)
+    if selected_dep != "Tous" and selected_dep in DEPT_COORDS:
+        center = [DEPT_COORDS[selected_dep]["lat"], DEPT_COORDS[selected_dep]["lon"]]
+        zoom = 9
+    else:
+        center = [43.8, 6.0]
+        zoom = 7
+
+    # Créer la carte avec style sombre
+    m = folium.Map(
+        location=center,
+        zoom_start=zoom,
+        tiles="CartoDB dark_matter",
+        control_scale=True
+    )
+
+    # Couche GeoJSON des départements si disponible
+    if gdf_dept is not None:
+        gdf_map = gdf_dept.copy()
+        # Filtrer par département si nécessaire
+        if selected_dep != "Tous" and "dep" in gdf_map.columns:
+            gdf_map = gdf_map[gdf_map["dep"] == selected_dep]
+    
+        folium.GeoJson(
+            gdf_map,
+            name="🗺️ Départements",
+            style_function=lambda x: {
+                "fillColor": "#ff6b35",
+                "fillOpacity": 0.1,
+                "color": "#ff6b35",
+                "weight": 2,
+            },
+            highlight_function=lambda x: {
+                "fillColor": "#ffcc00",
+                "fillOpacity": 0.3,
+                "color": "#ffffff",
+                "weight": 3,
+            },
+            tooltip=folium.GeoJsonTooltip(
+                fields=["nom", "dep"] if "nom" in gdf_map.columns and "dep" in gdf_map.columns else [],
+                aliases=["📍 Département:", "🔢 Code:"],
+                style="background-color: rgba(0,0,0,0.8); color: white; border-radius: 10px; padding: 10px;"
+            )
+        ).add_to(m)
+
+    # Couche des communes à tendance significative (Mann-Kendall sur la période)
+    if gdf_dept is not None and "insee" in gdf_dept.columns and avec_donnees:
+        tendances_communes = requete("tendances", cle="code_insee", **filtres)
+        significatives = tendances_communes[tendances_communes["nb_tendance"] != "stable"]
+        gdf_tendances = gdf_dept[["insee", "nom", "geometry"]].merge(
+            significatives[["nb_tendance", "nb_pente"]].round(2),
+            left_on="insee",
+            right_index=True
         )
-    ).add_to(m)
-
-# Heatmap basée sur les données agrégées par département
-if len(df_filtered) > 0:
-    # Créer des points pour la heatmap (plusieurs points par département selon l'intensité)
-    heat_points = []
-    for _, row in dept_stats.iterrows():
-        # Ajouter des points proportionnels au nombre d'incendies
-        intensity = min(row["nb_incendies"] / 100, 1.0)  # Normaliser
-        heat_points.append([row["lat"], row["lon"], intensity])
     
-    if len(heat_points) > 0:
-        h1 = folium.FeatureGroup(name="🔥 Densité Incendies", show=True)
-        HeatMap(
-            heat_points,
-            radius=40,
-            blur=25,
-            gradient={0.2: "#ffcc00", 0.4: "#ff9900", 0.6: "#ff6b35", 0.8: "#ff3300", 1: "#cc0000"}
-        ).add_to(h1)
-        h1.add_to(m)
-    
-    # Ajouter des marqueurs pour chaque département
-    for _, row in dept_stats.iterrows():
-        popup_html = f"""
-        <div style="font-family: Arial; min-width: 200px;">
-            <h4 style="color: #ff6b35; margin: 0 0 10px 0;">🔥 {row['nom']}</h4>
-            <p style="margin: 5px 0;"><strong>Code:</strong> {row['departement']}</p>
-            <p style="margin: 5px 0;"><strong>Incendies:</strong> {int(row['nb_incendies']):,}</p>
-            <p style="margin: 5px 0;"><strong>Surface brûlée:</strong> {row['surface_totale']:,.0f} ha</p>
-        </div>
-        """
+        if len(gdf_tendances) > 0:
+            couleurs_tendance = {"hausse": "#cc0000", "baisse": "#66ccff"}
+            folium.GeoJson(
+                gdf_tendances,
+                name="📈 Tendances communales",
+                show=False,
+                style_function=lambda x: {
+                    "fillColor": couleurs_tendance[x["properties"]["nb_tendance"]],
+                    "fillOpacity": 0.5,
+                    "color": couleurs_tendance[x["properties"]["nb_tendance"]],
+                    "weight": 1,
+                },
+                tooltip=folium.GeoJsonTooltip(
+                    fields=["nom", "nb_tendance", "nb_pente"],
+                    aliases=["📍 Commune:", "📈 Tendance:", "🔥 Incendies/an (Sen):"],
+                    style="background-color: rgba(0,0,0,0.8); color: white; border-radius: 10px; padding: 10px;"
+                )
+            ).add_to(m)
+
+    # Score de risque communal (pyroviz.risque) : précalculé sur tout l'historique, hors filtres
+    if gdf_dept is not None and "insee" in gdf_dept.columns and avec_donnees:
+        risque = requete("risque_communes")
+        gdf_risque = gdf_dept[["insee", "nom", "geometry"]].merge(
+            risque[["score", "classe", "frequence", "part_surface", "tendance"]].round(2),
+            left_on="insee",
+            right_index=True
+        ).fillna({"part_surface": 0.0})
+
+        if len(gdf_risque) > 0:
+            folium.GeoJson(
+                gdf_risque,
+                name="⚠️ Risque communal",
+                show=False,
+                style_function=lambda x: {
+                    "fillColor": COULEURS_CLASSES.get(x["properties"]["classe"], "#b0a090"),
+                    "fillOpacity": 0.6,
+                    "color": "#1a1a1a",
+                    "weight": 0.5,
+                },
+                tooltip=folium.GeoJsonTooltip(
+                    fields=["nom", "score", "classe", "frequence", "part_surface", "tendance"],
+                    aliases=["📍 Commune:", "⚠️ Score (0-100):", "🎯 Classe:", "🔥 Incendies/an:",
+                             "🌲 Surface brûlée/an (% commune):", "📈 Tendance récente (z):"],
+                    style="background-color: rgba(0,0,0,0.8); color: white; border-radius: 10px; padding: 10px;"
+                )
+            ).add_to(m)
+
+    # Heatmap basée sur les données agrégées par département
+    if avec_donnees:
+        # Créer des points pour la heatmap (plusieurs points par département selon l'intensité)
+        heat_points = []
+        for _, row in dept_stats.iterrows():
+            # Ajouter des points proportionnels au nombre d'incendies
+            intensity = min(row["nb_incendies"] / 100, 1.0)  # Normaliser
+            heat_points.append([row["lat"], row["lon"], intensity])
+    
+        if len(heat_points) > 0:
+            h1 = folium.FeatureGroup(name="🔥 Densité Incendies", show=True)
+            HeatMap(
+                heat_points,
+                radius=40,
+                blur=25,
+                gradient={0.2: "#ffcc00", 0.4: "#ff9900", 0.6: "#ff6b35", 0.8: "#ff3300", 1: "#cc0000"}
+            ).add_to(h1)
+            h1.add_to(m)
+    
+        # Ajouter des marqueurs pour chaque département
+        for _, row in dept_stats.iterrows():
+            popup_html = f"""
+            <div style="font-family: Arial; min-width: 200px;">
+                <h4 style="color: #ff6b35; margin: 0 0 10px 0;">🔥 {row['nom']}</h4>
+                <p style="margin: 5px 0;"><strong>Code:</strong> {row['departement']}</p>
+                <p style="margin: 5px 0;"><strong>Incendies:</strong> {int(row['nb_incendies']):,}</p>
+                <p style="margin: 5px 0;"><strong>Surface brûlée:</strong> {row['surface_totale']:,.0f} ha</p>
+            </div>
+            """
         
-        folium.CircleMarker(
-            location=[row["lat"], row["lon"]],
-            radius=max(8, min(30, row["nb_incendies"] / 500)),
-            popup=folium.Popup(popup_html, max_width=300),
-            color="#ff6b35",
-            fill=True,
-            fill_color="#ff6b35",
-            fill_opacity=0.7,
-            weight=2
-        ).add_to(m)
+            folium.CircleMarker(
+                location=[row["lat"], row["lon"]],
+                radius=max(8, min(30, row["nb_incendies"] / 500)),
+                popup=folium.Popup(popup_html, max_width=300),
+                color="#ff6b35",
+                fill=True,
+                fill_color="#ff6b35",
+                fill_opacity=0.7,
+                weight=2
+            ).add_to(m)
+
+    # Épisodes majeurs : feux simultanés regroupés sur des carreaux DFCI voisins
+    if avec_donnees:
+        episodes = requete("episodes", **filtres)
+        top_episodes = episodes[episodes["lat"].notna()].head(20)
+    
+        if len(top_episodes) > 0:
+            h2 = folium.FeatureGroup(name="🔥 Épisodes majeurs", show=False)
+            for _, row in top_episodes.iterrows():
+                popup_html = f"""
+                <div style="font-family: Arial; min-width: 200px;">
+                    <h4 style="color: #ff6b35; margin: 0 0 10px 0;">🔥 Épisode du {row['debut']:%d/%m/%Y}</h4>
+                    <p style="margin: 5px 0;"><strong>Commune principale:</strong> {row['commune']}</p>
+                    <p style="margin: 5px 0;"><strong>Feux:</strong> {int(row['nb_incendies'])} sur {int(row['nb_communes'])} commune(s)</p>
+                    <p style="margin: 5px 0;"><strong>Surface brûlée:</strong> {row['surface_brulee']:,.0f} ha</p>
+                </div>
+                """
+            
+                folium.CircleMarker(
+                    location=[row["lat"], row["lon"]],
+                    radius=max(6, min(30, row["surface_brulee"] ** 0.5 / 4)),
+                    popup=folium.Popup(popup_html, max_width=300),
+                    color="#ffcc00",
+                    fill=True,
+                    fill_color="#cc0000",
+                    fill_opacity=0.6,
+                    weight=2
+                ).add_to(h2)
+            h2.add_to(m)
 
-# Contrôle des couches
-folium.LayerControl(collapsed=False).add_to(m)
+    # Feux individuels : tableaux compacts regroupés par le navigateur, fenêtres construites au clic
+    if avec_donnees:
+        couche_points(requete("points_feux", **filtres)).add_to(m)
 
-# Afficher la carte
-st.markdown('<div class="map-container">', unsafe_allow_html=True)
-st_folium(m, width="100%", height=600)
-st.markdown('</div>', unsafe_allow_html=True)
+    # Contrôle des couches
+    folium.LayerControl(collapsed=False).add_to(m)
+
+    return m
+
+@st.cache_data(max_entries=64)
+def rendu_carte_html(filtres, selected_dep, avec_donnees):
+    """Page Leaflet autonome de la carte, mise en cache (mémoire et disque) par état des filtres"""
+    return cache_disque().memoiser(
+        "carte_html",
+        [filtres, selected_dep, avec_donnees],
+        lambda: construire_carte(filtres, selected_dep, avec_donnees).get_root().render(),
+        code=[__file__],
+    )
+
+@st.cache_data(max_entries=16)
+def rendu_animation_html(filtres, selected_dep, niveau, pas, periode):
+    """Carte animée : toutes les images calculées d'un bloc, codées par écarts et jouées
+    dans le navigateur ; renvoie le HTML et la taille des données transmises"""
+    def calcul():
+        cube = requete("cube_animation", niveau=niveau, **filtres)
+        encodage = encoder(*images(cube, pas, periode))
+        if selected_dep != "Tous" and selected_dep in DEPT_COORDS:
+            centre, zoom = [DEPT_COORDS[selected_dep]["lat"], DEPT_COORDS[selected_dep]["lon"]], 9
+        else:
+            centre, zoom = [43.8, 6.0], 7
+        html = carte_animee(encodage, centre, zoom, DUREES[pas]).get_root().render()
+        return html, encodage["octets"], encodage["octets_dense"]
+    return cache_disque().memoiser(
+        "animation_html", [filtres, selected_dep, niveau, pas, periode], calcul, code=[__file__]
+    )
 
 # =====================
-# TABLEAU RÉCAPITULATIF PAR DÉPARTEMENT
+# CARTE INTERACTIVE
 # =====================
-st.markdown("### 📋 Bilan par Département")
-
-if len(df_filtered) > 0:
-    recap = df_filtered.groupby("departement").agg({
-        "surface_brulee": "sum"
-    }).reset_index()
-    recap["nb_incendies"] = df_filtered.groupby("departement").size().values
-    recap["nom_departement"] = recap["departement"].map(DEPT_NOMS)
-    
-    recap = recap[["departement", "nom_departement", "nb_incendies", "surface_brulee"]]
-    recap.columns = ["Code", "Département", "Nombre d'Incendies", "Surface Brûlée (ha)"]
-    recap = recap.sort_values("Surface Brûlée (ha)", ascending=False)
-    recap["Surface Brûlée (ha)"] = recap["Surface Brûlée (ha)"].round(2)
-    
-    st.dataframe(
-        recap,
-        width="stretch",
-        hide_index=True
+@st.fragment
+@mesurer_fragment
+def section_carte(filtres, selected_dep, nb_selection):
+    """Carte ; le choix du rendu et les interactions st_folium ne relancent que ce bloc"""
+    st.markdown("### 🗺️ Carte Interactive des Incendies")
+
+    rendu_carte = st.radio(
+        "Rendu de la carte",
+        ["Statique", "Interactive", "Animation"],
+        horizontal=True,
+        help="Statique : la carte est générée une fois par jeu de filtres et se déplace "
+             "sans aller-retour serveur. Interactive : la carte renvoie son état à la page "
+             "(chaque interaction relance ce bloc). Animation : tout l'historique joué "
+             "dans le navigateur, sans tenir compte de la plage d'années (ni du mois, "
+             "en lecture mois par mois)."
     )
 
+    # Afficher la carte : en mode statique, le HTML Leaflet est servi depuis le cache
+    # et le déplacement / zoom se fait dans le navigateur, sans relancer la page
+    st.markdown('<div class="map-container">', unsafe_allow_html=True)
+    if rendu_carte == "Statique":
+        components.html(rendu_carte_html(filtres, selected_dep, nb_selection > 0), height=600)
+    elif rendu_carte == "Animation" and len(df) > 0:
+        col1, col2 = st.columns(2)
+        with col1:
+            pas = st.radio("Pas de temps", list(PAS), format_func=PAS.get, horizontal=True)
+        with col2:
+            niveau = st.radio("Couche de densité", list(NIVEAUX), format_func=NIVEAUX.get, horizontal=True)
+        # Toute la période : la lecture remplace le déplacement de la plage d'années ;
+        # mois par mois, le filtre de mois laisserait 11 images vides sur 12
+        ignores = {"annees", "mois"} if pas == "mois" else {"annees"}
+        filtres_animation = {k: v for k, v in filtres.items() if k not in ignores}
+        html, octets, octets_dense = rendu_animation_html(
+            filtres_animation, selected_dep, niveau, pas, (int(df["annee"].min()), int(df["annee"].max()))
+        )
+        components.html(html, height=600)
+        st.caption(
+            f"Images codées par écarts successifs : {octets / 1024:,.0f} Ko transmis "
+            f"(contre {octets_dense / 1024:,.0f} Ko en matrice dense), lecture sans rechargement de la page."
+        )
+    else:
+        st_folium(construire_carte(filtres, selected_dep, nb_selection > 0), width="100%", height=600)
+    st.markdown('</div>', unsafe_allow_html=True)
+
+section_carte(filtres, selected_dep, nb_selection)
+
+# =====================
+# TABLEAU RÉCAPITULATIF PAR DÉPARTEMENT
+# =====================
+@st.fragment
+@mesurer_fragment
+def section_bilan(filtres, nb_selection):
+    """Bilan par département"""
+    st.markdown("### 📋 Bilan par Département")
+
+    if nb_selection > 0:
+        recap = requete("agregat", par=["departement"], **filtres)
+        recap["nom_departement"] = recap["departement"].map(DEPT_NOMS)
+        
+        recap = recap[["departement", "nom_departement", "nb_incendies", "surface_brulee"]]
+        recap.columns = ["Code", "Département", "Nombre d'Incendies", "Surface Brûlée (ha)"]
+        recap = recap.sort_values("Surface Brûlée (ha)", ascending=False)
+        recap["Surface Brûlée (ha)"] = recap["Surface Brûlée (ha)"].round(2)
+        
+        st.dataframe(
+            recap,
+            width="stretch",
+            hide_index=True
+        )
+
+section_bilan(filtres, nb_selection)
+
 # =====================
 # FOOTER
 # =====================
@@ -494,3 +679,9 @@ st.markdown("""
         </p>
     </div>
 """, unsafe_allow_html=True)
+
+# =====================
+# MÉMOIRE DU RERUN (PYROVIZ_MEMOIRE=1)
+# =====================
+if mesure_memoire is not None:
+    afficher_rapport(mesure_memoire.fin())
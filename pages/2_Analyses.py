@@ -6,6 +6,21 @@ import plotly.graph_objects as go
 import os
 from pathlib import Path
 
+from pyroviz.export import FORMATS, filtre_selection, exporter_contenu
+from pyroviz.donnees import CHEMIN_PROPRES
+from pyroviz.communes import centroides_communes
+from pyroviz.series import FENETRES, pires_fenetres
+from pyroviz.rendu import trace_serie
+from pyroviz.episodes import FENETRE_JOURS
+from pyroviz.distribution import (
+    BORNES, sommer, densite, ccdf, ajuster_loi_puissance, ajuster_lognormale,
+    ccdf_loi_puissance, ccdf_lognormale
+)
+from pyroviz.meteo import VARIABLES
+from pyroviz.requetes import compter
+from pyroviz.client import load_incendie_data, requete
+from pyroviz.memoire import afficher_rapport, debut_rerun, mesurer_fragment
+
 # =====================
 # CONFIGURATION PAGE
 # =====================
@@ -16,6 +31,9 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Allocations du rerun, mesurées si PYROVIZ_MEMOIRE est défini
+mesure_memoire = debut_rerun("Analyses")
+
 # CSS moderne - Thème Feu
 st.markdown("""
 <style>
@@ -84,29 +102,14 @@ DATA_DIR = BASE_DIR / "data"
 # CHARGEMENT DONNÉES
 # =====================
 @st.cache_data
-def load_incendie_data():
-    data_path = DATA_DIR / "incendies" / "incendies.parquet"
-    
-    if data_path.exists():
-        df = pd.read_parquet(data_path)
-        df = df.rename(columns={
-            'Année': 'annee',
-            'Département': 'departement',
-            'Code INSEE': 'code_insee',
-            'Commune': 'commune',
-            'mois': 'mois',
-            'surf_ha': 'surface_brulee'
-        })
-        # Nettoyer les données
-        df = df.dropna(subset=['annee', 'departement'])
-        df['annee'] = df['annee'].astype(int)
-        df['mois'] = df['mois'].fillna(1).astype(int)
-        df['surface_brulee'] = df['surface_brulee'].fillna(0)
-        deps_paca = ['04', '05', '06', '13', '83', '84']
-        df = df[df['departement'].astype(str).isin(deps_paca)]
-        df['departement'] = df['departement'].astype(str).str.zfill(2)
-        return df
-    return pd.DataFrame()
+def calcul_noms_communes():
+    """Nom de commune par code INSEE"""
+    return load_incendie_data().groupby("code_insee")["commune"].first()
+
+@st.cache_data
+def calcul_centroides(df):
+    """Centroïdes des communes à partir des carreaux DFCI"""
+    return centroides_communes(df)
 
 df = load_incendie_data()
 
@@ -165,6 +168,25 @@ with st.sidebar:
             ["Tous"] + sorted(df["departement"].dropna().unique().tolist()),
             format_func=lambda x: "🌍 Toute la région PACA" if x == "Tous" else f"📍 {x} - {DEPT_NOMS.get(x, x)}"
         )
+        
+        st.markdown("---")
+        st.markdown("### 💾 Export")
+        
+        format_export = st.selectbox("Format", list(FORMATS), format_func=str.upper)
+        if st.button("📦 Préparer l'export"):
+            centroides = calcul_centroides(df) if format_export == "geojson" else None
+            contenu_export = exporter_contenu(
+                CHEMIN_PROPRES,
+                format_export,
+                filtre_selection(departements=None if selected_dep == "Tous" else [selected_dep]),
+                centroides
+            )
+            st.download_button(
+                "⬇️ Télécharger la sélection",
+                data=contenu_export,
+                file_name=f"incendies_analyses{FORMATS[format_export][1]}",
+                mime=FORMATS[format_export][0]
+            )
     
     st.markdown("---")
     
@@ -187,9 +209,15 @@ with st.sidebar:
 # =====================
 # FILTRAGE
 # =====================
-df_filtered = df.copy()
+# Paramètres des requêtes d'agrégation ; la sélection n'est jamais matérialisée
+filtres = {}
 if len(df) > 0 and selected_dep != "Tous":
-    df_filtered = df_filtered[df_filtered["departement"] == selected_dep]
+    filtres["departements"] = [selected_dep]
+nb_selection = compter(df, **filtres)
+
+# Chaque section est un fragment : ses widgets ne relancent qu'elle-même, et
+# elle ne dépend que des filtres qu'on lui passe (données via `requete`).
+# Les sections sont affichées par onglet, voir ONGLETS plus bas.
 
 # =====================
 # TITRE
@@ -214,272 +242,836 @@ if len(df) > 0:
         ">
             <span style="color: #e8d8c8;">📍 <strong style="color: #ff6b35;">{dep_label}</strong> | 
             📅 <strong style="color: #ff6b35;">1973 - 2022</strong> |
-            🔥 <strong style="color: #ff6b35;">{len(df_filtered):,}</strong> incendies</span>
+            🔥 <strong style="color: #ff6b35;">{nb_selection:,}</strong> incendies</span>
         </div>
     """, unsafe_allow_html=True)
 
 # =====================
 # GRAPHIQUE 1: ÉVOLUTION ANNUELLE DU NOMBRE D'INCENDIES
 # =====================
-st.markdown("### 🔥 Évolution Annuelle du Nombre d'Incendies")
-
-if len(df_filtered) > 0:
-    incendies_annuels = df_filtered.groupby("annee").size().reset_index(name="nb_incendies")
-    
-    fig_nb = px.area(
-        incendies_annuels,
-        x="annee",
-        y="nb_incendies",
-        labels={"annee": "Année", "nb_incendies": "Nombre d'incendies"}
-    )
-    
-    fig_nb.update_layout(
-        plot_bgcolor="rgba(0,0,0,0)",
-        paper_bgcolor="rgba(0,0,0,0)",
-        font=dict(color="#e8d8c8"),
-        xaxis=dict(gridcolor="rgba(255,107,53,0.1)", title_font=dict(color="#ff6b35")),
-        yaxis=dict(gridcolor="rgba(255,107,53,0.1)", title_font=dict(color="#ff6b35")),
-        hovermode="x unified",
-        height=400
-    )
-    
-    fig_nb.update_traces(
-        fill='tozeroy',
-        fillcolor='rgba(255,107,53,0.3)',
-        line=dict(color='#ff6b35', width=2)
-    )
-    
-    # Annotation pour le pic
-    max_row = incendies_annuels.loc[incendies_annuels["nb_incendies"].idxmax()]
-    fig_nb.add_annotation(
-        x=max_row["annee"],
-        y=max_row["nb_incendies"],
-        text=f"Pic: {int(max_row['annee'])}",
-        showarrow=True,
-        arrowhead=2,
-        arrowcolor="#ffcc00",
-        font=dict(color="#ffcc00")
-    )
-    
-    st.plotly_chart(fig_nb, use_container_width=True)
-
-st.markdown("""
-    <div class="insight-box">
-        <p>💡 <strong>Observation :</strong> On observe une tendance globale à la diminution du nombre d'incendies 
-        depuis les pics historiques de la fin des années 1970-1980. Les années 1978, 1979 et 1985 se distinguent 
-        par un volume d'incendies dépassant les 3 500 événements par an.</p>
-    </div>
-""", unsafe_allow_html=True)
-
-# =====================
-# GRAPHIQUE 2: ÉVOLUTION DES SURFACES BRÛLÉES
-# =====================
-st.markdown("### 🌲 Évolution Annuelle des Surfaces Brûlées")
-
-if len(df_filtered) > 0:
-    surface_annuelle = df_filtered.groupby("annee")["surface_brulee"].sum().reset_index()
-    
-    fig_surface = go.Figure()
-    
-    fig_surface.add_trace(go.Bar(
-        x=surface_annuelle["annee"],
-        y=surface_annuelle["surface_brulee"],
-        marker=dict(
-            color=surface_annuelle["surface_brulee"],
-            colorscale=[[0, "#ffcc00"], [0.3, "#ff9900"], [0.5, "#ff6b35"], [0.7, "#cc0000"], [1, "#660000"]],
-            showscale=True,
-            colorbar=dict(title="Hectares", tickfont=dict(color="#e8d8c8"))
-        ),
-        hovertemplate="Année: %{x}<br>Surface: %{y:,.0f} ha<extra></extra>"
-    ))
-    
-    fig_surface.update_layout(
-        plot_bgcolor="rgba(0,0,0,0)",
-        paper_bgcolor="rgba(0,0,0,0)",
-        font=dict(color="#e8d8c8"),
-        xaxis=dict(title="Année", gridcolor="rgba(255,107,53,0.1)", title_font=dict(color="#ff6b35")),
-        yaxis=dict(title="Surface brûlée (ha)", gridcolor="rgba(255,107,53,0.1)", title_font=dict(color="#ff6b35")),
-        height=400
-    )
-    
-    # Annotation 2003
-    if 2003 in surface_annuelle["annee"].values:
-        val_2003 = surface_annuelle[surface_annuelle["annee"] == 2003]["surface_brulee"].values[0]
-        fig_surface.add_annotation(
-            x=2003,
-            y=val_2003,
-            text="🔥 2003: Canicule",
-            showarrow=True,
-            arrowhead=2,
-            arrowcolor="#ffcc00",
-            font=dict(color="#ffcc00", size=12),
-            ay=-40
-        )
-    
-    st.plotly_chart(fig_surface, use_container_width=True)
-
-st.markdown("""
-    <div class="insight-box">
-        <p>💡 <strong>Observation :</strong> L'année 2003 marque le sommet de la période étudiée avec plus de 
-        60 000 hectares parcourus par les flammes lors de la canicule exceptionnelle. Les années 1989 et 1991 
-        sont également marquées par des surfaces brûlées importantes.</p>
-    </div>
-""", unsafe_allow_html=True)
-
-# =====================
-# GRAPHIQUE 3: SAISONNALITÉ
-# =====================
-st.markdown("### 📅 Répartition Saisonnière des Incendies")
+@st.fragment
+@mesurer_fragment
+def section_evolution_nombre(filtres, nb_selection):
+    """Nombre annuel d'incendies et tendance de la sélection"""
+    st.markdown("### 🔥 Évolution Annuelle du Nombre d'Incendies")
 
-col1, col2 = st.columns(2)
-
-if len(df_filtered) > 0:
-    with col1:
-        mensuel_nb = df_filtered.groupby("mois").size().reset_index(name="nb_incendies")
-        mensuel_nb["mois_nom"] = mensuel_nb["mois"].map(noms_mois)
+    if nb_selection > 0:
+        incendies_annuels = requete("agregat", par=["annee"], **filtres)[["annee", "nb_incendies"]]
         
-        fig_mois_nb = px.bar(
-            mensuel_nb,
-            x="mois_nom",
+        fig_nb = px.area(
+            incendies_annuels,
+            x="annee",
             y="nb_incendies",
-            labels={"mois_nom": "Mois", "nb_incendies": "Nombre d'incendies"},
-            color="nb_incendies",
-            color_continuous_scale=[[0, "#ffcc00"], [0.5, "#ff6b35"], [1, "#cc0000"]]
+            labels={"annee": "Année", "nb_incendies": "Nombre d'incendies"}
         )
         
-        fig_mois_nb.update_layout(
-            title=dict(text="Nombre d'incendies par mois", font=dict(color="#ff6b35")),
+        fig_nb.update_layout(
             plot_bgcolor="rgba(0,0,0,0)",
             paper_bgcolor="rgba(0,0,0,0)",
             font=dict(color="#e8d8c8"),
-            xaxis=dict(gridcolor="rgba(255,107,53,0.1)", tickangle=45),
-            yaxis=dict(gridcolor="rgba(255,107,53,0.1)"),
-            showlegend=False,
+            xaxis=dict(gridcolor="rgba(255,107,53,0.1)", title_font=dict(color="#ff6b35")),
+            yaxis=dict(gridcolor="rgba(255,107,53,0.1)", title_font=dict(color="#ff6b35")),
+            hovermode="x unified",
             height=400
         )
         
-        st.plotly_chart(fig_mois_nb, use_container_width=True)
-
-    with col2:
-        mensuel_surface = df_filtered.groupby("mois")["surface_brulee"].sum().reset_index()
-        mensuel_surface["mois_nom"] = mensuel_surface["mois"].map(noms_mois)
+        fig_nb.update_traces(
+            fill='tozeroy',
+            fillcolor='rgba(255,107,53,0.3)',
+            line=dict(color='#ff6b35', width=2)
+        )
         
-        fig_mois_surface = px.bar(
-            mensuel_surface,
-            x="mois_nom",
-            y="surface_brulee",
-            labels={"mois_nom": "Mois", "surface_brulee": "Surface brûlée (ha)"},
-            color="surface_brulee",
-            color_continuous_scale=[[0, "#ffcc00"], [0.5, "#ff6b35"], [1, "#cc0000"]]
+        # Annotation pour le pic
+        max_row = incendies_annuels.loc[incendies_annuels["nb_incendies"].idxmax()]
+        fig_nb.add_annotation(
+            x=max_row["annee"],
+            y=max_row["nb_incendies"],
+            text=f"Pic: {int(max_row['annee'])}",
+            showarrow=True,
+            arrowhead=2,
+            arrowcolor="#ffcc00",
+            font=dict(color="#ffcc00")
         )
         
-        fig_mois_surface.update_layout(
-            title=dict(text="Surfaces brûlées par mois", font=dict(color="#ff6b35")),
+        st.plotly_chart(fig_nb, use_container_width=True)
+
+    if nb_selection > 0:
+        tendance_zone = requete("tendances", cle=None, **filtres).iloc[0]
+        libelle_tendance = {
+            "baisse": "une tendance significative à la diminution",
+            "hausse": "une tendance significative à l'augmentation",
+            "stable": "aucune tendance significative"
+        }[tendance_zone["nb_tendance"]]
+        pente = "—" if pd.isna(tendance_zone["nb_pente"]) else f"{tendance_zone['nb_pente']:+.1f}"
+
+        # Années les plus chargées de la sélection
+        pics = incendies_annuels.nlargest(3, "nb_incendies").sort_values("annee")
+        annees_pics = [str(int(a)) for a in pics["annee"]]
+        volumes = [f"{int(v):,}".replace(",", " ") for v in (pics["nb_incendies"].min(), pics["nb_incendies"].max())]
+        if len(annees_pics) > 1:
+            texte_pics = (
+                f"Les années {', '.join(annees_pics[:-1])} et {annees_pics[-1]} se distinguent avec "
+                f"{volumes[0]} à {volumes[1]} incendies par an."
+            )
+        else:
+            texte_pics = f"L'année {annees_pics[0]} compte {volumes[1]} incendies."
+
+        st.markdown(f"""
+            <div class="insight-box">
+                <p>💡 <strong>Observation :</strong> Le test de Mann-Kendall indique {libelle_tendance} du nombre 
+                d'incendies (p = {tendance_zone["nb_p"]:.3f}), avec une pente de Sen de 
+                <strong>{pente} incendies/an</strong>. {texte_pics}</p>
+            </div>
+        """, unsafe_allow_html=True)
+
+# =====================
+# GRAPHIQUE 2: ÉVOLUTION DES SURFACES BRÛLÉES
+# =====================
+@st.fragment
+@mesurer_fragment
+def section_evolution_surface(filtres, nb_selection):
+    """Surfaces brûlées annuelles"""
+    st.markdown("### 🌲 Évolution Annuelle des Surfaces Brûlées")
+
+    if nb_selection > 0:
+        surface_annuelle = requete("agregat", par=["annee"], **filtres)[["annee", "surface_brulee"]]
+        
+        fig_surface = go.Figure()
+        
+        fig_surface.add_trace(go.Bar(
+            x=surface_annuelle["annee"],
+            y=surface_annuelle["surface_brulee"],
+            marker=dict(
+                color=surface_annuelle["surface_brulee"],
+                colorscale=[[0, "#ffcc00"], [0.3, "#ff9900"], [0.5, "#ff6b35"], [0.7, "#cc0000"], [1, "#660000"]],
+                showscale=True,
+                colorbar=dict(title="Hectares", tickfont=dict(color="#e8d8c8"))
+            ),
+            hovertemplate="Année: %{x}<br>Surface: %{y:,.0f} ha<extra></extra>"
+        ))
+        
+        fig_surface.update_layout(
             plot_bgcolor="rgba(0,0,0,0)",
             paper_bgcolor="rgba(0,0,0,0)",
             font=dict(color="#e8d8c8"),
-            xaxis=dict(gridcolor="rgba(255,107,53,0.1)", tickangle=45),
-            yaxis=dict(gridcolor="rgba(255,107,53,0.1)"),
-            showlegend=False,
+            xaxis=dict(title="Année", gridcolor="rgba(255,107,53,0.1)", title_font=dict(color="#ff6b35")),
+            yaxis=dict(title="Surface brûlée (ha)", gridcolor="rgba(255,107,53,0.1)", title_font=dict(color="#ff6b35")),
             height=400
         )
         
-        st.plotly_chart(fig_mois_surface, use_container_width=True)
+        # Annotation 2003
+        if 2003 in surface_annuelle["annee"].values:
+            val_2003 = surface_annuelle[surface_annuelle["annee"] == 2003]["surface_brulee"].values[0]
+            fig_surface.add_annotation(
+                x=2003,
+                y=val_2003,
+                text="🔥 2003: Canicule",
+                showarrow=True,
+                arrowhead=2,
+                arrowcolor="#ffcc00",
+                font=dict(color="#ffcc00", size=12),
+                ay=-40
+            )
+        
+        st.plotly_chart(fig_surface, use_container_width=True)
 
-st.markdown("""
-    <div class="insight-box">
-        <p>💡 <strong>Observation :</strong> La saisonnalité suit un cycle bimodal : 
-        <strong>pic estival majeur</strong> (juillet-août) lié à la sécheresse et la fréquentation touristique, 
-        et un <strong>pic secondaire en mars</strong> lié aux brûlages agricoles et à la végétation sèche après l'hiver.</p>
-    </div>
-""", unsafe_allow_html=True)
+    st.markdown("""
+        <div class="insight-box">
+            <p>💡 <strong>Observation :</strong> L'année 2003 marque le sommet de la période étudiée avec plus de 
+            60 000 hectares parcourus par les flammes lors de la canicule exceptionnelle. Les années 1989 et 1991 
+            sont également marquées par des surfaces brûlées importantes.</p>
+        </div>
+    """, unsafe_allow_html=True)
 
 # =====================
-# GRAPHIQUE 4: HEATMAP
+# TENDANCES MANN-KENDALL / SEN
 # =====================
-st.markdown("### 🗓️ Carte de Chaleur : Incendies par Mois et Année")
+@st.fragment
+@mesurer_fragment
+def section_tendances(filtres, nb_selection):
+    """Tendances par département et bilan communal"""
+    st.markdown("### 📉 Tendances sur 50 ans (Mann-Kendall & pente de Sen)")
 
-if len(df_filtered) > 0:
-    heatmap_data = df_filtered.groupby(["annee", "mois"]).size().reset_index(name="nb_incendies")
-    heatmap_pivot = heatmap_data.pivot(index="mois", columns="annee", values="nb_incendies").fillna(0)
-    
-    fig_heatmap = px.imshow(
-        heatmap_pivot,
-        labels=dict(x="Année", y="Mois", color="Incendies"),
-        x=heatmap_pivot.columns,
-        y=[noms_mois.get(m, m) for m in heatmap_pivot.index],
-        color_continuous_scale=[[0, "#1a0a0a"], [0.2, "#ff9900"], [0.5, "#ff6b35"], [0.8, "#cc0000"], [1, "#ffcc00"]],
-        aspect="auto"
-    )
-    
-    fig_heatmap.update_layout(
-        plot_bgcolor="rgba(0,0,0,0)",
-        paper_bgcolor="rgba(0,0,0,0)",
-        font=dict(color="#e8d8c8"),
-        height=500
-    )
-    
-    st.plotly_chart(fig_heatmap, use_container_width=True)
+    if nb_selection > 0:
+        tendances_dep = requete("tendances", cle="departement", **filtres).reset_index()
+        tendances_dep["nom"] = tendances_dep["departement"].map(DEPT_NOMS)
+        couleurs_tendance = {"hausse": "#cc0000", "baisse": "#66ccff", "stable": "#b0a090"}
+
+        col1, col2 = st.columns(2)
+
+        with col1:
+            fig_pente_nb = px.bar(
+                tendances_dep,
+                x="departement",
+                y="nb_pente",
+                color="nb_tendance",
+                labels={"departement": "Département", "nb_pente": "Incendies / an", "nb_tendance": "Tendance"},
+                color_discrete_map=couleurs_tendance,
+                hover_data={"nom": True, "nb_p": ":.3f"}
+            )
+
+            fig_pente_nb.update_layout(
+                title=dict(text="Pente de Sen - Nombre d'incendies", font=dict(color="#ff6b35")),
+                plot_bgcolor="rgba(0,0,0,0)",
+                paper_bgcolor="rgba(0,0,0,0)",
+                font=dict(color="#e8d8c8"),
+                xaxis=dict(gridcolor="rgba(255,107,53,0.1)", type='category'),
+                yaxis=dict(gridcolor="rgba(255,107,53,0.1)"),
+                height=400
+            )
+
+            st.plotly_chart(fig_pente_nb, use_container_width=True)
+
+        with col2:
+            fig_pente_surface = px.bar(
+                tendances_dep,
+                x="departement",
+                y="surface_pente",
+                color="surface_tendance",
+                labels={"departement": "Département", "surface_pente": "Hectares / an", "surface_tendance": "Tendance"},
+                color_discrete_map=couleurs_tendance,
+                hover_data={"nom": True, "surface_p": ":.3f"}
+            )
+
+            fig_pente_surface.update_layout(
+                title=dict(text="Pente de Sen - Surfaces brûlées", font=dict(color="#ff6b35")),
+                plot_bgcolor="rgba(0,0,0,0)",
+                paper_bgcolor="rgba(0,0,0,0)",
+                font=dict(color="#e8d8c8"),
+                xaxis=dict(gridcolor="rgba(255,107,53,0.1)", type='category'),
+                yaxis=dict(gridcolor="rgba(255,107,53,0.1)"),
+                height=400
+            )
+
+            st.plotly_chart(fig_pente_surface, use_container_width=True)
+
+        # Bilan des communes dont la tendance est significative
+        tendances_communes = requete("tendances", cle="code_insee", **filtres)
+        noms_communes = calcul_noms_communes()
+        nb_hausse = int((tendances_communes["nb_tendance"] == "hausse").sum())
+        nb_baisse = int((tendances_communes["nb_tendance"] == "baisse").sum())
+
+        st.markdown(f"""
+            <div class="insight-box">
+                <p>💡 <strong>Communes :</strong> sur {len(tendances_communes):,} communes touchées, 
+                <strong>{nb_baisse}</strong> présentent une baisse significative du nombre d'incendies et 
+                <strong>{nb_hausse}</strong> une hausse significative (seuil 5 %).</p>
+            </div>
+        """, unsafe_allow_html=True)
+
+        communes_hausse = tendances_communes[tendances_communes["nb_tendance"] == "hausse"]
+        if len(communes_hausse) > 0:
+            top_hausse = communes_hausse.nlargest(10, "nb_pente").reset_index()
+            top_hausse["commune"] = top_hausse["code_insee"].map(noms_communes)
+            top_hausse = top_hausse[["code_insee", "commune", "nb_total", "nb_pente", "nb_p"]]
+            top_hausse.columns = ["Code INSEE", "Commune", "Nombre d'Incendies", "Pente (incendies/an)", "p-value"]
+            top_hausse["Pente (incendies/an)"] = top_hausse["Pente (incendies/an)"].round(2)
+            top_hausse["p-value"] = top_hausse["p-value"].round(4)
+
+            st.markdown("#### ⚠️ Communes en hausse significative")
+            st.dataframe(
+                top_hausse,
+                width="stretch",
+                hide_index=True
+            )
 
 # =====================
-# TOP 10
+# GRAPHIQUE 3: SAISONNALITÉ
 # =====================
-st.markdown("### 🏆 Top 10 des Années les Plus Touchées")
+@st.fragment
+@mesurer_fragment
+def section_saisonnalite(filtres, nb_selection):
+    """Répartition mensuelle (nombre et surface)"""
+    st.markdown("### 📅 Répartition Saisonnière des Incendies")
+
+    col1, col2 = st.columns(2)
+
+    if nb_selection > 0:
+        with col1:
+            mensuel_nb = requete("agregat", par=["mois"], **filtres)[["mois", "nb_incendies"]]
+            mensuel_nb["mois_nom"] = mensuel_nb["mois"].map(noms_mois)
+            
+            fig_mois_nb = px.bar(
+                mensuel_nb,
+                x="mois_nom",
+                y="nb_incendies",
+                labels={"mois_nom": "Mois", "nb_incendies": "Nombre d'incendies"},
+                color="nb_incendies",
+                color_continuous_scale=[[0, "#ffcc00"], [0.5, "#ff6b35"], [1, "#cc0000"]]
+            )
+            
+            fig_mois_nb.update_layout(
+                title=dict(text="Nombre d'incendies par mois", font=dict(color="#ff6b35")),
+                plot_bgcolor="rgba(0,0,0,0)",
+                paper_bgcolor="rgba(0,0,0,0)",
+                font=dict(color="#e8d8c8"),
+                xaxis=dict(gridcolor="rgba(255,107,53,0.1)", tickangle=45),
+                yaxis=dict(gridcolor="rgba(255,107,53,0.1)"),
+                showlegend=False,
+                height=400
+            )
+            
+            st.plotly_chart(fig_mois_nb, use_container_width=True)
 
-col1, col2 = st.columns(2)
+        with col2:
+            mensuel_surface = requete("agregat", par=["mois"], **filtres)[["mois", "surface_brulee"]]
+            mensuel_surface["mois_nom"] = mensuel_surface["mois"].map(noms_mois)
+            
+            fig_mois_surface = px.bar(
+                mensuel_surface,
+                x="mois_nom",
+                y="surface_brulee",
+                labels={"mois_nom": "Mois", "surface_brulee": "Surface brûlée (ha)"},
+                color="surface_brulee",
+                color_continuous_scale=[[0, "#ffcc00"], [0.5, "#ff6b35"], [1, "#cc0000"]]
+            )
+            
+            fig_mois_surface.update_layout(
+                title=dict(text="Surfaces brûlées par mois", font=dict(color="#ff6b35")),
+                plot_bgcolor="rgba(0,0,0,0)",
+                paper_bgcolor="rgba(0,0,0,0)",
+                font=dict(color="#e8d8c8"),
+                xaxis=dict(gridcolor="rgba(255,107,53,0.1)", tickangle=45),
+                yaxis=dict(gridcolor="rgba(255,107,53,0.1)"),
+                showlegend=False,
+                height=400
+            )
+            
+            st.plotly_chart(fig_mois_surface, use_container_width=True)
 
-if len(df_filtered) > 0:
-    with col1:
-        top_nb = incendies_annuels.nlargest(10, "nb_incendies").sort_values("nb_incendies", ascending=True)
+    st.markdown("""
+        <div class="insight-box">
+            <p>💡 <strong>Observation :</strong> La saisonnalité suit un cycle bimodal : 
+            <strong>pic estival majeur</strong> (juillet-août) lié à la sécheresse et la fréquentation touristique, 
+            et un <strong>pic secondaire en mars</strong> lié aux brûlages agricoles et à la végétation sèche après l'hiver.</p>
+        </div>
+    """, unsafe_allow_html=True)
+
+# =====================
+# GRAPHIQUE 4: HEATMAP
+# =====================
+@st.fragment
+@mesurer_fragment
+def section_heatmap(filtres, nb_selection):
+    """Carte de chaleur mois × année"""
+    st.markdown("### 🗓️ Carte de Chaleur : Incendies par Mois et Année")
+
+    if nb_selection > 0:
+        heatmap_data = requete("agregat", par=["annee", "mois"], **filtres)
+        heatmap_pivot = heatmap_data.pivot(index="mois", columns="annee", values="nb_incendies").fillna(0)
         
-        fig_top_nb = px.bar(
-            top_nb,
-            x="nb_incendies",
-            y="annee",
-            orientation="h",
-            labels={"annee": "Année", "nb_incendies": "Nombre d'incendies"},
-            color="nb_incendies",
-            color_continuous_scale=[[0, "#ff9900"], [1, "#cc0000"]]
+        fig_heatmap = px.imshow(
+            heatmap_pivot,
+            labels=dict(x="Année", y="Mois", color="Incendies"),
+            x=heatmap_pivot.columns,
+            y=[noms_mois.get(m, m) for m in heatmap_pivot.index],
+            color_continuous_scale=[[0, "#1a0a0a"], [0.2, "#ff9900"], [0.5, "#ff6b35"], [0.8, "#cc0000"], [1, "#ffcc00"]],
+            aspect="auto"
         )
         
-        fig_top_nb.update_layout(
-            title=dict(text="Top 10 - Nombre d'incendies", font=dict(color="#ff6b35")),
+        fig_heatmap.update_layout(
             plot_bgcolor="rgba(0,0,0,0)",
             paper_bgcolor="rgba(0,0,0,0)",
             font=dict(color="#e8d8c8"),
-            xaxis=dict(gridcolor="rgba(255,107,53,0.1)"),
-            yaxis=dict(gridcolor="rgba(255,107,53,0.1)", type='category'),
-            showlegend=False,
-            height=400
+            height=500
         )
         
-        st.plotly_chart(fig_top_nb, use_container_width=True)
+        st.plotly_chart(fig_heatmap, use_container_width=True)
 
-    with col2:
-        top_surface = surface_annuelle.nlargest(10, "surface_brulee").sort_values("surface_brulee", ascending=True)
-        
-        fig_top_surface = px.bar(
-            top_surface,
-            x="surface_brulee",
-            y="annee",
-            orientation="h",
-            labels={"annee": "Année", "surface_brulee": "Surface brûlée (ha)"},
-            color="surface_brulee",
-            color_continuous_scale=[[0, "#ff9900"], [1, "#cc0000"]]
+# =====================
+# GRAPHIQUE 5: DYNAMIQUE JOURNALIÈRE
+# =====================
+@st.fragment
+@mesurer_fragment
+def section_dynamique(filtres, nb_selection):
+    """Cumuls glissants journaliers ; fenêtre et indicateur ne relancent que ce bloc"""
+    st.markdown("### ⏱️ Dynamique Journalière et Fenêtres Glissantes")
+
+    if nb_selection > 0:
+        serie = requete("serie_journaliere", **filtres)
+        if len(serie) == 0:
+            st.info("Aucune date d'alerte renseignée dans la sélection : pas de série journalière.")
+
+    if nb_selection > 0 and len(serie) > 0:
+        col_fenetre, col_indicateur = st.columns(2)
+        with col_fenetre:
+            fenetre = st.radio(
+                "Fenêtre glissante",
+                options=list(FENETRES),
+                format_func=lambda w: f"{w} jours",
+                horizontal=True
+            )
+        with col_indicateur:
+            indicateur = st.radio(
+                "Indicateur",
+                options=["surface", "nb"],
+                format_func=lambda x: "🌲 Surface brûlée" if x == "surface" else "🔥 Nombre d'incendies",
+                horizontal=True
+            )
+
+        colonne_fenetre = f"{indicateur}_{fenetre}j"
+        label_indicateur = "Surface brûlée (ha)" if indicateur == "surface" else "Nombre d'incendies"
+
+        # Zoom côté serveur : la période choisie est re-échantillonnée depuis la série
+        # complète, donc une fenêtre courte s'affiche en pleine résolution
+        premier_jour, dernier_jour = serie.index.min().date(), serie.index.max().date()
+        periode = st.slider(
+            "Période affichée",
+            min_value=premier_jour,
+            max_value=dernier_jour,
+            value=(premier_jour, dernier_jour),
+            format="DD/MM/YYYY"
         )
-        
-        fig_top_surface.update_layout(
-            title=dict(text="Top 10 - Surfaces brûlées", font=dict(color="#ff6b35")),
+        vue = serie.loc[str(periode[0]):str(periode[1])]
+
+        trace = trace_serie(
+            vue.index,
+            vue[colonne_fenetre],
+            mode="lines",
+            line=dict(color="#ff6b35", width=1),
+            fill="tozeroy",
+            fillcolor="rgba(255,107,53,0.2)",
+            hovertemplate=f"%{{x|%d/%m/%Y}}<br>{label_indicateur} sur {fenetre} j: %{{y:,.0f}}<extra></extra>"
+        )
+        fig_journalier = go.Figure(trace)
+
+        fig_journalier.update_layout(
             plot_bgcolor="rgba(0,0,0,0)",
             paper_bgcolor="rgba(0,0,0,0)",
             font=dict(color="#e8d8c8"),
-            xaxis=dict(gridcolor="rgba(255,107,53,0.1)"),
-            yaxis=dict(gridcolor="rgba(255,107,53,0.1)", type='category'),
-            showlegend=False,
+            xaxis=dict(title="Date", gridcolor="rgba(255,107,53,0.1)", title_font=dict(color="#ff6b35")),
+            yaxis=dict(title=f"{label_indicateur} - cumul {fenetre} jours", gridcolor="rgba(255,107,53,0.1)", title_font=dict(color="#ff6b35")),
             height=400
         )
-        
-        st.plotly_chart(fig_top_surface, use_container_width=True)
+
+        st.plotly_chart(fig_journalier, use_container_width=True)
+        st.caption(f"{len(trace.x):,} points tracés sur {len(vue):,} jours")
+
+        st.markdown(f"#### 🏆 Pire fenêtre de {fenetre} jours par année")
+
+        classement = pires_fenetres(serie, fenetre, indicateur).head(10).copy()
+        classement["debut"] = classement["debut"].dt.strftime("%d/%m/%Y")
+        classement["fin"] = classement["fin"].dt.strftime("%d/%m/%Y")
+        classement["surface_brulee"] = classement["surface_brulee"].round(2)
+        classement.columns = ["Année", "Début", "Fin", "Nombre d'Incendies", "Surface Brûlée (ha)"]
+
+        st.dataframe(
+            classement,
+            width="stretch",
+            hide_index=True
+        )
+
+    st.markdown("""
+        <div class="insight-box">
+            <p>💡 <strong>Lecture :</strong> Les cumuls glissants révèlent les épisodes critiques que les totaux
+            mensuels lissent : quelques jours de vent et de sécheresse suffisent à concentrer l'essentiel
+            des surfaces brûlées d'une année.</p>
+        </div>
+    """, unsafe_allow_html=True)
+
+# =====================
+# GRAPHIQUE 6: ÉPISODES
+# =====================
+@st.fragment
+@mesurer_fragment
+def section_episodes(filtres, nb_selection):
+    """Épisodes de feux simultanés ; l'écart choisi ne relance que ce bloc"""
+    st.markdown("### 🔥 Épisodes d'Incendies Simultanés")
+
+    if nb_selection > 0:
+        fenetre_episodes = st.slider(
+            "Écart maximal entre deux feux d'un même épisode (jours)",
+            min_value=0,
+            max_value=3,
+            value=FENETRE_JOURS
+        )
+
+        episodes = requete("episodes", fenetre_jours=fenetre_episodes, **filtres)
+        episodes_multiples = episodes[episodes["nb_incendies"] >= 2]
+        part_feux = episodes_multiples["nb_incendies"].sum() / nb_selection * 100
+
+        st.markdown(f"""
+            <div class="insight-box">
+                <p>💡 <strong>{len(episodes_multiples):,}</strong> épisodes regroupent au moins deux feux sur des carreaux 
+                DFCI voisins : ils rassemblent <strong>{part_feux:.0f} %</strong> des incendies de la sélection.</p>
+            </div>
+        """, unsafe_allow_html=True)
+
+        col1, col2 = st.columns(2)
+
+        with col1:
+            episodes_annuels = episodes_multiples.groupby("annee").size().reset_index(name="nb_episodes")
+
+            fig_episodes = px.bar(
+                episodes_annuels,
+                x="annee",
+                y="nb_episodes",
+                labels={"annee": "Année", "nb_episodes": "Épisodes multi-feux"},
+                color="nb_episodes",
+                color_continuous_scale=[[0, "#ffcc00"], [0.5, "#ff6b35"], [1, "#cc0000"]]
+            )
+
+            fig_episodes.update_layout(
+                title=dict(text="Épisodes multi-feux par année", font=dict(color="#ff6b35")),
+                plot_bgcolor="rgba(0,0,0,0)",
+                paper_bgcolor="rgba(0,0,0,0)",
+                font=dict(color="#e8d8c8"),
+                xaxis=dict(gridcolor="rgba(255,107,53,0.1)"),
+                yaxis=dict(gridcolor="rgba(255,107,53,0.1)"),
+                showlegend=False,
+                height=400
+            )
+
+            st.plotly_chart(fig_episodes, use_container_width=True)
+
+        with col2:
+            top_episodes = episodes.head(10).copy()
+            top_episodes["debut"] = top_episodes["debut"].dt.strftime("%d/%m/%Y")
+            top_episodes["surface_brulee"] = top_episodes["surface_brulee"].round(2)
+            top_episodes = top_episodes[["debut", "commune", "departement", "nb_incendies", "nb_communes", "surface_brulee"]]
+            top_episodes.columns = ["Début", "Commune principale", "Dép.", "Feux", "Communes", "Surface Brûlée (ha)"]
+
+            st.markdown("#### 🏆 Top 10 des épisodes")
+            st.dataframe(
+                top_episodes,
+                width="stretch",
+                hide_index=True
+            )
+
+# =====================
+# TOP 10
+# =====================
+@st.fragment
+@mesurer_fragment
+def section_top10(filtres, nb_selection):
+    """Années les plus touchées"""
+    st.markdown("### 🏆 Top 10 des Années les Plus Touchées")
+
+    col1, col2 = st.columns(2)
+
+    if nb_selection > 0:
+        with col1:
+            top_nb = requete("agregat", par=["annee"], tri="nb_incendies", n=10, **filtres)
+            top_nb = top_nb.sort_values("nb_incendies", ascending=True)
+            
+            fig_top_nb = px.bar(
+                top_nb,
+                x="nb_incendies",
+                y="annee",
+                orientation="h",
+                labels={"annee": "Année", "nb_incendies": "Nombre d'incendies"},
+                color="nb_incendies",
+                color_continuous_scale=[[0, "#ff9900"], [1, "#cc0000"]]
+            )
+            
+            fig_top_nb.update_layout(
+                title=dict(text="Top 10 - Nombre d'incendies", font=dict(color="#ff6b35")),
+                plot_bgcolor="rgba(0,0,0,0)",
+                paper_bgcolor="rgba(0,0,0,0)",
+                font=dict(color="#e8d8c8"),
+                xaxis=dict(gridcolor="rgba(255,107,53,0.1)"),
+                yaxis=dict(gridcolor="rgba(255,107,53,0.1)", type='category'),
+                showlegend=False,
+                height=400
+            )
+            
+            st.plotly_chart(fig_top_nb, use_container_width=True)
+
+        with col2:
+            top_surface = requete("agregat", par=["annee"], tri="surface_brulee", n=10, **filtres)
+            top_surface = top_surface.sort_values("surface_brulee", ascending=True)
+            
+            fig_top_surface = px.bar(
+                top_surface,
+                x="surface_brulee",
+                y="annee",
+                orientation="h",
+                labels={"annee": "Année", "surface_brulee": "Surface brûlée (ha)"},
+                color="surface_brulee",
+                color_continuous_scale=[[0, "#ff9900"], [1, "#cc0000"]]
+            )
+            
+            fig_top_surface.update_layout(
+                title=dict(text="Top 10 - Surfaces brûlées", font=dict(color="#ff6b35")),
+                plot_bgcolor="rgba(0,0,0,0)",
+                paper_bgcolor="rgba(0,0,0,0)",
+                font=dict(color="#e8d8c8"),
+                xaxis=dict(gridcolor="rgba(255,107,53,0.1)"),
+                yaxis=dict(gridcolor="rgba(255,107,53,0.1)", type='category'),
+                showlegend=False,
+                height=400
+            )
+            
+            st.plotly_chart(fig_top_surface, use_container_width=True)
+
+# =====================
+# GRAPHIQUE 7: DISTRIBUTION DES TAILLES
+# =====================
+COULEURS_DEPT = {
+    "04": "#ffcc00",
+    "05": "#66ccff",
+    "06": "#ff9966",
+    "13": "#ff6b35",
+    "83": "#cc0000",
+    "84": "#ff9933"
+}
+
+@st.fragment
+@mesurer_fragment
+def section_distribution(filtres, nb_selection):
+    """Histogramme logarithmique, CCDF et lois de queue ; la période ne relance que ce bloc"""
+    st.markdown("### 📊 Distribution des Tailles de Feux")
+
+    if nb_selection > 0:
+        # Effectifs par (département, année) et classe de surface : une période
+        # est une somme de lignes, sans relire les surfaces
+        cube = requete("cube_tailles", **filtres)
+        premiere, derniere = int(cube["annee"].min()), int(cube["annee"].max())
+        periode = st.slider(
+            "Période de la distribution",
+            min_value=premiere,
+            max_value=derniere,
+            value=(premiere, derniere),
+            step=1
+        )
+        comptes = sommer(cube, annees=periode)
+
+        if comptes.sum() == 0:
+            st.info("Aucun feu de surface connue sur cette période.")
+        else:
+            puissance = ajuster_loi_puissance(comptes)
+            lognormale = ajuster_lognormale(comptes, xmin=puissance["xmin"] if puissance else None)
+            centres = np.sqrt(BORNES[:-1] * BORNES[1:])
+            non_vides = comptes > 0
+
+            col1, col2 = st.columns(2)
+
+            with col1:
+                fig_histo = go.Figure(go.Scatter(
+                    x=centres[non_vides],
+                    y=densite(comptes)[non_vides],
+                    mode="lines+markers",
+                    line=dict(color="#ff6b35", width=2),
+                    customdata=comptes[non_vides],
+                    hovertemplate="%{x:.3g} ha<br>%{customdata:,.0f} feux<extra></extra>"
+                ))
+
+                fig_histo.update_layout(
+                    title=dict(text="Histogramme logarithmique (feux par ha)", font=dict(color="#ff6b35")),
+                    plot_bgcolor="rgba(0,0,0,0)",
+                    paper_bgcolor="rgba(0,0,0,0)",
+                    font=dict(color="#e8d8c8"),
+                    xaxis=dict(title="Surface brûlée (ha)", type="log", gridcolor="rgba(255,107,53,0.1)"),
+                    yaxis=dict(title="Densité", type="log", gridcolor="rgba(255,107,53,0.1)"),
+                    height=400
+                )
+
+                st.plotly_chart(fig_histo, use_container_width=True)
+
+            with col2:
+                fig_ccdf = go.Figure()
+                for dep in sorted(cube["departement"].unique()):
+                    comptes_dep = sommer(cube, annees=periode, departements=[dep])
+                    if comptes_dep.sum() == 0:
+                        continue
+                    garde = comptes_dep > 0
+                    fig_ccdf.add_trace(go.Scatter(
+                        x=BORNES[:-1][garde],
+                        y=ccdf(comptes_dep)[garde],
+                        mode="lines",
+                        name=f"{dep} - {DEPT_NOMS.get(dep, dep)}",
+                        line=dict(color=COULEURS_DEPT.get(dep, "#b0a090"), width=1.5)
+                    ))
+                fig_ccdf.add_trace(go.Scatter(
+                    x=BORNES[:-1][non_vides],
+                    y=ccdf(comptes)[non_vides],
+                    mode="markers",
+                    name="Sélection",
+                    marker=dict(color="#e8d8c8", size=5)
+                ))
+                if lognormale:
+                    x_modele = BORNES[:-1][non_vides]
+                    fig_ccdf.add_trace(go.Scatter(
+                        x=x_modele,
+                        y=ccdf_lognormale(x_modele, lognormale),
+                        mode="lines",
+                        name="Lognormale",
+                        line=dict(color="#66ccff", dash="dot", width=2)
+                    ))
+                if puissance:
+                    x_queue = np.geomspace(puissance["xmin"], BORNES[:-1][non_vides].max(), 30)
+                    fig_ccdf.add_trace(go.Scatter(
+                        x=x_queue,
+                        y=ccdf_loi_puissance(x_queue, puissance),
+                        mode="lines",
+                        name=f"Loi de puissance (α = {puissance['alpha']:.2f})",
+                        line=dict(color="#ffcc00", dash="dash", width=2)
+                    ))
+
+                fig_ccdf.update_layout(
+                    title=dict(text="Probabilité de dépasser une surface (CCDF)", font=dict(color="#ff6b35")),
+                    plot_bgcolor="rgba(0,0,0,0)",
+                    paper_bgcolor="rgba(0,0,0,0)",
+                    font=dict(color="#e8d8c8"),
+                    xaxis=dict(title="Surface brûlée (ha)", type="log", gridcolor="rgba(255,107,53,0.1)"),
+                    yaxis=dict(title="P(surface ≥ x)", type="log", gridcolor="rgba(255,107,53,0.1)"),
+                    legend=dict(font=dict(size=10)),
+                    height=400
+                )
+
+                st.plotly_chart(fig_ccdf, use_container_width=True)
+
+            if puissance:
+                st.markdown(f"""
+                    <div class="insight-box">
+                        <p>💡 <strong>Queue lourde :</strong> au-delà de <strong>{puissance['xmin']:.3g} ha</strong>
+                        ({puissance['part_queue'] * 100:.1f} % des feux), la probabilité de dépasser une surface
+                        décroît en x<sup>-{puissance['alpha'] - 1:.2f}</sup> : un feu dix fois plus grand n'est que
+                        {10 ** (puissance['alpha'] - 1):.0f} fois plus rare.</p>
+                    </div>
+                """, unsafe_allow_html=True)
+
+            # Ajustements par département sur la même période
+            lignes = []
+            for dep in sorted(cube["departement"].unique()):
+                comptes_dep = sommer(cube, annees=periode, departements=[dep])
+                puissance_dep = ajuster_loi_puissance(comptes_dep)
+                lognormale_dep = ajuster_lognormale(comptes_dep, xmin=puissance_dep["xmin"] if puissance_dep else None)
+                if lognormale_dep is None:
+                    continue
+                if puissance_dep is None:
+                    meilleur = "—"
+                else:
+                    meilleur = "Loi de puissance" if puissance_dep["ks"] < lognormale_dep["ks"] else "Lognormale"
+                lignes.append({
+                    "Département": f"{dep} - {DEPT_NOMS.get(dep, dep)}",
+                    "Feux": int(comptes_dep.sum()),
+                    "α": round(puissance_dep["alpha"], 2) if puissance_dep else None,
+                    "xmin (ha)": float(f"{puissance_dep['xmin']:.3g}") if puissance_dep else None,
+                    "Feux ≥ xmin": puissance_dep["n_queue"] if puissance_dep else None,
+                    "KS puissance": round(puissance_dep["ks"], 3) if puissance_dep else None,
+                    "Médiane lognormale (ha)": float(f"{lognormale_dep['mediane_ha']:.3g}"),
+                    "σ (ln ha)": round(lognormale_dep["sigma"], 2),
+                    "KS lognormale": round(lognormale_dep["ks"], 3),
+                    "Meilleur ajustement de la queue": meilleur
+                })
+
+            st.markdown("#### 📐 Ajustement des queues par département")
+            st.dataframe(
+                pd.DataFrame(lignes),
+                width="stretch",
+                hide_index=True
+            )
+            st.caption(
+                "Maximum de vraisemblance sur les classes logarithmiques ; xmin minimise la distance de "
+                "Kolmogorov-Smirnov (KS), la lognormale étant comparée sur la même queue."
+            )
+
+@st.fragment
+@mesurer_fragment
+def section_meteo(filtres, nb_selection):
+    """Feux et surfaces selon les conditions météo du jour d'alerte ; le choix de variable ne relance que ce bloc"""
+    st.markdown("### 🌡️ Conditions Météo du Jour d'Alerte")
+
+    if nb_selection > 0:
+        variable = st.radio(
+            "Variable météo",
+            list(VARIABLES),
+            format_func=VARIABLES.get,
+            horizontal=True
+        )
+        classes = requete("meteo", variable=variable, **filtres)
+
+        if len(classes) == 0:
+            st.info(
+                "Aucune donnée météo : déposez les fichiers quotidiens (CSV ou Parquet, par commune ou "
+                "par station) dans data/meteo/ puis lancez `python -m pyroviz.meteo`."
+            )
+        else:
+            col1, col2 = st.columns(2)
+
+            with col1:
+                fig_nb = go.Figure(go.Bar(
+                    x=classes["classe"],
+                    y=classes["nb_incendies"],
+                    marker_color="#ff6b35",
+                    hovertemplate="%{x}<br>%{y:,} feux<extra></extra>"
+                ))
+
+                fig_nb.update_layout(
+                    title=dict(text="Nombre d'incendies par classe", font=dict(color="#ff6b35")),
+                    plot_bgcolor="rgba(0,0,0,0)",
+                    paper_bgcolor="rgba(0,0,0,0)",
+                    font=dict(color="#e8d8c8"),
+                    xaxis=dict(title=VARIABLES[variable], gridcolor="rgba(255,107,53,0.1)"),
+                    yaxis=dict(title="Nombre d'incendies", gridcolor="rgba(255,107,53,0.1)"),
+                    height=400
+                )
+
+                st.plotly_chart(fig_nb, use_container_width=True)
+
+            with col2:
+                fig_surface = go.Figure(go.Bar(
+                    x=classes["classe"],
+                    y=classes["surface_moyenne"],
+                    marker_color="#cc0000",
+                    customdata=classes["surface_brulee"],
+                    hovertemplate="%{x}<br>%{y:.2f} ha en moyenne<br>%{customdata:,.0f} ha au total<extra></extra>"
+                ))
+
+                fig_surface.update_layout(
+                    title=dict(text="Surface moyenne par feu", font=dict(color="#ff6b35")),
+                    plot_bgcolor="rgba(0,0,0,0)",
+                    paper_bgcolor="rgba(0,0,0,0)",
+                    font=dict(color="#e8d8c8"),
+                    xaxis=dict(title=VARIABLES[variable], gridcolor="rgba(255,107,53,0.1)"),
+                    yaxis=dict(title="Surface moyenne (ha)", gridcolor="rgba(255,107,53,0.1)"),
+                    height=400
+                )
+
+                st.plotly_chart(fig_surface, use_container_width=True)
+
+            couverts = int(classes["nb_incendies"].sum())
+            pire = classes.loc[classes["surface_moyenne"].idxmax()]
+            st.markdown(f"""
+                <div class="insight-box">
+                    <p>💡 <strong>{couverts / nb_selection * 100:.1f} %</strong> des feux sélectionnés ont un relevé
+                    météo le jour de l'alerte. Les feux les plus étendus en moyenne surviennent dans la classe
+                    <strong>{pire['classe']}</strong> ({VARIABLES[variable]}) :
+                    {pire['surface_moyenne']:.2f} ha par feu.</p>
+                </div>
+            """, unsafe_allow_html=True)
+            st.caption("Classes de même effectif (quantiles) ; jointure au dernier relevé connu de la commune ou de la station la plus proche.")
+
+# =====================
+# ONGLETS
+# =====================
+ONGLETS = {
+    "📈 Évolution annuelle": (section_evolution_nombre, section_evolution_surface),
+    "📉 Tendances": (section_tendances,),
+    "📅 Saisonnalité": (section_saisonnalite, section_heatmap),
+    "⏱️ Dynamique journalière": (section_dynamique,),
+    "🔥 Épisodes": (section_episodes,),
+    "📊 Distribution des tailles": (section_distribution,),
+    "🌡️ Météo": (section_meteo,),
+    "🏆 Top 10": (section_top10,),
+}
+
+@st.fragment
+@mesurer_fragment
+def onglets_analyses(filtres, nb_selection):
+    """Seules les sections de l'onglet ouvert sont calculées et envoyées au navigateur"""
+    onglet = st.radio(
+        "Vue",
+        list(ONGLETS),
+        horizontal=True,
+        label_visibility="collapsed",
+        key="onglet_analyses"
+    )
+    for section in ONGLETS[onglet]:
+        section(filtres, nb_selection)
+
+onglets_analyses(filtres, nb_selection)
 
 # =====================
 # FOOTER
@@ -501,3 +1093,9 @@ st.markdown("""
         </p>
     </div>
 """, unsafe_allow_html=True)
+
+# =====================
+# MÉMOIRE DU RERUN (PYROVIZ_MEMOIRE=1)
+# =====================
+if mesure_memoire is not None:
+    afficher_rapport(mesure_memoire.fin())
@@ -6,6 +6,13 @@ import plotly.graph_objects as go
 import os
 from pathlib import Path
 
+from pyroviz.export import FORMATS, filtre_selection, exporter_contenu
+from pyroviz.donnees import CHEMIN_PROPRES
+from pyroviz.communes import construire_index, rechercher, centroides_communes
+from pyroviz.fwi import SEUIL_DANGER
+from pyroviz.client import load_incendie_data, requete
+from pyroviz.memoire import afficher_rapport, debut_rerun
+
 # =====================
 # CONFIGURATION PAGE
 # =====================
@@ -16,6 +23,9 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Allocations du rerun, mesurées si PYROVIZ_MEMOIRE est défini
+mesure_memoire = debut_rerun("Comparaison")
+
 # CSS moderne - Thème Feu
 st.markdown("""
 <style>
@@ -84,30 +94,16 @@ DATA_DIR = BASE_DIR / "data"
 # =====================
 # CHARGEMENT DONNÉES
 # =====================
+@st.cache_resource
+def calcul_index_communes(df):
+    """Index trié des noms et codes INSEE pour le sélecteur de communes ; partagé sans
+    copie (st.cache_resource) pour que ses clés restent converties d'une frappe à l'autre"""
+    return construire_index(df)
+
 @st.cache_data
-def load_incendie_data():
-    data_path = DATA_DIR / "incendies" / "incendies.parquet"
-    
-    if data_path.exists():
-        df = pd.read_parquet(data_path)
-        df = df.rename(columns={
-            'Année': 'annee',
-            'Département': 'departement',
-            'Code INSEE': 'code_insee',
-            'Commune': 'commune',
-            'mois': 'mois',
-            'surf_ha': 'surface_brulee'
-        })
-        # Nettoyer les données
-        df = df.dropna(subset=['annee', 'departement'])
-        df['annee'] = df['annee'].astype(int)
-        df['mois'] = df['mois'].fillna(1).astype(int)
-        df['surface_brulee'] = df['surface_brulee'].fillna(0)
-        deps_paca = ['04', '05', '06', '13', '83', '84']
-        df = df[df['departement'].astype(str).isin(deps_paca)]
-        df['departement'] = df['departement'].astype(str).str.zfill(2)
-        return df
-    return pd.DataFrame()
+def calcul_centroides(df):
+    """Centroïdes des communes à partir des carreaux DFCI"""
+    return centroides_communes(df)
 
 df = load_incendie_data()
 
@@ -137,6 +133,9 @@ dept_colors = {
     "84": "#ff9933"
 }
 
+# Palette attribuée aux communes dans l'ordre de sélection
+palette_communes = ["#ffcc00", "#66ccff", "#ff9966", "#ff6b35", "#cc0000", "#ff9933", "#99cc66", "#cc99ff"]
+
 # =====================
 # SIDEBAR
 # =====================
@@ -162,17 +161,46 @@ with st.sidebar:
     
     st.markdown("---")
     
-    st.markdown("### 📍 Départements à comparer")
+    st.markdown("### 📍 Territoires à comparer")
     
     if len(df) > 0:
-        all_deps = sorted(df["departement"].dropna().unique().tolist())
-        selected_deps = st.multiselect(
-            "Sélectionner les départements",
-            options=all_deps,
-            default=all_deps,
-            format_func=lambda x: f"📍 {x} - {DEPT_NOMS.get(x, x)}"
+        mode = st.radio(
+            "Échelle de comparaison",
+            ["Départements", "Communes"],
+            horizontal=True
         )
         
+        if mode == "Départements":
+            all_deps = sorted(df["departement"].dropna().unique().tolist())
+            selected_deps = st.multiselect(
+                "Sélectionner les départements",
+                options=all_deps,
+                default=all_deps,
+                format_func=lambda x: f"📍 {x} - {DEPT_NOMS.get(x, x)}"
+            )
+            entites = selected_deps
+            noms_entites = DEPT_NOMS
+        else:
+            index_communes = calcul_index_communes(df)
+            noms_entites = dict(zip(index_communes["code_insee"], index_communes["commune"]))
+            
+            # Sélection initiale : les 4 communes les plus touchées
+            if "communes_choisies" not in st.session_state:
+                st.session_state["communes_choisies"] = rechercher(index_communes, "", limite=4)["code_insee"].tolist()
+            
+            recherche = st.text_input("🔎 Rechercher une commune", placeholder="Nom ou code INSEE")
+            resultats = rechercher(index_communes, recherche)
+            
+            # Les communes déjà choisies restent proposées quelle que soit la recherche
+            options = list(dict.fromkeys(st.session_state["communes_choisies"] + resultats["code_insee"].tolist()))
+            selected_communes = st.multiselect(
+                "Sélectionner les communes",
+                options=options,
+                key="communes_choisies",
+                format_func=lambda x: f"📍 {noms_entites.get(x, x)} ({x})"
+            )
+            entites = selected_communes
+        
         st.markdown("---")
         
         st.markdown("### 📅 Période")
@@ -185,6 +213,31 @@ with st.sidebar:
             value=(1973, 2022),
             step=1
         )
+        
+        st.markdown("---")
+        st.markdown("### 💾 Export")
+        
+        format_export = st.selectbox("Format", list(FORMATS), format_func=str.upper)
+        if not entites:
+            st.caption("Sélectionnez au moins un territoire pour exporter.")
+        if st.button("📦 Préparer l'export", disabled=not entites):
+            centroides = calcul_centroides(df) if format_export == "geojson" else None
+            contenu_export = exporter_contenu(
+                CHEMIN_PROPRES,
+                format_export,
+                filtre_selection(
+                    annees=year_range,
+                    departements=entites if mode == "Départements" else None,
+                    communes=entites if mode == "Communes" else None
+                ),
+                centroides
+            )
+            st.download_button(
+                "⬇️ Télécharger la sélection",
+                data=contenu_export,
+                file_name=f"incendies_comparaison{FORMATS[format_export][1]}",
+                mime=FORMATS[format_export][0]
+            )
     
     st.markdown("---")
     
@@ -207,13 +260,23 @@ with st.sidebar:
 # FILTRAGE
 # =====================
 if len(df) > 0:
-    df_filtered = df[
-        (df["annee"] >= year_range[0]) & 
-        (df["annee"] <= year_range[1]) &
-        (df["departement"].isin(selected_deps))
-    ]
+    # Cube commune × année × mois de la période, servant toutes les vues de comparaison
+    cube_periode = requete("cube_communes", annees=list(year_range))
+    
+    if mode == "Départements":
+        agregats = cube_periode[cube_periode["departement"].isin(entites)].groupby(
+            ["departement", "annee", "mois"], as_index=False
+        )[["nb_incendies", "surface_brulee"]].sum().rename(columns={"departement": "entite"})
+        couleurs_entites = dept_colors
+        label_entite = "Département"
+    else:
+        agregats = cube_periode[cube_periode["code_insee"].isin(entites)].rename(columns={"code_insee": "entite"})
+        couleurs_entites = {code: palette_communes[i % len(palette_communes)] for i, code in enumerate(entites)}
+        label_entite = "Commune"
 else:
-    df_filtered = df
+    agregats = pd.DataFrame()
+    entites = []
+    label_entite = "Département"
 
 # =====================
 # TITRE
@@ -226,7 +289,10 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 if len(df) > 0:
-    deps_label = ", ".join(selected_deps) if len(selected_deps) <= 3 else f"{len(selected_deps)} départements"
+    if mode == "Départements":
+        deps_label = ", ".join(entites) if len(entites) <= 3 else f"{len(entites)} départements"
+    else:
+        deps_label = ", ".join(f"{noms_entites.get(c, c)} ({c})" for c in entites) if len(entites) <= 3 else f"{len(entites)} communes"
     st.markdown(f"""
         <div style="
             background: linear-gradient(90deg, rgba(255,107,53,0.15) 0%, rgba(247,147,30,0.15) 100%);
@@ -244,24 +310,29 @@ if len(df) > 0:
 # =====================
 # CARTES DE SYNTHÈSE PAR DÉPARTEMENT
 # =====================
-st.markdown("### 📊 Bilan par Département")
+st.markdown(f"### 📊 Bilan par {label_entite}")
 
-if len(df_filtered) > 0:
-    dept_stats = df_filtered.groupby("departement").agg({
-        "surface_brulee": "sum"
-    }).reset_index()
-    dept_stats["nb_incendies"] = df_filtered.groupby("departement").size().values
-    dept_stats["nom"] = dept_stats["departement"].map(DEPT_NOMS)
+if len(agregats) > 0:
+    dept_stats = agregats.groupby("entite")[["surface_brulee", "nb_incendies"]].sum().reset_index()
+    dept_stats["nom"] = dept_stats["entite"].map(noms_entites)
+    # Étiquette des graphiques : code pour les départements, « nom (INSEE) » pour les
+    # communes, les homonymes ne devant pas partager une étiquette ni une couleur
+    dept_stats["etiquette"] = (
+        dept_stats["entite"] if mode == "Départements"
+        else dept_stats["nom"].fillna(dept_stats["entite"]) + " (" + dept_stats["entite"] + ")"
+    )
+    etiquettes = dict(zip(dept_stats["entite"], dept_stats["etiquette"]))
+    couleurs_etiquettes = {etiquettes[e]: couleurs_entites[e] for e in etiquettes if e in couleurs_entites}
     
-    cols = st.columns(min(len(selected_deps), 6))
+    cols = st.columns(min(len(entites), 6))
     
-    for i, dep in enumerate(selected_deps[:6]):
+    for i, dep in enumerate(entites[:6]):
         with cols[i % len(cols)]:
-            dep_data = dept_stats[dept_stats["departement"] == dep]
+            dep_data = dept_stats[dept_stats["entite"] == dep]
             if len(dep_data) > 0:
                 nb = int(dep_data["nb_incendies"].values[0])
                 surface = dep_data["surface_brulee"].values[0]
-                nom = DEPT_NOMS.get(dep, dep)
+                nom = noms_entites.get(dep, dep)
                 
                 st.markdown(f"""
                     <div class="dept-card">
@@ -279,17 +350,17 @@ st.markdown("<br>", unsafe_allow_html=True)
 # =====================
 # GRAPHIQUE 1: COMPARAISON SURFACES BRÛLÉES
 # =====================
-st.markdown("### 🌲 Surfaces Brûlées Cumulées par Département")
+st.markdown(f"### 🌲 Surfaces Brûlées Cumulées par {label_entite}")
 
-if len(df_filtered) > 0:
+if len(agregats) > 0:
     dept_stats_sorted = dept_stats.sort_values("surface_brulee", ascending=True)
     
     fig_surface = px.bar(
         dept_stats_sorted,
         x="surface_brulee",
-        y="departement",
+        y="etiquette",
         orientation="h",
-        labels={"surface_brulee": "Surface brûlée (ha)", "departement": "Département"},
+        labels={"surface_brulee": "Surface brûlée (ha)", "etiquette": label_entite},
         color="surface_brulee",
         color_continuous_scale=[[0, "#ffcc00"], [0.3, "#ff9900"], [0.6, "#ff6b35"], [1, "#cc0000"]],
         text="surface_brulee"
@@ -326,16 +397,17 @@ st.markdown("""
 # =====================
 st.markdown("### 📈 Évolution Comparée du Nombre d'Incendies")
 
-if len(df_filtered) > 0:
-    evolution = df_filtered.groupby(["annee", "departement"]).size().reset_index(name="nb_incendies")
+if len(agregats) > 0:
+    evolution = agregats.groupby(["annee", "entite"], as_index=False)["nb_incendies"].sum()
+    evolution["etiquette"] = evolution["entite"].map(etiquettes)
     
     fig_evolution = px.line(
         evolution,
         x="annee",
         y="nb_incendies",
-        color="departement",
-        labels={"annee": "Année", "nb_incendies": "Nombre d'incendies", "departement": "Département"},
-        color_discrete_map=dept_colors
+        color="etiquette",
+        labels={"annee": "Année", "nb_incendies": "Nombre d'incendies", "etiquette": label_entite},
+        color_discrete_map=couleurs_etiquettes
     )
     
     fig_evolution.update_layout(
@@ -359,20 +431,21 @@ if len(df_filtered) > 0:
 # =====================
 # GRAPHIQUE 3: COMPARAISON SAISONNALITÉ
 # =====================
-st.markdown("### 📅 Profil Saisonnier par Département")
+st.markdown(f"### 📅 Profil Saisonnier par {label_entite}")
 
-if len(df_filtered) > 0:
-    saisonnalite = df_filtered.groupby(["mois", "departement"]).size().reset_index(name="nb_incendies")
+if len(agregats) > 0:
+    saisonnalite = agregats.groupby(["mois", "entite"], as_index=False)["nb_incendies"].sum()
     saisonnalite["mois_nom"] = saisonnalite["mois"].map(noms_mois)
+    saisonnalite["etiquette"] = saisonnalite["entite"].map(etiquettes)
     
     fig_saison = px.bar(
         saisonnalite,
         x="mois_nom",
         y="nb_incendies",
-        color="departement",
+        color="etiquette",
         barmode="group",
-        labels={"mois_nom": "Mois", "nb_incendies": "Nombre d'incendies", "departement": "Département"},
-        color_discrete_map=dept_colors
+        labels={"mois_nom": "Mois", "nb_incendies": "Nombre d'incendies", "etiquette": label_entite},
+        color_discrete_map=couleurs_etiquettes
     )
     
     fig_saison.update_layout(
@@ -392,16 +465,92 @@ if len(df_filtered) > 0:
     st.plotly_chart(fig_saison, use_container_width=True)
 
 # =====================
-# GRAPHIQUE 4: RADAR COMPARATIF
+# GRAPHIQUE 4: DANGER MÉTÉO (FWI) ET INCENDIES
 # =====================
-st.markdown("### 🎯 Profil de Risque par Département")
-
-if len(df_filtered) > 0 and len(selected_deps) >= 2:
-    dept_profile = df_filtered.groupby("departement").agg({
-        "surface_brulee": ["sum", "mean"]
-    }).reset_index()
-    dept_profile.columns = ["departement", "total_surface", "moy_surface"]
-    dept_profile["nb_incendies"] = df_filtered.groupby("departement").size().values
+st.markdown(f"### 🌡️ Danger Météo (FWI) et Incendies par {label_entite}")
+
+if len(agregats) > 0:
+    # Climatologie de l'indice forêt-météo sur la même période et les mêmes territoires
+    territoires = {"departements": list(entites)} if mode == "Départements" else {"communes": list(entites)}
+    climat = requete("climatologie_fwi", annees=list(year_range), **territoires)
+
+    if len(climat) == 0:
+        st.info(
+            "Indice forêt-météo indisponible : déposez les relevés quotidiens dans data/meteo/ "
+            "puis lancez `python -m pyroviz.meteo` (calcule aussi le FWI)."
+        )
+    else:
+        climat["mois_nom"] = climat["mois"].map(noms_mois)
+        climat["etiquette"] = climat["entite"].map(etiquettes)
+
+        col1, col2 = st.columns(2)
+
+        with col1:
+            fig_fwi = px.line(
+                climat,
+                x="mois_nom",
+                y="fwi_moyen",
+                color="etiquette",
+                markers=True,
+                labels={"mois_nom": "Mois", "fwi_moyen": "FWI moyen", "etiquette": label_entite},
+                color_discrete_map=couleurs_etiquettes,
+                title="Climatologie du FWI"
+            )
+
+        with col2:
+            fig_feux = px.line(
+                saisonnalite,
+                x="mois_nom",
+                y="nb_incendies",
+                color="etiquette",
+                markers=True,
+                labels={"mois_nom": "Mois", "nb_incendies": "Nombre d'incendies", "etiquette": label_entite},
+                color_discrete_map=couleurs_etiquettes,
+                title="Incendies Prométhée"
+            )
+
+        for colonne, fig in ((col1, fig_fwi), (col2, fig_feux)):
+            fig.update_layout(
+                plot_bgcolor="rgba(0,0,0,0)",
+                paper_bgcolor="rgba(0,0,0,0)",
+                font=dict(color="#e8d8c8"),
+                title_font=dict(color="#ff6b35"),
+                xaxis=dict(gridcolor="rgba(255,107,53,0.1)", tickangle=45, categoryorder="array", categoryarray=list(noms_mois.values())),
+                yaxis=dict(gridcolor="rgba(255,107,53,0.1)"),
+                legend=dict(
+                    bgcolor="rgba(0,0,0,0.3)",
+                    bordercolor="rgba(255,107,53,0.3)",
+                    borderwidth=1
+                ),
+                height=400
+            )
+            with colonne:
+                st.plotly_chart(fig, use_container_width=True)
+
+        # Accord entre le cycle saisonnier du danger météo et celui des feux
+        croise = climat.merge(saisonnalite[["entite", "mois", "nb_incendies"]], on=["entite", "mois"], how="left").fillna({"nb_incendies": 0})
+        correlations = croise.groupby("entite").apply(
+            lambda g: g["fwi_moyen"].corr(g["nb_incendies"]), include_groups=False
+        ).dropna()
+        if len(correlations) > 0:
+            pic = climat.loc[climat["part_jours_danger"].idxmax()]
+            st.markdown(f"""
+                <div class="insight-box">
+                    <p>💡 <strong>Saisonnalité :</strong> le FWI mensuel moyen et le nombre d'incendies sont corrélés
+                    à <strong>{correlations.mean():.2f}</strong> en moyenne (Pearson, sur les 12 mois). Danger le plus
+                    fréquent : <strong>{pic['etiquette']}</strong> en <strong>{pic['mois_nom'].lower()}</strong>,
+                    avec {pic['part_jours_danger'] * 100:.0f} % des jours au-delà de FWI {SEUIL_DANGER}.</p>
+                </div>
+            """, unsafe_allow_html=True)
+
+# =====================
+# GRAPHIQUE 5: RADAR COMPARATIF
+# =====================
+st.markdown(f"### 🎯 Profil de Risque par {label_entite}")
+
+if len(agregats) > 0 and len(entites) >= 2:
+    dept_profile = dept_stats[["entite", "surface_brulee", "nb_incendies"]].rename(columns={"surface_brulee": "total_surface"})
+    dept_profile["moy_surface"] = dept_profile["total_surface"] / dept_profile["nb_incendies"]
     dept_profile["moy_incendies"] = dept_profile["nb_incendies"] / (year_range[1] - year_range[0] + 1)
     
     # Normalisation
@@ -413,8 +562,8 @@ if len(df_filtered) > 0 and len(selected_deps) >= 2:
     
     categories = ['Total Incendies', 'Moy. Incendies/an', 'Total Surface', 'Moy. Surface/inc.']
     
-    for dep in selected_deps[:4]:
-        dep_data = dept_profile[dept_profile["departement"] == dep]
+    for dep in entites[:4]:
+        dep_data = dept_profile[dept_profile["entite"] == dep]
         if len(dep_data) > 0:
             values = [
                 dep_data["nb_incendies_norm"].values[0],
@@ -428,8 +577,8 @@ if len(df_filtered) > 0 and len(selected_deps) >= 2:
                 r=values,
                 theta=categories + [categories[0]],
                 fill='toself',
-                name=f"{dep} - {DEPT_NOMS.get(dep, dep)}",
-                line=dict(color=dept_colors.get(dep, "#ff6b35"))
+                name=f"{dep} - {noms_entites.get(dep, dep)}",
+                line=dict(color=couleurs_entites.get(dep, "#ff6b35"))
             ))
     
     fig_radar.update_layout(
@@ -472,10 +621,10 @@ st.markdown("""
 # =====================
 st.markdown("### 📋 Tableau Récapitulatif")
 
-if len(df_filtered) > 0:
+if len(agregats) > 0:
     recap_table = dept_stats.copy()
-    recap_table = recap_table[["departement", "nom", "nb_incendies", "surface_brulee"]]
-    recap_table.columns = ["Code", "Département", "Nombre d'Incendies", "Surface Brûlée (ha)"]
+    recap_table = recap_table[["entite", "nom", "nb_incendies", "surface_brulee"]]
+    recap_table.columns = ["Code", label_entite, "Nombre d'Incendies", "Surface Brûlée (ha)"]
     recap_table = recap_table.sort_values("Surface Brûlée (ha)", ascending=False)
     recap_table["Surface Brûlée (ha)"] = recap_table["Surface Brûlée (ha)"].round(2)
     
@@ -505,3 +654,9 @@ st.markdown("""
         </p>
     </div>
 """, unsafe_allow_html=True)
+
+# =====================
+# MÉMOIRE DU RERUN (PYROVIZ_MEMOIRE=1)
+# =====================
+if mesure_memoire is not None:
+    afficher_rapport(mesure_memoire.fin())
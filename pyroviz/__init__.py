@@ -0,0 +1,5 @@
+"""Moteurs de calcul partagés par les pages du dashboard PyroViz PACA.
+
+Les modules de ce paquet ne dépendent pas de Streamlit : les pages les
+appellent à travers leurs propres fonctions mises en cache (`st.cache_data`).
+"""
@@ -0,0 +1,234 @@
+"""Animation de l'historique sur la carte, jouée dans le navigateur.
+
+Toutes les images (une par année ou par mois) sont calculées d'un bloc depuis
+un cube cellule × année × mois, la cellule étant une commune ou un carreau
+DFCI. Plutôt que d'envoyer une matrice dense images × cellules, chaque image
+n'est transmise que par ses écarts à la précédente (codage delta creux) :
+
+- `changements` : nombre de cellules modifiées par image ;
+- `ecarts` : indices des cellules modifiées, codés par différence avec la
+  cellule modifiée précédente de la même image (petits entiers) ;
+- `valeurs` : variation du nombre de feux de chaque cellule modifiée.
+
+Les tableaux sont typés au plus juste (Uint16 / Int16 si possible) puis encodés
+en base64 ; le navigateur les décode en `TypedArray`, reconstruit chaque image
+par cumul et met à jour la couche de densité (leaflet.heat) sans aucun
+aller-retour avec le serveur.
+"""
+import base64
+import json
+
+import numpy as np
+import pandas as pd
+
+from pyroviz.communes import centroides_communes, cube_communes
+from pyroviz.dfci import centres_wgs84
+
+NIVEAUX = {"commune": "Communes", "dfci": "Carreaux DFCI"}
+PAS = {"annee": "Année par année", "mois": "Mois par mois"}
+NOMS_MOIS = ["janv.", "févr.", "mars", "avr.", "mai", "juin", "juil.", "août", "sept.", "oct.", "nov.", "déc."]
+# Durée d'affichage d'une image (ms)
+DUREES = {"annee": 800, "mois": 200}
+
+
+# =====================
+# CUBE DES IMAGES
+# =====================
+def cube_animation(df, niveau="commune"):
+    """Feux par cellule (commune ou carreau DFCI), année et mois, avec la position de la cellule."""
+    colonnes = ["cellule", "lon", "lat", "annee", "mois", "nb_incendies"]
+    if len(df) == 0:
+        return pd.DataFrame(columns=colonnes)
+    if niveau == "dfci":
+        cube = (
+            df.groupby(["DFCI_2", "annee", "mois"], observed=True)
+            .size().rename("nb_incendies").reset_index()
+            .rename(columns={"DFCI_2": "cellule"})
+        )
+        codes, inverse = np.unique(cube["cellule"].astype(str).to_numpy(), return_inverse=True)
+        lon, lat = centres_wgs84(pd.Series(codes))
+        cube["lon"], cube["lat"] = lon[inverse], lat[inverse]
+    else:
+        cube = cube_communes(df).rename(columns={"code_insee": "cellule"})
+        positions = centroides_communes(df)
+        cube["lon"] = cube["cellule"].map(lambda c: positions.get(c, (np.nan, np.nan))[0])
+        cube["lat"] = cube["cellule"].map(lambda c: positions.get(c, (np.nan, np.nan))[1])
+    return cube.dropna(subset=["lon", "lat"])[colonnes].reset_index(drop=True)
+
+
+# =====================
+# CODAGE DELTA
+# =====================
+def _base64(tableau):
+    return base64.b64encode(np.ascontiguousarray(tableau).tobytes()).decode("ascii")
+
+
+def _type_entier(valeurs, signe):
+    """Plus petit type (nom JavaScript, dtype NumPy) contenant `valeurs`."""
+    if signe:
+        petit = len(valeurs) == 0 or (valeurs.min() >= -(2 ** 15) and valeurs.max() < 2 ** 15)
+        return ("Int16", np.int16) if petit else ("Int32", np.int32)
+    petit = len(valeurs) == 0 or valeurs.max() < 2 ** 16
+    return ("Uint16", np.uint16) if petit else ("Uint32", np.uint32)
+
+
+def images(cube, pas="annee", annees=None):
+    """Matrice dense (images × cellules) des feux, positions et étiquettes des images."""
+    cellules, codes = pd.factorize(cube["cellule"], sort=True)
+    premiere, derniere = annees if annees is not None else (int(cube["annee"].min()), int(cube["annee"].max()))
+    annee = cube["annee"].to_numpy(dtype=np.int64) - premiere
+    if pas == "mois":
+        image = annee * 12 + cube["mois"].to_numpy(dtype=np.int64) - 1
+        etiquettes = [f"{NOMS_MOIS[m]} {a}" for a in range(premiere, derniere + 1) for m in range(12)]
+    else:
+        image = annee
+        etiquettes = [str(a) for a in range(premiere, derniere + 1)]
+    nb_images, nb_cellules = len(etiquettes), len(codes)
+    garde = (image >= 0) & (image < nb_images)
+    comptes = np.bincount(
+        image[garde] * nb_cellules + cellules[garde],
+        weights=cube["nb_incendies"].to_numpy(dtype=np.float64)[garde],
+        minlength=nb_images * nb_cellules,
+    ).reshape(nb_images, nb_cellules).astype(np.int32)
+    positions = cube.drop_duplicates("cellule").set_index("cellule").loc[codes, ["lon", "lat"]]
+    return comptes, positions, etiquettes
+
+
+def encoder(comptes, positions, etiquettes):
+    """Images codées par écarts successifs, prêtes à être sérialisées en JSON."""
+    deltas = np.diff(comptes, axis=0, prepend=0)
+    image, cellule = np.nonzero(deltas)  # ordre image puis cellule
+    premiere = np.concatenate([[True], image[1:] != image[:-1]]) if len(image) else np.zeros(0, dtype=bool)
+    ecarts = np.where(premiere, cellule, np.diff(cellule, prepend=0))
+    valeurs = deltas[image, cellule]
+    type_ecarts, dtype_ecarts = _type_entier(ecarts, signe=False)
+    type_valeurs, dtype_valeurs = _type_entier(valeurs, signe=True)
+    encodage = {
+        "etiquettes": etiquettes,
+        "totaux": comptes.sum(axis=1).tolist(),
+        "maximum": int(comptes.max()) if comptes.size else 0,
+        "lon": _base64(positions["lon"].to_numpy(dtype=np.float32)),
+        "lat": _base64(positions["lat"].to_numpy(dtype=np.float32)),
+        "changements": _base64(np.bincount(image, minlength=len(etiquettes)).astype(np.uint32)),
+        "ecarts": _base64(ecarts.astype(dtype_ecarts)),
+        "type_ecarts": type_ecarts,
+        "valeurs": _base64(valeurs.astype(dtype_valeurs)),
+        "type_valeurs": type_valeurs,
+    }
+    encodage["octets"] = sum(len(encodage[c]) for c in ("lon", "lat", "changements", "ecarts", "valeurs"))
+    encodage["octets_dense"] = len(json.dumps(comptes.tolist()))
+    return encodage
+
+
+def decoder(encodage):
+    """Inverse de `encoder` (matrice images × cellules), comme le fait le navigateur."""
+    def tableau(cle, dtype):
+        return np.frombuffer(base64.b64decode(encodage[cle]), dtype=dtype)
+
+    lon = tableau("lon", np.float32)
+    changements = tableau("changements", np.uint32)
+    ecarts = tableau("ecarts", np.dtype(encodage["type_ecarts"].lower())).astype(np.int64)
+    valeurs = tableau("valeurs", np.dtype(encodage["type_valeurs"].lower())).astype(np.int32)
+    comptes = np.zeros((len(changements), len(lon)), dtype=np.int32)
+    courant = np.zeros(len(lon), dtype=np.int32)
+    debut = 0
+    for i, n in enumerate(changements):
+        cellules = np.cumsum(ecarts[debut:debut + n])
+        courant[cellules] += valeurs[debut:debut + n]
+        comptes[i] = courant
+        debut += n
+    return comptes
+
+
+# =====================
+# CARTE ANIMÉE
+# =====================
+_SCRIPT = """
+(function() {
+    var carte = {{ this._parent.get_name() }};
+    var chaleur = {{ this.chaleur.get_name() }};
+    var d = {{ this.donnees }};
+    function tableau(b64, Type) {
+        var s = atob(b64), octets = new Uint8Array(s.length);
+        for (var i = 0; i < s.length; i++) octets[i] = s.charCodeAt(i);
+        return new Type(octets.buffer);
+    }
+    var types = {Uint16: Uint16Array, Uint32: Uint32Array, Int16: Int16Array, Int32: Int32Array};
+    var lon = tableau(d.lon, Float32Array), lat = tableau(d.lat, Float32Array);
+    var changements = tableau(d.changements, Uint32Array);
+    var ecarts = tableau(d.ecarts, types[d.type_ecarts]), valeurs = tableau(d.valeurs, types[d.type_valeurs]);
+    // Position du premier écart de chaque image
+    var debuts = new Uint32Array(changements.length + 1);
+    for (var i = 0; i < changements.length; i++) debuts[i + 1] = debuts[i] + changements[i];
+    var courant = new Int32Array(lon.length), image = -1;
+
+    function appliquer(k) {
+        var c = 0;
+        for (var j = debuts[k]; j < debuts[k + 1]; j++) { c += ecarts[j]; courant[c] += valeurs[j]; }
+    }
+    function afficher(k) {
+        if (k < image) { courant.fill(0); image = -1; }
+        while (image < k) { image++; appliquer(image); }
+        var points = [];
+        for (var c = 0; c < courant.length; c++) {
+            if (courant[c] > 0) points.push([lat[c], lon[c], Math.sqrt(courant[c] / d.maximum)]);
+        }
+        chaleur.setLatLngs(points);
+        curseur.value = k;
+        etiquette.innerHTML = d.etiquettes[k] + " &middot; " + d.totaux[k].toLocaleString("fr-FR") + " feux";
+    }
+
+    var controle = L.control({position: "bottomleft"});
+    var curseur, etiquette, bouton, minuterie = null;
+    controle.onAdd = function() {
+        var div = L.DomUtil.create("div");
+        div.style.cssText = "background: rgba(0,0,0,0.8); color: #e8d8c8; padding: 10px 14px; border-radius: 10px; font-family: Arial; min-width: 320px;";
+        div.innerHTML = '<button style="background: #ff6b35; color: white; border: none; border-radius: 6px; padding: 4px 10px; cursor: pointer;">▶</button> '
+            + '<span style="color: #ff6b35; font-weight: bold;"></span><br>'
+            + '<input type="range" min="0" step="1" style="width: 100%;">';
+        bouton = div.querySelector("button");
+        etiquette = div.querySelector("span");
+        curseur = div.querySelector("input");
+        curseur.max = d.etiquettes.length - 1;
+        L.DomEvent.disableClickPropagation(div);
+        curseur.addEventListener("input", function() { afficher(parseInt(curseur.value)); });
+        bouton.addEventListener("click", function() {
+            if (minuterie) { clearInterval(minuterie); minuterie = null; bouton.innerHTML = "▶"; return; }
+            bouton.innerHTML = "⏸";
+            minuterie = setInterval(function() { afficher((image + 1) % d.etiquettes.length); }, {{ this.duree }});
+        });
+        return div;
+    };
+    controle.addTo(carte);
+    afficher(0);
+})();
+"""
+
+
+def carte_animee(encodage, centre, zoom, duree=DUREES["annee"]):
+    """Carte folium jouant les images de `encodage` dans le navigateur (lecture, pause, curseur)."""
+    import folium
+    from branca.element import MacroElement
+    from folium.plugins import HeatMap
+    from jinja2 import Template
+
+    class Animation(MacroElement):
+        _template = Template("{% macro script(this, kwargs) %}" + _SCRIPT + "{% endmacro %}")
+
+        def __init__(self, chaleur):
+            super().__init__()
+            self.chaleur = chaleur
+            self.donnees = json.dumps(encodage)
+            self.duree = int(duree)
+
+    m = folium.Map(location=centre, zoom_start=zoom, tiles="CartoDB dark_matter", control_scale=True)
+    chaleur = HeatMap(
+        [],
+        radius=25,
+        blur=20,
+        min_opacity=0.3,
+        gradient={0.2: "#ffcc00", 0.4: "#ff9900", 0.6: "#ff6b35", 0.8: "#ff3300", 1: "#cc0000"}
+    )
+    chaleur.add_to(m)
+    Animation(chaleur).add_to(m)
+    return m
@@ -0,0 +1,184 @@
+"""Cache persistant des résultats, partagé par tous les processus Streamlit.
+
+`st.cache_data` vit dans la mémoire d'un processus : chaque worker derrière le
+proxy, et chaque redémarrage, recalcule tout. Ce cache SQLite sur disque le
+complète : un résultat calculé par un worker est relu par les autres et survit
+aux déploiements.
+
+- clé = empreinte (contenu des données + code de `pyroviz`, et de la page pour
+  les entrées qu'elle construit) + nom + paramètres ;
+  une nouvelle base ou un nouveau code invalident donc les anciennes entrées ;
+- valeurs sérialisées par pickle (DataFrames, HTML de carte, figures) ;
+- accès concurrents : mode WAL et délai d'attente sur verrou, une connexion
+  par thread ;
+- éviction par taille : au-delà de `TAILLE_MAX`, les entrées d'une ancienne
+  empreinte puis les moins récemment utilisées sont supprimées.
+"""
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from pyroviz.donnees import CHEMIN_INCENDIES, DATA_DIR
+from pyroviz.meteo import CHEMIN_METEO
+
+CHEMIN_CACHE = Path(os.environ.get("PYROVIZ_CACHE", DATA_DIR / "cache" / "resultats.sqlite"))
+TAILLE_MAX = int(os.environ.get("PYROVIZ_CACHE_MAX_MO", 512)) * 1024 * 1024
+# Ne pas réécrire la date d'utilisation à chaque lecture (écritures concurrentes)
+DELAI_TOUCHE = 60
+DELAI_VERROU = 30
+
+SOURCES = [CHEMIN_INCENDIES, CHEMIN_METEO, *sorted(DATA_DIR.glob("SHP_meteo.*"))]
+
+_empreintes = {}
+
+
+# =====================
+# EMPREINTE
+# =====================
+def _hash_fichier(chemin):
+    """Hash du contenu, mémorisé tant que taille et date de modification sont inchangées."""
+    etat = chemin.stat()
+    signature = (str(chemin), etat.st_size, etat.st_mtime_ns)
+    if signature not in _empreintes:
+        h = hashlib.blake2b(digest_size=16)
+        with open(chemin, "rb") as f:
+            for bloc in iter(lambda: f.read(1 << 20), b""):
+                h.update(bloc)
+        _empreintes[signature] = h.hexdigest()
+    return _empreintes[signature]
+
+
+def empreinte(sources=None, code=()):
+    """Empreinte des données sources et du code des moteurs de calcul.
+
+    Fondée sur le contenu et non sur les dates : un redéploiement à l'identique
+    retrouve le cache, une modification des données ou de `pyroviz` l'invalide.
+    `code` ajoute d'autres fichiers source, par exemple la page qui construit
+    une entrée (HTML de carte) : la modifier invalide ses entrées.
+    """
+    code = [*sorted(Path(__file__).resolve().parent.glob("*.py")), *code]
+    h = hashlib.blake2b(digest_size=16)
+    for chemin in [*(SOURCES if sources is None else sources), *code]:
+        chemin = Path(chemin)
+        if chemin.exists():
+            h.update(chemin.name.encode())
+            h.update(_hash_fichier(chemin).encode())
+    return h.hexdigest()
+
+
+# =====================
+# CACHE SQLITE
+# =====================
+class CacheDisque:
+    """Stockage clé -> valeur picklée dans SQLite, sûr entre processus et threads."""
+
+    def __init__(self, chemin=CHEMIN_CACHE, taille_max=TAILLE_MAX):
+        self.chemin = Path(chemin)
+        self.taille_max = taille_max
+        self._local = threading.local()
+        self.chemin.parent.mkdir(parents=True, exist_ok=True)
+        with self._connexion() as cnx:
+            cnx.execute(
+                "CREATE TABLE IF NOT EXISTS entrees ("
+                " cle TEXT PRIMARY KEY, empreinte TEXT NOT NULL, valeur BLOB NOT NULL,"
+                " taille INTEGER NOT NULL, cree REAL NOT NULL, utilise REAL NOT NULL)"
+            )
+            cnx.execute("CREATE INDEX IF NOT EXISTS entrees_utilise ON entrees (utilise)")
+
+    def _connexion(self):
+        cnx = getattr(self._local, "cnx", None)
+        if cnx is None:
+            cnx = sqlite3.connect(self.chemin, timeout=DELAI_VERROU, isolation_level=None)
+            cnx.execute("PRAGMA journal_mode=WAL")
+            cnx.execute("PRAGMA synchronous=NORMAL")
+            self._local.cnx = cnx
+        return cnx
+
+    @staticmethod
+    def cle(empreinte_donnees, nom, params):
+        texte = json.dumps([empreinte_donnees, nom, params], sort_keys=True, default=str)
+        return hashlib.sha256(texte.encode("utf-8")).hexdigest()
+
+    def lire(self, cle):
+        """`(True, valeur)` si la clé est en cache, sinon `(False, None)`."""
+        cnx = self._connexion()
+        ligne = cnx.execute("SELECT valeur, utilise FROM entrees WHERE cle = ?", (cle,)).fetchone()
+        if ligne is None:
+            return False, None
+        maintenant = time.time()
+        if maintenant - ligne[1] > DELAI_TOUCHE:
+            cnx.execute("UPDATE entrees SET utilise = ? WHERE cle = ?", (maintenant, cle))
+        return True, pickle.loads(ligne[0])
+
+    def ecrire(self, cle, empreinte_donnees, valeur):
+        contenu = pickle.dumps(valeur, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(contenu) > self.taille_max:
+            return
+        maintenant = time.time()
+        cnx = self._connexion()
+        cnx.execute(
+            "INSERT OR REPLACE INTO entrees VALUES (?, ?, ?, ?, ?, ?)",
+            (cle, empreinte_donnees, contenu, len(contenu), maintenant, maintenant),
+        )
+        self.evincer(empreinte_donnees)
+
+    def taille(self):
+        return self._connexion().execute("SELECT COALESCE(SUM(taille), 0) FROM entrees").fetchone()[0]
+
+    def evincer(self, empreinte_courante=None):
+        """Ramène le cache sous `taille_max` : anciennes empreintes d'abord, puis LRU."""
+        cnx = self._connexion()
+        cnx.execute("BEGIN IMMEDIATE")
+        try:
+            # Taille relue sous le verrou d'écriture : un autre processus a pu évincer entre-temps
+            exces = self.taille() - self.taille_max
+            if exces <= 0:
+                cnx.execute("COMMIT")
+                return
+            lignes = cnx.execute(
+                "SELECT cle, taille FROM entrees ORDER BY (empreinte = ?), utilise",
+                (empreinte_courante,),
+            ).fetchall()
+            supprimees = []
+            for cle, taille in lignes:
+                if exces <= 0:
+                    break
+                supprimees.append((cle,))
+                exces -= taille
+            cnx.executemany("DELETE FROM entrees WHERE cle = ?", supprimees)
+            cnx.execute("COMMIT")
+        except BaseException:
+            cnx.execute("ROLLBACK")
+            raise
+
+    def vider(self):
+        self._connexion().execute("DELETE FROM entrees")
+
+    def memoiser(self, nom, params, calcul, empreinte_donnees=None, code=()):
+        """Valeur de `calcul()` pour `(nom, params)`, relue du disque si déjà calculée.
+
+        `code` : fichiers source hors de `pyroviz` dont dépend le calcul (voir `empreinte`).
+        """
+        empreinte_donnees = empreinte_donnees or empreinte(code=code)
+        cle = self.cle(empreinte_donnees, nom, params)
+        trouve, valeur = self.lire(cle)
+        if not trouve:
+            valeur = calcul()
+            self.ecrire(cle, empreinte_donnees, valeur)
+        return valeur
+
+
+_cache = None
+
+
+def cache_disque():
+    """Cache partagé du processus (ouvert au premier appel)."""
+    global _cache
+    if _cache is None:
+        _cache = CacheDisque()
+    return _cache
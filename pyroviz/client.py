@@ -0,0 +1,56 @@
+"""Accès des pages aux données : base partagée et requêtes d'agrégation.
+
+Une requête est relue du cache disque partagé (`pyroviz.cache`), sinon
+demandée au service local d'agrégation (`pyroviz.service`) si `PYROVIZ_SERVICE`
+est défini, ou calculée sur place sur la base chargée par le processus.
+"""
+import json
+import os
+import urllib.request
+
+import streamlit as st
+
+from pyroviz.cache import cache_disque
+from pyroviz.donnees import charger_incendies
+from pyroviz.index import indexer
+from pyroviz.requetes import deserialiser, executer
+
+# Adresse du service, ex. http://127.0.0.1:8765 ; vide = calcul dans la page
+SERVICE_URL = os.environ.get("PYROVIZ_SERVICE", "")
+DELAI = 60
+
+
+def interroger(nom, url=None, **params):
+    """Exécute la requête `nom` sur le service et renvoie le DataFrame résultat."""
+    corps = json.dumps({"nom": nom, "params": params}).encode("utf-8")
+    demande = urllib.request.Request(
+        f"{(url or SERVICE_URL).rstrip('/')}/requete",
+        data=corps,
+        headers={"Content-Type": "application/json"},
+    )
+    with urllib.request.urlopen(demande, timeout=DELAI) as reponse:
+        return deserialiser(json.load(reponse)["resultat"])
+
+
+# =====================
+# ACCÈS DES PAGES
+# =====================
+@st.cache_resource
+def load_incendie_data():
+    """Base PACA validée et nettoyée à l'ingestion (pyroviz.donnees).
+
+    Partagée telle quelle entre reruns, sessions et pages (pas de copie comme
+    avec st.cache_data) : elle ne doit jamais être modifiée. Indexée par bitmaps
+    pour les filtres (pyroviz.index)."""
+    return indexer(charger_incendies())
+
+
+@st.cache_data
+def requete(nom, **params):
+    """Agrégation relue du cache disque partagé, sinon demandée au service local
+    (PYROVIZ_SERVICE) ou calculée sur place"""
+    def calcul():
+        if SERVICE_URL:
+            return interroger(nom, **params)
+        return executer(load_incendie_data(), nom, **params)
+    return cache_disque().memoiser(nom, params, calcul)
@@ -0,0 +1,129 @@
+"""Index des communes et agrégats par commune pour les comparaisons.
+
+L'index est trié une fois sur les noms normalisés (minuscules, sans accents ni
+ponctuation) ; une recherche par préfixe se résout par deux recherches
+dichotomiques. Chaque mot du nom est indexé, de sorte que « tropez » retrouve
+Saint-Tropez, et les codes INSEE sont indexés de la même façon.
+"""
+import re
+import unicodedata
+import weakref
+
+import numpy as np
+import pandas as pd
+
+LIMITE_RESULTATS = 20
+
+
+# =====================
+# NORMALISATION
+# =====================
+def normaliser(texte):
+    """Minuscules sans accents, ponctuation remplacée par des espaces."""
+    texte = unicodedata.normalize("NFKD", str(texte))
+    texte = "".join(c for c in texte if not unicodedata.combining(c)).lower()
+    return re.sub(r"[^a-z0-9]+", " ", texte).strip()
+
+
+# =====================
+# INDEX
+# =====================
+def construire_index(df):
+    """Index trié des communes présentes dans les données.
+
+    Retourne un DataFrame `(cle, code_insee, commune, departement, nb_incendies)`
+    trié par `cle`, avec une entrée par mot du nom et une pour le code INSEE.
+    """
+    communes = (
+        df.groupby("code_insee")
+        .agg(commune=("commune", "first"), departement=("departement", "first"), nb_incendies=("commune", "size"))
+        .reset_index()
+    )
+
+    entrees = []
+    noms = communes["commune"].map(normaliser)
+    mots = noms.str.split(" ")
+    for position in range(int(mots.str.len().max())):
+        # Suffixe du nom à partir du mot n° position : « saint tropez », puis « tropez »
+        suffixes = mots.map(lambda m: " ".join(m[position:]) if len(m) > position else None)
+        entrees.append(communes.assign(cle=suffixes)[suffixes.notna()])
+    entrees.append(communes.assign(cle=communes["code_insee"].astype(str)))
+
+    index = pd.concat(entrees, ignore_index=True)
+    return index.sort_values(["cle", "nb_incendies"], ascending=[True, False]).reset_index(drop=True)
+
+
+_cles = {}
+
+
+def cles_index(index):
+    """Clés triées de `index` en tableau NumPy (converties une fois, tant que l'index vit)."""
+    cles = _cles.get(id(index))
+    if cles is None or len(cles) != len(index):
+        cles = index["cle"].to_numpy(dtype=object)
+        if id(index) not in _cles:
+            weakref.finalize(index, _cles.pop, id(index), None)
+        _cles[id(index)] = cles
+    return cles
+
+
+def rechercher(index, requete, limite=LIMITE_RESULTATS):
+    """Communes dont un mot du nom (ou le code INSEE) commence par `requete`.
+
+    Sans requête, renvoie les communes les plus touchées. Les résultats sont
+    dédoublonnés et classés par nombre d'incendies décroissant.
+    """
+    prefixe = normaliser(requete)
+    if not prefixe:
+        resultats = index.drop_duplicates("code_insee")
+    else:
+        cles = cles_index(index)
+        debut = np.searchsorted(cles, prefixe, side="left")
+        fin = np.searchsorted(cles, prefixe + "\uffff", side="left")
+        resultats = index.iloc[debut:fin].drop_duplicates("code_insee")
+    resultats = resultats.sort_values("nb_incendies", ascending=False).head(limite)
+    return resultats[["code_insee", "commune", "departement", "nb_incendies"]].reset_index(drop=True)
+
+
+# =====================
+# AGRÉGATS PAR COMMUNE
+# =====================
+def cube_communes(df):
+    """Nombre d'incendies et surface brûlée par commune, année et mois.
+
+    Toutes les vues de comparaison (départements ou communes) se déduisent de ce
+    cube par simple filtrage et sommation.
+    """
+    return (
+        df.groupby(["departement", "code_insee", "annee", "mois"], observed=True)
+        .agg(nb_incendies=("surface_brulee", "size"), surface_brulee=("surface_brulee", "sum"))
+        .reset_index()
+    )
+
+
+# =====================
+# CENTROÏDES
+# =====================
+def centroides_communes(df, gdf=None):
+    """Position `(lon, lat)` représentative de chaque commune, par code INSEE.
+
+    Le centroïde du polygone communal est utilisé lorsque `gdf` (contours
+    `SHP_meteo`) est fourni ; sinon, ou pour les communes absentes du fond,
+    la médiane des centres de carreaux DFCI des feux de la commune.
+    """
+    from pyroviz.dfci import centres_wgs84
+
+    lon, lat = centres_wgs84(df["DFCI_2"])
+    positions = (
+        pd.DataFrame({"code_insee": df["code_insee"].astype(str).to_numpy(), "lon": lon, "lat": lat})
+        .dropna()
+        .groupby("code_insee")[["lon", "lat"]]
+        .median()
+    )
+    centroides = {code: (round(x, 5), round(y, 5)) for code, x, y in positions.itertuples()}
+
+    if gdf is not None and "insee" in gdf.columns:
+        centres = gdf.to_crs(epsg=2154).centroid.to_crs(epsg=4326)
+        for code, point in zip(gdf["insee"].astype(str), centres):
+            centroides[code] = (round(point.x, 5), round(point.y, 5))
+    return centroides
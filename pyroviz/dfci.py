@@ -0,0 +1,73 @@
+"""Décodage du carroyage DFCI (Défense de la Forêt Contre l'Incendie).
+
+Un code comme `KD42D1` désigne un carré de 2 km : deux lettres pour le carré de
+100 km (abscisse puis ordonnée), deux chiffres pairs pour le carré de 20 km
+(dizaines de km), puis une lettre (abscisse) et un chiffre (ordonnée) pour le
+carré de 2 km. Le carroyage est défini en Lambert II étendu (EPSG:27572) avec
+une origine des ordonnées à 1 500 km. Un éventuel 7e caractère (subdivision du
+carré) est ignoré.
+"""
+import numpy as np
+import pandas as pd
+
+LETTRES_100KM = "ABCDEFGHKLMN"
+LETTRES_2KM = "ABCDEFGHKL"
+MOTIF_DFCI = r"^([A-HK-N])([A-HK-N])([02468])([02468])([A-HK-L])(\d)"
+# Valeurs de remplissage rencontrées dans Prométhée pour un carreau inconnu
+CODES_INCONNUS = ("FF00F0",)
+
+CRS_DFCI = "EPSG:27572"
+TAILLE_CARRE = 2000
+ORIGINE_Y = 1_500_000
+
+
+def decoder_carreaux(codes):
+    """Indices (colonne, ligne) du carré de 2 km désigné par chaque code DFCI.
+
+    Les codes ne sont décodés qu'une fois par valeur distincte. Retourne
+    `(colonnes, lignes, valides)` ; les codes non conformes (ancien carroyage
+    départemental, valeurs de remplissage) sont marqués invalides et portent -1.
+    """
+    inverse, valeurs = pd.factorize(pd.Series(codes, dtype="object").fillna(""))
+    valeurs = np.asarray(valeurs, dtype="object")
+    parties = pd.Series(valeurs).astype(str).str.upper().str.extract(MOTIF_DFCI)
+    conformes = parties.notna().all(axis=1).to_numpy() & ~np.isin(valeurs, CODES_INCONNUS)
+
+    colonnes = np.full(len(valeurs), -1, dtype=np.int64)
+    lignes = np.full(len(valeurs), -1, dtype=np.int64)
+    if conformes.any():
+        p = parties[conformes]
+        colonnes[conformes] = (
+            p[0].map(LETTRES_100KM.index).to_numpy() * 50
+            + p[2].astype(int).to_numpy() * 5
+            + p[4].map(LETTRES_2KM.index).to_numpy()
+        )
+        lignes[conformes] = (
+            p[1].map(LETTRES_100KM.index).to_numpy() * 50
+            + p[3].astype(int).to_numpy() * 5
+            + p[5].astype(int).to_numpy()
+        )
+
+    inverse = np.asarray(inverse)
+    return colonnes[inverse], lignes[inverse], conformes[inverse]
+
+
+def centres_lambert(colonnes, lignes):
+    """Coordonnées Lambert II étendu (m) du centre des carrés de 2 km."""
+    x = np.asarray(colonnes, dtype=np.float64) * TAILLE_CARRE + TAILLE_CARRE / 2
+    y = ORIGINE_Y + np.asarray(lignes, dtype=np.float64) * TAILLE_CARRE + TAILLE_CARRE / 2
+    return x, y
+
+
+def centres_wgs84(codes):
+    """Longitude et latitude du centre de chaque carreau DFCI (NaN si invalide)."""
+    from pyproj import Transformer
+
+    colonnes, lignes, valides = decoder_carreaux(codes)
+    lon = np.full(len(valides), np.nan)
+    lat = np.full(len(valides), np.nan)
+    if valides.any():
+        x, y = centres_lambert(colonnes[valides], lignes[valides])
+        transformer = Transformer.from_crs(CRS_DFCI, "EPSG:4326", always_xy=True)
+        lon[valides], lat[valides] = transformer.transform(x, y)
+    return lon, lat
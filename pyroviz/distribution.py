@@ -0,0 +1,177 @@
+"""Distribution des tailles de feux : histogrammes logarithmiques, CCDF et queues.
+
+La surface brûlée est dominée par quelques très grands feux : la distribution
+se lit sur des classes de surface logarithmiques (`CLASSES_PAR_DECADE` par
+puissance de 10). Les effectifs sont précalculés une fois par (département,
+année) dans `cube_tailles` ; l'histogramme de n'importe quelle période ou
+sélection de départements est alors une somme de lignes du cube, sans relire
+`surface_brulee`.
+
+Les ajustements travaillent directement sur les effectifs par classe
+(maximum de vraisemblance sur données groupées, Virkar & Clauset 2014) :
+- loi de puissance au-delà de `xmin`, `xmin` choisi par distance de
+  Kolmogorov-Smirnov minimale (méthode de Clauset) ;
+- loi lognormale sur l'ensemble des feux de surface non nulle.
+"""
+import numpy as np
+import pandas as pd
+
+from pyroviz.tendances import erfc
+
+CLASSES_PAR_DECADE = 5
+# 1 m² (plus petite surface saisie) à 100 000 ha ; les extrêmes sont ramenés dans la première / dernière classe
+BORNES = np.logspace(-4, 5, 9 * CLASSES_PAR_DECADE + 1)
+COLONNES_CLASSES = [f"c{i:02d}" for i in range(len(BORNES) - 1)]
+# Effectif minimal de la queue pour ajuster une loi de puissance
+NB_MIN_QUEUE = 50
+ALPHAS = np.linspace(1.05, 4.0, 591)
+
+
+# =====================
+# CLASSES ET CUBE
+# =====================
+def classes(surfaces, bornes=BORNES):
+    """Classe logarithmique de chaque surface ; -1 pour une surface nulle ou manquante."""
+    s = np.asarray(surfaces, dtype=np.float64)
+    indices = np.clip(np.searchsorted(bornes, s, side="right") - 1, 0, len(bornes) - 2)
+    return np.where(s > 0, indices, -1)
+
+
+def cube_tailles(df, bornes=BORNES):
+    """Effectifs par (département, année) : feux de surface nulle (`nuls`) et par classe (`c00`...)."""
+    colonnes = ["departement", "annee", "nuls", *COLONNES_CLASSES[:len(bornes) - 1]]
+    if len(df) == 0:
+        return pd.DataFrame(columns=colonnes)
+    codes, cles = pd.MultiIndex.from_frame(df[["departement", "annee"]]).factorize(sort=True)
+    largeur = len(bornes)  # emplacement 0 : surfaces nulles, puis une colonne par classe
+    plat = codes.astype(np.int64) * largeur + classes(df["surface_brulee"], bornes) + 1
+    effectifs = np.bincount(plat, minlength=len(cles) * largeur).reshape(len(cles), largeur)
+    cube = cles.to_frame(index=False, name=["departement", "annee"])
+    cube[colonnes[2:]] = effectifs
+    return cube
+
+
+def sommer(cube, annees=None, departements=None):
+    """Effectifs par classe d'une période et de départements : somme vectorisée des lignes du cube."""
+    lignes = np.ones(len(cube), dtype=bool)
+    if annees is not None:
+        annee = cube["annee"].to_numpy()
+        lignes &= (annee >= annees[0]) & (annee <= annees[1])
+    if departements is not None:
+        lignes &= cube["departement"].isin(departements).to_numpy()
+    colonnes = [c for c in cube.columns if c in COLONNES_CLASSES]
+    return cube.loc[lignes, colonnes].to_numpy(dtype=np.float64).sum(axis=0)
+
+
+def ccdf(comptes):
+    """P(X >= borne inférieure de chaque classe), depuis les effectifs par classe."""
+    comptes = np.asarray(comptes, dtype=np.float64)
+    total = comptes.sum()
+    if total == 0:
+        return np.zeros_like(comptes)
+    return np.cumsum(comptes[::-1])[::-1] / total
+
+
+def densite(comptes, bornes=BORNES):
+    """Histogramme normalisé par la largeur des classes (feux par ha), lisible en log-log."""
+    return np.asarray(comptes, dtype=np.float64) / np.diff(bornes)
+
+
+# =====================
+# AJUSTEMENTS
+# =====================
+def _survie_normale(u):
+    """P(Z >= u) pour une loi normale centrée réduite."""
+    u = np.asarray(u, dtype=np.float64)
+    demi = 0.5 * erfc(np.abs(u) / np.sqrt(2.0))
+    return np.where(u >= 0, demi, 1.0 - demi)
+
+
+def _log_vraisemblance(comptes, probabilites):
+    return np.where(comptes > 0, comptes * np.log(np.maximum(probabilites, 1e-300)), 0.0).sum(axis=-1)
+
+
+def ajuster_loi_puissance(comptes, bornes=BORNES, nb_min=NB_MIN_QUEUE):
+    """Loi de puissance p(x) ∝ x^-alpha au-delà de `xmin`, sur effectifs groupés.
+
+    Pour chaque borne candidate, `alpha` maximise la vraisemblance des classes
+    de la queue ; le `xmin` retenu minimise la distance KS entre CCDF observée
+    et ajustée. Renvoie un dict (alpha, xmin, n_queue, part_queue, ks) ou `None`
+    si aucune queue n'atteint `nb_min` feux.
+    """
+    comptes = np.asarray(comptes, dtype=np.float64)
+    queue = np.cumsum(comptes[::-1])[::-1]
+    meilleur = None
+    for k in np.flatnonzero(queue >= nb_min):
+        if np.count_nonzero(comptes[k:]) < 2:
+            continue
+        # Bornes relatives à xmin ; la dernière classe est ouverte
+        bas = bornes[k:-1] / bornes[k]
+        haut = np.append(bornes[k + 1:-1] / bornes[k], np.inf)
+        exposant = 1.0 - ALPHAS[:, None]
+        probabilites = bas ** exposant - haut ** exposant
+        alpha = ALPHAS[np.argmax(_log_vraisemblance(comptes[k:], probabilites))]
+        ks = np.abs(queue[k:] / queue[k] - bas ** (1.0 - alpha)).max()
+        if meilleur is None or ks < meilleur["ks"]:
+            meilleur = {
+                "alpha": float(alpha), "xmin": float(bornes[k]), "n_queue": int(queue[k]),
+                "part_queue": float(queue[k] / queue[0]), "ks": float(ks),
+            }
+    return meilleur
+
+
+def ajuster_lognormale(comptes, bornes=BORNES, xmin=None):
+    """Loi lognormale (mu, sigma de ln x) sur effectifs groupés.
+
+    Départ par les moments des logarithmes (correction de Sheppard), puis
+    maximum de vraisemblance sur une grille raffinée. `ks` compare les CCDF
+    sur toute la distribution, ou sur la queue conditionnelle au-delà de
+    `xmin` s'il est donné (comparable à la loi de puissance). Renvoie un dict
+    (mu, sigma, mediane_ha, ks) ou `None` sans feu.
+    """
+    comptes = np.asarray(comptes, dtype=np.float64)
+    total = comptes.sum()
+    if total == 0:
+        return None
+    logs = np.log(bornes)
+    centres = (logs[:-1] + logs[1:]) / 2
+    pas = logs[1] - logs[0]
+    mu = (comptes * centres).sum() / total
+    sigma = np.sqrt(max((comptes * (centres - mu) ** 2).sum() / total - pas ** 2 / 12, pas ** 2))
+
+    # Première et dernière classes ouvertes, comme dans `classes`
+    bas = np.concatenate([[-np.inf], logs[1:-1]])
+    haut = np.concatenate([logs[1:-1], [np.inf]])
+    etendue_mu, etendue_sigma = sigma, sigma / 2
+    for _ in range(4):
+        grille_mu = np.linspace(mu - etendue_mu, mu + etendue_mu, 41)[:, None, None]
+        grille_sigma = np.linspace(max(sigma - etendue_sigma, 1e-3), sigma + etendue_sigma, 41)[None, :, None]
+        probabilites = _survie_normale((bas - grille_mu) / grille_sigma) - _survie_normale((haut - grille_mu) / grille_sigma)
+        i, j = np.unravel_index(np.argmax(_log_vraisemblance(comptes, probabilites)), probabilites.shape[:2])
+        mu, sigma = float(grille_mu[i, 0, 0]), float(grille_sigma[0, j, 0])
+        etendue_mu, etendue_sigma = etendue_mu / 10, etendue_sigma / 10
+
+    observee = ccdf(comptes)
+    ajustee = _survie_normale((logs[:-1] - mu) / sigma)
+    if xmin is not None:
+        k = int(np.searchsorted(bornes, xmin))
+        observee, ajustee = observee[k:] / observee[k], ajustee[k:] / ajustee[k]
+    return {
+        "mu": mu, "sigma": sigma, "mediane_ha": float(np.exp(mu)),
+        "ks": float(np.abs(observee - ajustee).max()),
+    }
+
+
+# =====================
+# COURBES AJUSTÉES
+# =====================
+def ccdf_loi_puissance(x, ajustement):
+    """P(X >= x) de la loi de puissance ajustée, rapportée à l'ensemble des feux (x >= xmin)."""
+    x = np.asarray(x, dtype=np.float64)
+    return ajustement["part_queue"] * (x / ajustement["xmin"]) ** (1.0 - ajustement["alpha"])
+
+
+def ccdf_lognormale(x, ajustement):
+    """P(X >= x) de la loi lognormale ajustée."""
+    x = np.asarray(x, dtype=np.float64)
+    return _survie_normale((np.log(x) - ajustement["mu"]) / ajustement["sigma"])
@@ -0,0 +1,243 @@
+"""Chargement et validation de la base Prométhée, partagés par les pages et le service.
+
+La base brute est validée et nettoyée une seule fois, à l'ingestion : le
+résultat est écrit à côté de la source (`<source>_propres.parquet`, soit
+`incendies_propres.parquet`) avec un rapport de validation
+(`<source>_validation.json`). Les chargements suivants relisent directement
+l'artefact tant que la source n'a pas changé ; chaque source a le sien.
+
+    python -m pyroviz.donnees          # (re)construit l'artefact et affiche le rapport
+"""
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from pyroviz.localisation import SANS_COMMUNE, charger_communes, rattacher_carreaux
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DATA_DIR = BASE_DIR / "data"
+CHEMIN_INCENDIES = DATA_DIR / "incendies" / "incendies.parquet"
+CHEMIN_COMMUNES = DATA_DIR / "SHP_meteo.shp"
+
+DEPARTEMENTS_PACA = ["04", "05", "06", "13", "83", "84"]
+
+COLONNES = {
+    'Année': 'annee',
+    'Département': 'departement',
+    'Code INSEE': 'code_insee',
+    'Commune': 'commune',
+    'mois': 'mois',
+    'surf_ha': 'surface_brulee',
+    'Surface parcourue (m2)': 'surface_m2'
+}
+
+# Version du schéma de l'artefact (rapport) : un changement force sa reconstruction
+VERSION_ARTEFACT = 2
+
+# Écart toléré entre surf_ha et Surface parcourue (m2) / 10 000 (ha, relatif)
+TOLERANCE_SURFACE = 0.01
+EXEMPLES_RAPPORT = 20
+
+
+# =====================
+# ARTEFACTS PAR SOURCE
+# =====================
+def chemin_propres(source):
+    """Artefact nettoyé de `source`, rangé à côté d'elle."""
+    source = Path(source)
+    return source.with_name(f"{source.stem}_propres.parquet")
+
+
+def chemin_rapport(cible):
+    """Rapport de validation associé à l'artefact nettoyé `cible`."""
+    cible = Path(cible)
+    return cible.with_name(f"{cible.stem.removesuffix('_propres')}_validation.json")
+
+
+CHEMIN_PROPRES = chemin_propres(CHEMIN_INCENDIES)
+CHEMIN_RAPPORT = chemin_rapport(CHEMIN_PROPRES)
+
+
+# =====================
+# VALIDATION
+# =====================
+def valider(brut, communes=None):
+    """Valide et nettoie la base brute en une passe vectorisée.
+
+    Règles appliquées (dans cet ordre) :
+    - lignes sans année ou sans département écartées ;
+    - départements hors PACA écartés ;
+    - doublons de `Numéro` dans une même année écartés (première occurrence gardée) ;
+    - mois hors 1–12 considérés comme manquants, mois manquants mis à 1 ;
+    - surface en ha complétée depuis les m² (et inversement), sinon mise à 0 ;
+    - écarts entre `surf_ha` et `Surface parcourue (m2)` signalés, `surf_ha` faisant foi ;
+    - si les contours `communes` (GeoDataFrame `SHP_meteo`) sont fournis, chaque
+      feu est rattaché à la commune contenant son carreau DFCI (`commune_dfci`,
+      indice de ligne dans `communes`, -1 sinon) ; un code INSEE manquant en est
+      déduit, un code incohérent est signalé.
+
+    Renvoie `(df, rapport)` : la base nettoyée et un dict JSON décrivant chaque contrôle.
+    """
+    df = brut.rename(columns=COLONNES)
+    n = len(df)
+
+    sans_cle = (df["annee"].isna() | df["departement"].isna()).to_numpy()
+    hors_paca = ~sans_cle & ~df["departement"].astype(str).isin(DEPARTEMENTS_PACA).to_numpy()
+    candidats = ~sans_cle & ~hors_paca
+
+    numero = df["Numéro"].to_numpy() if "Numéro" in df.columns else np.full(n, np.nan)
+    doublon = np.zeros(n, dtype=bool)
+    avec_numero = candidats & ~pd.isna(numero)
+    doublon[avec_numero] = pd.DataFrame({
+        "annee": df["annee"].to_numpy()[avec_numero],
+        "numero": numero[avec_numero],
+    }).duplicated().to_numpy()
+    garde = candidats & ~doublon
+
+    mois = df["mois"].to_numpy(dtype=float)
+    mois_manquant = np.isnan(mois)
+    mois_hors_plage = ~mois_manquant & ((mois < 1) | (mois > 12) | (mois != np.floor(mois)))
+
+    ha = df["surface_brulee"].to_numpy(dtype=float)
+    m2 = df["surface_m2"].to_numpy(dtype=float) if "surface_m2" in df.columns else np.full(n, np.nan)
+    deux = ~np.isnan(ha) & ~np.isnan(m2)
+    ecart = np.abs(ha - m2 / 1e4)
+    incoherent = deux & (ecart > TOLERANCE_SURFACE * np.maximum(1.0, np.abs(ha)))
+    ha_depuis_m2 = np.isnan(ha) & ~np.isnan(m2)
+    m2_depuis_ha = np.isnan(m2) & ~np.isnan(ha)
+    sans_surface = np.isnan(ha) & np.isnan(m2)
+
+    # Nettoyage des lignes retenues
+    propre = df[garde].copy()
+    g_mois = np.where(mois_hors_plage | mois_manquant, 1.0, mois)[garde]
+    propre["annee"] = propre["annee"].astype(int)
+    propre["mois"] = g_mois.astype(int)
+    propre["surface_brulee"] = np.where(ha_depuis_m2, m2 / 1e4, ha)[garde]
+    propre["surface_brulee"] = propre["surface_brulee"].fillna(0)
+    if "surface_m2" in propre.columns:
+        propre["surface_m2"] = np.where(m2_depuis_ha, ha * 1e4, m2)[garde]
+    propre["departement"] = propre["departement"].astype(str).str.zfill(2)
+
+    # Rattachement DFCI -> commune (masques ramenés à toutes les lignes pour le rapport)
+    insee_depuis_dfci = np.zeros(n, dtype=bool)
+    insee_incoherent = np.zeros(n, dtype=bool)
+    if communes is not None and "DFCI_2" in propre.columns:
+        commune_dfci = rattacher_carreaux(propre["DFCI_2"], communes)
+        if "insee" in communes.columns:
+            rattache = commune_dfci >= 0
+            insee_dfci = communes["insee"].astype(str).to_numpy()[np.where(rattache, commune_dfci, 0)]
+            code = propre["code_insee"]
+            manquant = code.isna().to_numpy() & rattache
+            discordant = code.notna().to_numpy() & rattache & (code.astype(str).to_numpy() != insee_dfci)
+            propre.loc[manquant, "code_insee"] = insee_dfci[manquant]
+            if "nom" in communes.columns:
+                propre.loc[manquant, "commune"] = communes["nom"].to_numpy()[commune_dfci[manquant]]
+            insee_depuis_dfci[garde] = manquant
+            insee_incoherent[garde] = discordant
+    else:
+        commune_dfci = np.full(len(propre), SANS_COMMUNE, dtype=np.int32)
+    propre["commune_dfci"] = commune_dfci
+
+    def _exemples(masque):
+        lignes = df.loc[masque, ["annee", "Numéro", "departement", "commune"]].head(EXEMPLES_RAPPORT)
+        return json.loads(lignes.to_json(orient="records", force_ascii=False))
+
+    rapport = {
+        "lignes_source": n,
+        "lignes_propres": int(garde.sum()),
+        "controles": {
+            "sans_annee_ou_departement": {"lignes": int(sans_cle.sum()), "action": "écartées"},
+            "hors_paca": {"lignes": int(hors_paca.sum()), "action": "écartées"},
+            "doublons_numero_annee": {
+                "lignes": int(doublon.sum()), "action": "écartées (première occurrence gardée)",
+                "exemples": _exemples(doublon),
+            },
+            "mois_manquant": {"lignes": int((mois_manquant & garde).sum()), "action": "mis à 1"},
+            "mois_hors_plage": {
+                "lignes": int((mois_hors_plage & garde).sum()), "action": "mis à 1",
+                "exemples": _exemples(mois_hors_plage & garde),
+            },
+            "surface_incoherente": {
+                "lignes": int((incoherent & garde).sum()), "action": "surf_ha conservée",
+                "ecart_max_ha": float(ecart[incoherent & garde].max()) if (incoherent & garde).any() else 0.0,
+                "exemples": _exemples(incoherent & garde),
+            },
+            "surface_ha_depuis_m2": {"lignes": int((ha_depuis_m2 & garde).sum()), "action": "m² / 10 000"},
+            "surface_m2_depuis_ha": {"lignes": int((m2_depuis_ha & garde).sum()), "action": "ha × 10 000"},
+            "sans_surface": {"lignes": int((sans_surface & garde).sum()), "action": "mise à 0"},
+            "hors_commune_dfci": {
+                "lignes": int((commune_dfci < 0).sum()),
+                "action": "commune_dfci = -1" if communes is not None else "fond communal absent, non rattachées",
+            },
+            "code_insee_depuis_dfci": {"lignes": int(insee_depuis_dfci.sum()), "action": "commune du carreau DFCI"},
+            "code_insee_incoherent_dfci": {
+                "lignes": int(insee_incoherent.sum()), "action": "Code INSEE conservé",
+                "exemples": _exemples(insee_incoherent),
+            },
+        },
+    }
+    return propre, rapport
+
+
+# =====================
+# ARTEFACT NETTOYÉ
+# =====================
+def preparer(source=CHEMIN_INCENDIES, cible=None, chemin_communes=CHEMIN_COMMUNES):
+    """Valide la source, écrit la base nettoyée et le rapport ; renvoie `(df, rapport)`.
+
+    Sans `cible`, l'artefact est rangé à côté de la source (`chemin_propres`).
+    """
+    propre, rapport = valider(pd.read_parquet(source), charger_communes(chemin_communes))
+    rapport["source"] = Path(source).name
+    rapport["version"] = VERSION_ARTEFACT
+    rapport["genere_le"] = datetime.now().isoformat(timespec="seconds")
+
+    # Écriture atomique : plusieurs processus (pages, service) peuvent préparer en même temps
+    cible = Path(cible) if cible is not None else chemin_propres(source)
+    temporaire = cible.with_suffix(f".{os.getpid()}.tmp")
+    propre.to_parquet(temporaire, index=False)
+    os.replace(temporaire, cible)
+    rapport_json = chemin_rapport(cible)
+    temporaire = rapport_json.with_suffix(f".{os.getpid()}.tmp")
+    temporaire.write_text(json.dumps(rapport, ensure_ascii=False, indent=2), encoding="utf-8")
+    os.replace(temporaire, rapport_json)
+    return propre, rapport
+
+
+def artefact_a_jour(source=CHEMIN_INCENDIES, cible=None, chemin_communes=CHEMIN_COMMUNES):
+    """Vrai si l'artefact de `source` est au schéma courant, en est issu, et est plus
+    récent qu'elle et que les contours communaux."""
+    cible = Path(cible) if cible is not None else chemin_propres(source)
+    rapport_json = chemin_rapport(cible)
+    if not cible.exists() or not rapport_json.exists():
+        return False
+    rapport = json.loads(rapport_json.read_text(encoding="utf-8"))
+    if rapport.get("version") != VERSION_ARTEFACT or rapport.get("source") != Path(source).name:
+        return False
+    dependances = [Path(source), *Path(chemin_communes).parent.glob(Path(chemin_communes).stem + ".*")]
+    return all(cible.stat().st_mtime >= d.stat().st_mtime for d in dependances if d.exists())
+
+
+def charger_incendies(source=CHEMIN_INCENDIES, cible=None):
+    """Base PACA nettoyée : relue depuis l'artefact de `source` (par défaut à côté
+    d'elle), reconstruit s'il est périmé (`artefact_a_jour`)."""
+    if not Path(source).exists():
+        return pd.DataFrame()
+    cible = Path(cible) if cible is not None else chemin_propres(source)
+    if artefact_a_jour(source, cible):
+        return pd.read_parquet(cible)
+    propre, _ = preparer(source, cible)
+    return propre.reset_index(drop=True)
+
+
+def main():
+    _, rapport = preparer()
+    print(json.dumps(rapport, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""Détection des épisodes d'incendies : feux simultanés sur des carreaux voisins.
+
+Deux feux appartiennent au même épisode s'ils touchent le même carreau DFCI
+(ou un des 8 carreaux de 2 km adjacents) à au plus `fenetre_jours` jours
+d'écart ; la relation est rendue transitive. Les feux sans carreau exploitable
+sont rattachés à leur commune (même commune uniquement).
+
+Chaque feu est rangé dans un seau (cellule, jour) repéré par une clé entière.
+Les seaux voisins sont retrouvés par recherche dichotomique sur les clés triées,
+ce qui évite toute comparaison de paires de feux : le coût est quasi linéaire.
+"""
+import numpy as np
+
+from pyroviz.dfci import decoder_carreaux, centres_wgs84
+
+FENETRE_JOURS = 1
+
+# Espacement des clés de cellule : une colonne DFCI vaut _PAS_COLONNE, et les
+# communes sont placées au-delà de la grille, assez espacées pour qu'aucun
+# décalage de voisinage (±1 colonne, ±1 ligne) ne tombe sur une autre commune.
+_PAS_COLONNE = 1 << 12
+_DEBUT_COMMUNES = 1 << 24
+_PAS_COMMUNE = 1 << 13
+
+
+# =====================
+# CLÉS DE CELLULE
+# =====================
+def cles_cellules(df, cle="dfci"):
+    """Clé entière de cellule pour chaque feu et indicateur de voisinage possible.
+
+    Avec `cle="dfci"`, la clé vient du carreau DFCI décodé (repli sur la commune) ;
+    avec `cle="commune"`, seule la commune est utilisée.
+    """
+    _, communes = np.unique(df["code_insee"].astype(str).to_numpy(), return_inverse=True)
+    cellules = _DEBUT_COMMUNES + communes.astype(np.int64) * _PAS_COMMUNE
+    grille = np.zeros(len(df), dtype=bool)
+
+    if cle == "dfci":
+        colonnes, lignes, grille = decoder_carreaux(df["DFCI_2"])
+        cellules = np.where(grille, colonnes * _PAS_COLONNE + lignes, cellules)
+    return cellules, grille
+
+
+def _decalages(fenetre_jours):
+    """Décalages (cellule, jour) vers l'avant : chaque paire de seaux n'est vue qu'une fois."""
+    decalages = []
+    for dt in range(fenetre_jours + 1):
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                if dt == 0 and (dx, dy) <= (0, 0):
+                    continue
+                decalages.append((dx * _PAS_COLONNE + dy, dt))
+    return decalages
+
+
+def _composantes(n, origines, destinations):
+    """Composantes connexes d'un graphe (propagation du plus petit label + compression)."""
+    labels = np.arange(n)
+    if len(origines) == 0:
+        return labels
+    while True:
+        minimum = np.minimum(labels[origines], labels[destinations])
+        nouveaux = labels.copy()
+        np.minimum.at(nouveaux, origines, minimum)
+        np.minimum.at(nouveaux, destinations, minimum)
+        # Compression des chemins : chaque nœud pointe vers le label de son label
+        while True:
+            compresses = nouveaux[nouveaux]
+            if np.array_equal(compresses, nouveaux):
+                break
+            nouveaux = compresses
+        if np.array_equal(nouveaux, labels):
+            return labels
+        labels = nouveaux
+
+
+# =====================
+# DÉTECTION
+# =====================
+def etiqueter_episodes(df, fenetre_jours=FENETRE_JOURS, cle="dfci"):
+    """Numéro d'épisode de chaque feu (-1 si la date d'alerte est inconnue)."""
+    jours_dates = df["Alerte"].to_numpy(dtype="datetime64[D]")
+    dates = ~np.isnat(jours_dates)
+    etiquettes = np.full(len(df), -1, dtype=np.int64)
+    if not dates.any():
+        return etiquettes
+
+    cellules, grille = cles_cellules(df, cle)
+    cellules, grille = cellules[dates], grille[dates]
+    jours = jours_dates[dates].astype(np.int64)
+    jours = jours - jours.min()
+    etendue = int(jours.max()) + fenetre_jours + 2
+
+    seaux, seau_feu = np.unique(cellules * etendue + jours, return_inverse=True)
+    seau_grille = np.zeros(len(seaux), dtype=bool)
+    seau_grille[seau_feu] = grille
+
+    origines, destinations = [], []
+    for dcellule, dt in _decalages(fenetre_jours):
+        candidats = np.flatnonzero(seau_grille) if dcellule != 0 else np.arange(len(seaux))
+        voisines = seaux[candidats] + dcellule * etendue + dt
+        positions = np.searchsorted(seaux, voisines)
+        positions = np.minimum(positions, len(seaux) - 1)
+        trouves = seaux[positions] == voisines
+        origines.append(candidats[trouves])
+        destinations.append(positions[trouves])
+
+    labels = _composantes(len(seaux), np.concatenate(origines), np.concatenate(destinations))
+    _, episodes = np.unique(labels[seau_feu], return_inverse=True)
+    etiquettes[dates] = episodes
+    return etiquettes
+
+
+def resumer_episodes(df, etiquettes):
+    """Table des épisodes : dates, nombre de feux, surface, communes et position.
+
+    Les épisodes sont triés par surface brûlée décroissante ; `lat`/`lon` est le
+    centre moyen des carreaux DFCI valides de l'épisode.
+    """
+    feux = df.loc[etiquettes >= 0, ["Alerte", "departement", "code_insee", "commune", "surface_brulee", "DFCI_2"]].copy()
+    feux["episode"] = etiquettes[etiquettes >= 0]
+    feux["lon"], feux["lat"] = centres_wgs84(feux["DFCI_2"])
+
+    groupes = feux.groupby("episode")
+    episodes = groupes.agg(
+        debut=("Alerte", "min"),
+        fin=("Alerte", "max"),
+        nb_incendies=("Alerte", "size"),
+        surface_brulee=("surface_brulee", "sum"),
+        nb_communes=("code_insee", "nunique"),
+        lat=("lat", "mean"),
+        lon=("lon", "mean"),
+    )
+    # Commune et département du feu le plus étendu de l'épisode
+    principal = feux.loc[groupes["surface_brulee"].idxmax(), ["episode", "commune", "departement"]].set_index("episode")
+    episodes = episodes.join(principal)
+    episodes["annee"] = episodes["debut"].dt.year
+    episodes["duree_heures"] = (episodes["fin"] - episodes["debut"]).dt.total_seconds() / 3600
+    return episodes.sort_values("surface_brulee", ascending=False)
+
+
+def detecter_episodes(df, fenetre_jours=FENETRE_JOURS, cle="dfci"):
+    """Étiquette les feux puis résume les épisodes ; retourne `(etiquettes, episodes)`."""
+    etiquettes = etiqueter_episodes(df, fenetre_jours, cle)
+    return etiquettes, resumer_episodes(df, etiquettes)
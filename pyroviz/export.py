@@ -0,0 +1,169 @@
+"""Export de la sélection courante en CSV, Parquet ou GeoJSON.
+
+Les lignes sont lues par lots (`pyarrow.dataset`) dans l'artefact nettoyé de
+`pyroviz.donnees` — mêmes colonnes et mêmes valeurs que les pages — le filtre
+étant poussé dans le scan ; chaque lot est écrit dans la sortie puis libéré. Aucun DataFrame de la sélection n'est construit :
+la mémoire reste bornée par la taille d'un lot, quel que soit le volume exporté.
+
+Utilisation en ligne de commande :
+
+    python -m pyroviz.export sortie.csv --annees 1973 2022 --departements 13 83
+"""
+import argparse
+import json
+import math
+import tempfile
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pv
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from pyroviz.communes import centroides_communes
+from pyroviz.donnees import CHEMIN_INCENDIES, artefact_a_jour, chemin_propres, preparer
+
+TAILLE_LOT = 65_536
+
+# Format -> (type MIME, extension)
+FORMATS = {
+    "csv": ("text/csv", ".csv"),
+    "parquet": ("application/vnd.apache.parquet", ".parquet"),
+    "geojson": ("application/geo+json", ".geojson"),
+}
+
+
+# =====================
+# SÉLECTION
+# =====================
+def filtre_selection(annees=None, mois=None, departements=None, communes=None):
+    """Expression Arrow équivalente aux filtres des pages (colonnes nettoyées).
+
+    `departements=None` retient toute la région ; une liste vide ne retient rien.
+    """
+    filtre = pc.scalar(True)
+    if departements is not None:
+        filtre &= pc.field("departement").isin(pa.array(list(departements), pa.string()))
+    if annees is not None:
+        filtre &= (pc.field("annee") >= annees[0]) & (pc.field("annee") <= annees[1])
+    if mois is not None:
+        filtre &= pc.field("mois") == mois
+    if communes is not None:
+        filtre &= pc.field("code_insee").isin(pa.array(list(communes), pa.string()))
+    return filtre
+
+
+def artefact(source=CHEMIN_INCENDIES):
+    """Chemin de l'artefact nettoyé de `source`, reconstruit s'il est périmé."""
+    if not artefact_a_jour(source):
+        preparer(source)
+    return chemin_propres(source)
+
+
+def scanner(chemin, filtre=None, taille_lot=TAILLE_LOT):
+    """Scanner Arrow sur le fichier Parquet, filtre appliqué pendant la lecture."""
+    return ds.dataset(chemin, format="parquet").scanner(filter=filtre, batch_size=taille_lot)
+
+
+# =====================
+# ÉCRITURE PAR LOTS
+# =====================
+def ecrire_csv(sortie, scan):
+    writer = pv.CSVWriter(sortie, scan.projected_schema)
+    for lot in scan.to_batches():
+        writer.write_batch(lot)
+    writer.close()
+
+
+def ecrire_parquet(sortie, scan):
+    with pq.ParquetWriter(sortie, scan.projected_schema) as writer:
+        for lot in scan.to_batches():
+            if lot.num_rows > 0:
+                writer.write_batch(lot)
+
+
+def _valeur_json(valeur):
+    if isinstance(valeur, float) and math.isnan(valeur):
+        return None
+    if hasattr(valeur, "isoformat"):
+        return valeur.isoformat()
+    return valeur
+
+
+def ecrire_geojson(sortie, scan, centroides):
+    """FeatureCollection de points placés au centroïde de la commune de chaque feu.
+
+    `centroides` associe un code INSEE à `(lon, lat)` ; un feu dont la commune
+    est inconnue reçoit une géométrie nulle.
+    """
+    sortie.write(b'{"type": "FeatureCollection", "features": [')
+    premier = True
+    for lot in scan.to_batches():
+        morceaux = []
+        for ligne in lot.to_pylist():
+            position = centroides.get(ligne.get("code_insee"))
+            feature = {
+                "type": "Feature",
+                "geometry": {"type": "Point", "coordinates": list(position)} if position else None,
+                "properties": {cle: _valeur_json(v) for cle, v in ligne.items()},
+            }
+            morceaux.append(json.dumps(feature, ensure_ascii=False))
+        if morceaux:
+            sortie.write(((",\n" if not premier else "\n") + ",\n".join(morceaux)).encode("utf-8"))
+            premier = False
+    sortie.write(b"\n]}\n")
+
+
+def exporter(chemin, format_export, sortie, filtre=None, centroides=None, taille_lot=TAILLE_LOT):
+    """Écrit la sélection dans le fichier binaire `sortie` au format demandé."""
+    scan = scanner(chemin, filtre, taille_lot)
+    if format_export == "csv":
+        ecrire_csv(sortie, scan)
+    elif format_export == "parquet":
+        ecrire_parquet(sortie, scan)
+    elif format_export == "geojson":
+        ecrire_geojson(sortie, scan, centroides or {})
+    else:
+        raise ValueError(f"Format d'export inconnu : {format_export}")
+
+
+def exporter_contenu(chemin, format_export, filtre=None, centroides=None):
+    """Contenu du fichier exporté, pour `st.download_button`.
+
+    Le bouton de téléchargement exige le contenu complet : l'export est écrit
+    par lots dans un fichier temporaire puis relu, de sorte que seule la forme
+    sérialisée est tenue en mémoire, jamais une copie tabulaire de la sélection.
+    """
+    with tempfile.TemporaryFile() as sortie:
+        exporter(chemin, format_export, sortie, filtre, centroides)
+        sortie.seek(0)
+        return sortie.read()
+
+
+# =====================
+# LIGNE DE COMMANDE
+# =====================
+def main():
+    parser = argparse.ArgumentParser(description="Export de la base Prométhée filtrée")
+    parser.add_argument("sortie", type=Path, help="fichier de sortie (.csv, .parquet ou .geojson)")
+    parser.add_argument("--source", type=Path, default=CHEMIN_INCENDIES, help="base brute ; l'export lit son artefact nettoyé")
+    parser.add_argument("--annees", type=int, nargs=2, metavar=("DEBUT", "FIN"))
+    parser.add_argument("--mois", type=int)
+    parser.add_argument("--departements", nargs="+")
+    parser.add_argument("--communes", nargs="+")
+    args = parser.parse_args()
+
+    format_export = args.sortie.suffix.lstrip(".").lower()
+    filtre = filtre_selection(args.annees, args.mois, args.departements, args.communes)
+    chemin = artefact(args.source)
+    centroides = None
+    if format_export == "geojson":
+        codes = pq.read_table(chemin, columns=["code_insee", "DFCI_2"])
+        centroides = centroides_communes(codes.to_pandas())
+    with open(args.sortie, "wb") as sortie:
+        exporter(chemin, format_export, sortie, filtre, centroides)
+
+
+if __name__ == "__main__":
+    main()
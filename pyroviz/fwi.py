@@ -0,0 +1,272 @@
+"""Indice Forêt-Météo (IFM / FWI canadien) pour chaque commune et chaque jour.
+
+Les six composantes de Van Wagner (1987) — indices d'humidité FFMC, DMC, DC,
+indices de comportement ISI, BUI et l'indice final FWI — sont calculées à
+partir de l'artefact météo (`pyroviz.meteo`) :
+
+- la récurrence jour après jour est vectorisée sur toutes les clés (communes ou
+  stations) à la fois : une itération par jour, aucune boucle par commune ;
+- les entrées sont d'abord rangées en grilles denses (jour × clé) ;
+- un jour sans température ou humidité laisse les codes inchangés et produit
+  des composantes manquantes (NaN) ; une pluie absente compte pour 0 mm ;
+- le résultat est un tableau float32 (composante × jour × clé) écrit en `.npy`
+  et relu en mémoire partagée (`mmap`), avec un fichier JSON décrivant les clés
+  et le premier jour.
+
+Approximations assumées faute de relevés de 12 h : température maximale (TX),
+humidité moyenne (UM) et vent moyen converti en km/h. Les facteurs de longueur
+du jour sont ceux de la latitude 46° N (tables d'origine), adaptés à la PACA.
+
+    python -m pyroviz.fwi              # (re)calcule data/meteo/fwi.npy
+"""
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from pyroviz.meteo import DOSSIER_METEO, charger_meteo
+
+CHEMIN_FWI = DOSSIER_METEO / "fwi.npy"
+CHEMIN_FWI_INFO = DOSSIER_METEO / "fwi.json"
+COMPOSANTES = ("ffmc", "dmc", "dc", "isi", "bui", "fwi")
+# Codes de démarrage standard
+FFMC_INITIAL, DMC_INITIAL, DC_INITIAL = 85.0, 6.0, 15.0
+# Longueur du jour effective (DMC) et facteur de longueur du jour (DC), par mois
+LE = np.array([6.5, 7.5, 9.0, 12.8, 13.9, 13.9, 12.4, 10.9, 9.4, 8.0, 7.0, 6.0])
+LF = np.array([-1.6, -1.6, -1.6, 0.9, 3.8, 5.8, 6.4, 5.0, 2.4, 0.4, -1.6, -1.6])
+# Seuil de danger « très élevé » des classes EFFIS
+SEUIL_DANGER = 21.3
+
+_memo = {}
+
+
+# =====================
+# ÉQUATIONS (VAN WAGNER 1987)
+# =====================
+def ffmc_suivant(ffmc, t, h, w, p):
+    """Indice d'humidité des combustibles fins du jour."""
+    mo = 147.2 * (101.0 - ffmc) / (59.5 + ffmc)
+    rf = np.maximum(p - 0.5, 1e-6)
+    humecte = mo + 42.5 * rf * np.exp(-100.0 / (251.0 - mo)) * (1.0 - np.exp(-6.93 / rf))
+    humecte += np.where(mo > 150.0, 0.0015 * (mo - 150.0) ** 2 * np.sqrt(rf), 0.0)
+    mo = np.where(p > 0.5, np.minimum(humecte, 250.0), mo)
+
+    ed = 0.942 * h ** 0.679 + 11.0 * np.exp((h - 100.0) / 10.0) + 0.18 * (21.1 - t) * (1.0 - np.exp(-0.115 * h))
+    ew = 0.618 * h ** 0.753 + 10.0 * np.exp((h - 100.0) / 10.0) + 0.18 * (21.1 - t) * (1.0 - np.exp(-0.115 * h))
+    sec, humide = h / 100.0, (100.0 - h) / 100.0
+    kd = (0.424 * (1.0 - sec ** 1.7) + 0.0694 * np.sqrt(w) * (1.0 - sec ** 8)) * 0.581 * np.exp(0.0365 * t)
+    kw = (0.424 * (1.0 - humide ** 1.7) + 0.0694 * np.sqrt(w) * (1.0 - humide ** 8)) * 0.581 * np.exp(0.0365 * t)
+    m = np.where(
+        mo > ed, ed + (mo - ed) * 10.0 ** -kd,
+        np.where(mo < ew, ew - (ew - mo) * 10.0 ** -kw, mo),
+    )
+    return np.clip(59.5 * (250.0 - m) / (147.2 + m), 0.0, 101.0)
+
+
+def dmc_suivant(dmc, t, h, p, mois):
+    """Indice d'humidité de l'humus du jour."""
+    t = np.maximum(t, -1.1)
+    rk = 1.894 * (t + 1.1) * (100.0 - h) * LE[mois - 1] * 1e-4
+    re = 0.92 * p - 1.27
+    mo = 20.0 + np.exp(5.6348 - dmc / 43.43)
+    log_dmc = np.log(np.maximum(dmc, 1e-6))
+    b = np.where(
+        dmc <= 33.0, 100.0 / (0.5 + 0.3 * dmc),
+        np.where(dmc <= 65.0, 14.0 - 1.3 * log_dmc, 6.2 * log_dmc - 17.2),
+    )
+    mr = mo + 1000.0 * re / (48.77 + b * re)
+    apres_pluie = np.maximum(244.72 - 43.43 * np.log(np.maximum(mr - 20.0, 1e-6)), 0.0)
+    return np.where(p > 1.5, apres_pluie, dmc) + rk
+
+
+def dc_suivant(dc, t, p, mois):
+    """Indice de sécheresse du jour."""
+    t = np.maximum(t, -2.8)
+    rd = 0.83 * p - 1.27
+    qr = 800.0 * np.exp(-dc / 400.0) + 3.937 * rd
+    apres_pluie = np.maximum(400.0 * np.log(800.0 / np.maximum(qr, 1e-6)), 0.0)
+    v = np.maximum(0.36 * (t + 2.8) + LF[mois - 1], 0.0)
+    return np.where(p > 2.8, apres_pluie, dc) + 0.5 * v
+
+
+def isi(ffmc, w):
+    """Indice de propagation initiale."""
+    m = 147.2 * (101.0 - ffmc) / (59.5 + ffmc)
+    ff = 91.9 * np.exp(-0.1386 * m) * (1.0 + m ** 5.31 / 4.93e7)
+    return 0.208 * np.exp(0.05039 * w) * ff
+
+
+def bui(dmc, dc):
+    """Indice du combustible disponible."""
+    somme = np.maximum(dmc + 0.4 * dc, 1e-6)
+    u = np.where(
+        dmc <= 0.4 * dc, 0.8 * dmc * dc / somme,
+        dmc - (1.0 - 0.8 * dc / somme) * (0.92 + (0.0114 * dmc) ** 1.7),
+    )
+    return np.maximum(u, 0.0)
+
+
+def fwi(isi_, bui_):
+    """Indice forêt-météo."""
+    fd = np.where(bui_ <= 80.0, 0.626 * bui_ ** 0.809 + 2.0, 1000.0 / (25.0 + 108.64 * np.exp(-0.023 * bui_)))
+    b = 0.1 * isi_ * fd
+    return np.where(b > 1.0, np.exp(2.72 * (0.434 * np.log(np.maximum(b, 1.0))) ** 0.647), b)
+
+
+# =====================
+# CALCUL SUR TOUTE LA PÉRIODE
+# =====================
+def grilles(meteo):
+    """Entrées en grilles denses (jour × clé) float32, NaN les jours sans relevé.
+
+    Renvoie (grilles par variable, clés triées, dates).
+    """
+    cle = "code_insee" if "code_insee" in meteo.columns else "station"
+    codes, cles = pd.factorize(meteo[cle], sort=True)
+    jours = meteo["date"].to_numpy().astype("datetime64[D]").astype(np.int64)
+    debut = jours.min()
+    dates = pd.date_range(pd.Timestamp(np.datetime64(int(debut), "D")), periods=int(jours.max() - debut) + 1)
+    resultat = {}
+    for variable in ("temperature", "humidite", "vent", "precipitations"):
+        grille = np.full((len(dates), len(cles)), np.nan, dtype=np.float32)
+        grille[jours - debut, codes] = meteo[variable].to_numpy(dtype=np.float32)
+        resultat[variable] = grille
+    return resultat, np.asarray(cles, dtype=object), dates
+
+
+def calculer(meteo, sortie=None):
+    """Composantes FWI (composante × jour × clé, float32), écrites dans `sortie` (.npy) si donnée.
+
+    Renvoie (tableau, clés, dates).
+    """
+    entrees, cles, dates = grilles(meteo)
+    forme = (len(COMPOSANTES), len(dates), len(cles))
+    if sortie is None:
+        resultat = np.empty(forme, dtype=np.float32)
+    else:
+        resultat = np.lib.format.open_memmap(sortie, mode="w+", dtype=np.float32, shape=forme)
+
+    ffmc_ = np.full(len(cles), FFMC_INITIAL)
+    dmc_ = np.full(len(cles), DMC_INITIAL)
+    dc_ = np.full(len(cles), DC_INITIAL)
+    mois = dates.month.to_numpy()
+    with np.errstate(all="ignore"):
+        for j in range(len(dates)):
+            t = entrees["temperature"][j].astype(np.float64)
+            h = np.clip(entrees["humidite"][j], 0.0, 100.0).astype(np.float64)
+            w = entrees["vent"][j] * 3.6  # m/s -> km/h
+            w = np.where(np.isnan(w), 0.0, w)
+            p = np.nan_to_num(entrees["precipitations"][j].astype(np.float64))
+            connus = ~(np.isnan(t) | np.isnan(h))
+            # Jours sans relevé : codes reportés tels quels
+            ffmc_ = np.where(connus, ffmc_suivant(ffmc_, t, h, w, p), ffmc_)
+            dmc_ = np.where(connus, dmc_suivant(dmc_, t, h, p, mois[j]), dmc_)
+            dc_ = np.where(connus, dc_suivant(dc_, t, p, mois[j]), dc_)
+            isi_ = isi(ffmc_, w)
+            bui_ = bui(dmc_, dc_)
+            jour = np.stack([ffmc_, dmc_, dc_, isi_, bui_, fwi(isi_, bui_)])
+            resultat[:, j] = np.where(connus, jour, np.nan)
+
+    if sortie is not None:
+        resultat.flush()
+    return resultat, cles, dates
+
+
+def preparer_fwi(meteo=None, cible=CHEMIN_FWI, info=CHEMIN_FWI_INFO):
+    """Calcule et écrit l'artefact FWI depuis l'artefact météo ; `None` sans données météo."""
+    meteo = charger_meteo() if meteo is None else meteo
+    if meteo is None:
+        return None
+    cible, info = Path(cible), Path(info)
+    temporaire = cible.with_suffix(f".{os.getpid()}.tmp.npy")
+    resultat, cles, dates = calculer(meteo, sortie=temporaire)
+    del resultat
+    os.replace(temporaire, cible)
+    info.write_text(json.dumps({
+        "composantes": list(COMPOSANTES),
+        "debut": dates[0].strftime("%Y-%m-%d"),
+        "cles": [str(c) for c in cles],
+    }), encoding="utf-8")
+    return charger_fwi(cible, info)
+
+
+def charger_fwi(chemin=CHEMIN_FWI, info=CHEMIN_FWI_INFO):
+    """(tableau en mmap, clés, dates) de l'artefact FWI, mémorisé ; `None` s'il n'existe pas."""
+    chemin, info = Path(chemin), Path(info)
+    if not (chemin.exists() and info.exists()):
+        return None
+    signature = (str(chemin), chemin.stat().st_mtime_ns, info.stat().st_mtime_ns)
+    if signature not in _memo:
+        _memo.clear()
+        description = json.loads(info.read_text(encoding="utf-8"))
+        tableau = np.load(chemin, mmap_mode="r")
+        dates = pd.date_range(description["debut"], periods=tableau.shape[1])
+        _memo[signature] = (tableau, np.asarray(description["cles"], dtype=object), dates)
+    return _memo[signature]
+
+
+# =====================
+# CLIMATOLOGIE
+# =====================
+def climatologie(annees=None, departements=None, communes=None, composante="fwi", seuil=SEUIL_DANGER):
+    """Moyenne mensuelle d'une composante et part des jours au-delà de `seuil`.
+
+    Par département (2 premiers caractères du code commune ou de l'indicatif
+    de station Météo-France), ou par commune si `communes` est donné. Les
+    moyennes mensuelles par clé sont obtenues par un produit matriciel
+    (mois × jours) @ (jours × clés), puis moyennées sur les clés de chaque entité.
+    """
+    colonnes = ["entite", "mois", f"{composante}_moyen", "part_jours_danger"]
+    artefact = charger_fwi()
+    if artefact is None:
+        return pd.DataFrame(columns=colonnes)
+    tableau, cles, dates = artefact
+    # Jours de la période : tranche contiguë de l'axe des dates
+    periode = np.ones(len(dates), dtype=bool)
+    if annees is not None:
+        periode = (dates.year >= annees[0]) & (dates.year <= annees[1])
+    jours = slice(*np.flatnonzero(periode)[[0, -1]] + [0, 1]) if periode.any() else slice(0, 0)
+    if communes is not None:
+        entites = cles
+        retenues = np.isin(cles, communes)
+    else:
+        entites = np.array([c[:2] for c in cles], dtype=object)
+        retenues = np.isin(entites, departements) if departements is not None else np.ones(len(cles), dtype=bool)
+    if not periode.any() or not retenues.any():
+        return pd.DataFrame(columns=colonnes)
+
+    valeurs = tableau[COMPOSANTES.index(composante), jours][:, retenues]
+    connues = ~np.isnan(valeurs)
+    un_mois = np.equal.outer(np.arange(1, 13), dates.month.to_numpy()[jours]).astype(np.float32)
+    sommes = un_mois @ np.where(connues, valeurs, 0.0)
+    effectifs = un_mois @ connues.astype(np.float32)
+    danger = un_mois @ (valeurs >= seuil).astype(np.float32)
+
+    # Cumul par entité des sommes et effectifs (mois × clé) -> (mois × entité)
+    codes, noms = pd.factorize(entites[retenues], sort=True)
+    par_entite = np.zeros((len(noms), len(cles[retenues])), dtype=np.float32)
+    par_entite[codes, np.arange(len(codes))] = 1.0
+    sommes, effectifs, danger = sommes @ par_entite.T, effectifs @ par_entite.T, danger @ par_entite.T
+    with np.errstate(invalid="ignore", divide="ignore"):
+        resultat = pd.DataFrame({
+            "entite": np.tile(np.asarray(noms, dtype=object), 12),
+            "mois": np.repeat(np.arange(1, 13), len(noms)),
+            f"{composante}_moyen": (sommes / effectifs).ravel(),
+            "part_jours_danger": (danger / effectifs).ravel(),
+        })
+    return resultat.dropna(subset=[f"{composante}_moyen"]).reset_index(drop=True)[colonnes]
+
+
+def main():
+    resultat = preparer_fwi()
+    if resultat is None:
+        print("Aucun artefact météo : lancer d'abord python -m pyroviz.meteo")
+    else:
+        tableau, cles, dates = resultat
+        print(f"FWI {len(dates):,} jours x {len(cles)} clés ({tableau.nbytes / 1024 ** 2:.0f} Mo) -> {CHEMIN_FWI}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""Index bitmap des colonnes filtrées par les pages (année, mois, département, commune).
+
+Pour chaque valeur de `annee`, `mois`, `departement` et `code_insee`, l'index
+garde les lignes concernées sous forme compacte, à la manière des conteneurs
+Roaring : bits empaquetés (1 bit par ligne) pour les valeurs fréquentes,
+positions triées pour les valeurs rares (moins d'une ligne sur 32, où les
+positions coûtent moins que le bitmap). Une sélection se résout par OU entre
+les valeurs d'une colonne puis ET entre colonnes, sur des tableaux 8 fois plus
+petits qu'un masque booléen ; les dernières combinaisons sont gardées en LRU.
+
+L'index est construit une fois par `indexer(df)` pour une base chargée
+durablement (pages, workers du service) ; `pyroviz.requetes.masque` l'utilise
+dès qu'il existe.
+"""
+import threading
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# Paramètre de filtre -> colonne indexée
+COLONNES = {
+    "annees": "annee",
+    "mois": "mois",
+    "departements": "departement",
+    "communes": "code_insee",
+}
+TAILLE_LRU = 128
+# En dessous d'une ligne sur RATIO_CREUX, une valeur est stockée en positions
+RATIO_CREUX = 32
+
+_UNS = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def popcount(bits):
+    """Nombre de bits à 1 d'un bitmap empaqueté."""
+    if hasattr(np, "bitwise_count"):
+        return int(np.bitwise_count(bits).sum(dtype=np.int64))
+    return int(_UNS[bits].sum(dtype=np.int64))
+
+
+# =====================
+# INDEX
+# =====================
+class IndexBitmap:
+    """Bitmaps par valeur des colonnes de `COLONNES`, et LRU des sélections combinées."""
+
+    def __init__(self, df, taille_lru=TAILLE_LRU):
+        self.n = len(df)
+        self.n_octets = (self.n + 7) // 8
+        self.colonnes = {col: self._construire(df[col]) for col in COLONNES.values() if col in df.columns}
+        # Colonnes sans valeur manquante : les choisir toutes ne filtre rien
+        self.completes = {col for col in self.colonnes if not df[col].isna().any()}
+        self.taille_lru = taille_lru
+        self._lru = OrderedDict()
+        self._verrou = threading.Lock()
+
+    def _construire(self, serie):
+        """Valeur -> bits empaquetés (uint8) ou positions triées (int32/int64)."""
+        codes, valeurs = pd.factorize(serie, sort=True)
+        ordre = np.argsort(codes, kind="stable")
+        effectifs = np.bincount(codes[codes >= 0], minlength=len(valeurs))
+        debuts = np.concatenate([[0], np.cumsum(effectifs)]) + int((codes < 0).sum())
+        type_positions = np.int32 if self.n < 2**31 else np.int64
+        entrees = {}
+        for code, valeur in enumerate(valeurs):
+            positions = ordre[debuts[code]:debuts[code + 1]]
+            if len(positions) * RATIO_CREUX < self.n:
+                entrees[valeur] = positions.astype(type_positions)
+            else:
+                lignes = np.zeros(self.n, dtype=bool)
+                lignes[positions] = True
+                entrees[valeur] = np.packbits(lignes)
+        return entrees
+
+    def _ou(self, colonne, valeurs):
+        """Bitmap des lignes dont `colonne` vaut l'une des `valeurs`."""
+        resultat = np.zeros(self.n_octets, dtype=np.uint8)
+        creuses = []
+        for valeur in valeurs:
+            entree = self.colonnes[colonne].get(valeur)
+            if entree is None:
+                continue
+            if entree.dtype == np.uint8:
+                resultat |= entree
+            else:
+                creuses.append(entree)
+        if creuses:
+            positions = np.concatenate(creuses)
+            np.bitwise_or.at(resultat, positions >> 3, (0x80 >> (positions & 7)).astype(np.uint8))
+        return resultat
+
+    def bits(self, annees=None, mois=None, departements=None, communes=None):
+        """Bitmap empaqueté de la sélection (lecture seule), `None` si aucune ligne n'est écartée."""
+        cle = (
+            tuple(annees) if annees is not None else None,
+            mois,
+            tuple(sorted(departements)) if departements is not None else None,
+            tuple(sorted(communes)) if communes is not None else None,
+        )
+        if cle == (None, None, None, None):
+            return None
+        with self._verrou:
+            if cle in self._lru:
+                self._lru.move_to_end(cle)
+                return self._lru[cle]
+
+        valeurs = {}
+        if annees is not None:
+            valeurs["annee"] = [a for a in self.colonnes["annee"] if annees[0] <= a <= annees[1]]
+        if mois is not None:
+            valeurs["mois"] = [mois]
+        if departements is not None:
+            valeurs["departement"] = departements
+        if communes is not None:
+            valeurs["code_insee"] = communes
+        resultat = None
+        for colonne, choix in valeurs.items():
+            # Ex. toute la période : aucune ligne écartée, inutile d'unir 50 bitmaps
+            if colonne in self.completes and set(self.colonnes[colonne]) <= set(choix):
+                continue
+            selection = self._ou(colonne, choix)
+            resultat = selection if resultat is None else np.bitwise_and(resultat, selection, out=resultat)
+        if resultat is not None:
+            resultat.flags.writeable = False
+
+        with self._verrou:
+            self._lru[cle] = resultat
+            while len(self._lru) > self.taille_lru:
+                self._lru.popitem(last=False)
+        return resultat
+
+    def masque(self, **filtres):
+        """Masque booléen de la sélection, `None` si aucune ligne n'est écartée."""
+        bits = self.bits(**filtres)
+        if bits is None:
+            return None
+        return np.unpackbits(bits, count=self.n).view(bool)
+
+    def compter(self, **filtres):
+        bits = self.bits(**filtres)
+        return self.n if bits is None else popcount(bits)
+
+    def taille_octets(self):
+        return sum(e.nbytes for entrees in self.colonnes.values() for e in entrees.values())
+
+
+# =====================
+# ENREGISTREMENT
+# =====================
+_index = {}
+
+
+def indexer(df):
+    """Construit et associe un index bitmap à `df` (tant qu'il vit) ; renvoie `df`."""
+    if id(df) not in _index and all(col in df.columns for col in COLONNES.values()):
+        _index[id(df)] = IndexBitmap(df)
+        weakref.finalize(df, _index.pop, id(df), None)
+    return df
+
+
+def index_de(df):
+    """Index bitmap associé à `df` par `indexer`, sinon `None`."""
+    index = _index.get(id(df))
+    return index if index is not None and index.n == len(df) else None
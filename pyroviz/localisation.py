@@ -0,0 +1,74 @@
+"""Rattachement des feux aux communes par leur carreau DFCI (point dans polygone).
+
+Le `Code INSEE` saisi est parfois absent ou incohérent avec le carreau DFCI du
+feu. Chaque centre de carreau est rattaché au polygone communal de
+`SHP_meteo` qui le contient, par une requête groupée sur un `STRtree`
+(shapely 2) : tous les points sont testés en un appel vectorisé, sans boucle
+`contains` par ligne. Un même carreau étant partagé par de nombreux feux, seuls
+les carreaux distincts sont interrogés, puis le résultat est redistribué aux
+lignes : des millions de feux se traitent en quelques secondes.
+
+Le résultat est un indice entier de ligne dans `SHP_meteo` (-1 hors commune),
+stocké dans la base nettoyée (colonne `commune_dfci`, voir `pyroviz.donnees`).
+"""
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import shapely
+from shapely import STRtree
+
+from pyroviz.dfci import CRS_DFCI, centres_lambert, decoder_carreaux
+
+SANS_COMMUNE = -1
+
+
+def rattacher_points(x, y, geometries):
+    """Indice du polygone de `geometries` contenant chaque point (x, y), -1 sinon.
+
+    Un point posé sur une limite commune à deux polygones est rattaché au
+    premier d'entre eux.
+    """
+    geometries = np.asarray(geometries)
+    points = shapely.points(np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64))
+    resultat = np.full(len(points), SANS_COMMUNE, dtype=np.int32)
+    if len(points) == 0 or len(geometries) == 0:
+        return resultat
+    arbre = STRtree(geometries)
+    # Paires (point, polygone) dont les géométries se touchent, en un seul appel
+    i_points, i_polygones = arbre.query(points, predicate="intersects")
+    # Tri par point puis polygone : on garde la première paire de chaque point
+    ordre = np.lexsort((i_polygones, i_points))
+    i_points, i_polygones = i_points[ordre], i_polygones[ordre]
+    _, premieres = np.unique(i_points, return_index=True)
+    resultat[i_points[premieres]] = i_polygones[premieres]
+    return resultat
+
+
+def rattacher_carreaux(codes, communes):
+    """Indice de la commune (ligne de `communes`, GeoDataFrame) de chaque carreau DFCI."""
+    from pyproj import Transformer
+
+    colonnes, lignes, valides = decoder_carreaux(codes)
+    resultat = np.full(len(valides), SANS_COMMUNE, dtype=np.int32)
+    if not valides.any() or len(communes) == 0:
+        return resultat
+
+    # Requête sur les carreaux distincts seulement (clé entière colonne × ligne)
+    largeur = int(lignes.max()) + 1
+    inverse, distinctes = pd.factorize(colonnes[valides] * largeur + lignes[valides])
+    x, y = centres_lambert(distinctes // largeur, distinctes % largeur)
+    if communes.crs is not None:
+        transformer = Transformer.from_crs(CRS_DFCI, communes.crs, always_xy=True)
+        x, y = transformer.transform(x, y)
+    resultat[valides] = rattacher_points(x, y, communes.geometry.values)[inverse]
+    return resultat
+
+
+def charger_communes(chemin):
+    """Contours communaux `SHP_meteo` (GeoDataFrame), ou `None` s'ils sont absents."""
+    import geopandas as gpd
+
+    if not Path(chemin).exists():
+        return None
+    return gpd.read_file(chemin)
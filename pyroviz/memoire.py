@@ -0,0 +1,123 @@
+"""Mesure des allocations Python d'un rerun de page (tracemalloc).
+
+Désactivée par défaut : tracemalloc ralentit chaque allocation. Avec
+`PYROVIZ_MEMOIRE=1`, chaque page mesure son rerun complet et affiche dans la
+barre latérale les Mo alloués (net et pic) et les principales lignes
+responsables, avec une alerte au-delà de `PYROVIZ_MEMOIRE_BUDGET_MO`. Les
+fragments (`st.fragment`) décorés par `mesurer_fragment` sont mesurés quand ils
+sont relancés seuls, et leur rapport s'affiche sous le fragment.
+
+tracemalloc est global au processus : avec plusieurs sessions simultanées, les
+allocations des autres sessions sont comptées aussi. Les chiffres sont exacts
+avec une seule session (ex. `bench/charge.py --sessions 1`), des majorants sinon.
+Les buffers NumPy (donc pandas) sont bien suivis par tracemalloc.
+"""
+import functools
+import os
+import threading
+import time
+import tracemalloc
+
+ACTIVE = bool(os.environ.get("PYROVIZ_MEMOIRE"))
+BUDGET_MO = float(os.environ.get("PYROVIZ_MEMOIRE_BUDGET_MO", 50))
+# Lignes les plus allocatrices reportées (0 : pas d'instantané, plus rapide)
+SITES = 5
+MO = 1024 * 1024
+
+# Mesure en cours dans le thread du script (un rerun complet inclut ses fragments)
+_local = threading.local()
+
+
+class MesureAllocations:
+    """Allocations entre `debut()` et `fin()` : net, pic et lignes responsables."""
+
+    def __init__(self, nom, sites=SITES, budget_mo=BUDGET_MO):
+        self.nom, self.sites, self.budget_mo = nom, sites, budget_mo
+        self._avant = None
+
+    @staticmethod
+    def _instantane_filtre():
+        # Sans les allocations de tracemalloc lui-même
+        return tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+
+    def debut(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        self._instantane = self._instantane_filtre() if self.sites else None
+        self._avant, _ = tracemalloc.get_traced_memory()
+        self._t0 = time.perf_counter()
+        _local.mesure = self
+        return self
+
+    def fin(self):
+        """Rapport du rerun : dict JSON (Mo, secondes, lignes `fichier:ligne`)."""
+        apres, pic = tracemalloc.get_traced_memory()
+        _local.mesure = None
+        rapport = {
+            "page": self.nom,
+            "duree_s": round(time.perf_counter() - self._t0, 3),
+            "net_mo": round((apres - self._avant) / MO, 2),
+            "pic_mo": round((pic - self._avant) / MO, 2),
+            "sites": [],
+        }
+        if self._instantane is not None:
+            ecarts = self._instantane_filtre().compare_to(self._instantane, "lineno")
+            rapport["sites"] = [
+                (f"{os.path.basename(e.traceback[0].filename)}:{e.traceback[0].lineno}",
+                 round(e.size_diff / MO, 2))
+                for e in ecarts[:self.sites] if e.size_diff > 0
+            ]
+        rapport["depasse_budget"] = rapport["pic_mo"] > self.budget_mo
+        return rapport
+
+
+def debut_rerun(nom):
+    """Démarre la mesure du rerun si `PYROVIZ_MEMOIRE` est défini, sinon `None`."""
+    return MesureAllocations(nom).debut() if ACTIVE else None
+
+
+def mesurer_fragment(fonction):
+    """Décorateur du corps d'un fragment : mesure ses reruns propres si `PYROVIZ_MEMOIRE` est défini.
+
+    Pendant un rerun complet, déjà mesuré par la page, le fragment s'exécute
+    sans mesure ; relancé seul, son rapport s'affiche à la suite du fragment
+    (un fragment ne peut pas écrire dans la barre latérale).
+    """
+    @functools.wraps(fonction)
+    def enveloppe(*args, **kwargs):
+        if not ACTIVE or getattr(_local, "mesure", None) is not None:
+            return fonction(*args, **kwargs)
+        mesure = MesureAllocations(fonction.__name__).debut()
+        try:
+            resultat = fonction(*args, **kwargs)
+        finally:
+            rapport = mesure.fin()
+        afficher_rapport(rapport, barre_laterale=False)
+        return resultat
+    return enveloppe
+
+
+# =====================
+# AFFICHAGE
+# =====================
+def afficher_rapport(rapport, barre_laterale=True):
+    """Rapport d'allocations dans la page : barre latérale (rerun complet) ou sous un fragment."""
+    import pandas as pd
+    import streamlit as st
+
+    if not barre_laterale:
+        sites = ", ".join(f"{ligne} ({mo} Mo)" for ligne, mo in rapport["sites"])
+        st.caption(
+            f"🧮 Fragment {rapport['page']} : {rapport['net_mo']} Mo nets, pic {rapport['pic_mo']} Mo "
+            f"en {rapport['duree_s']} s" + (f" — {sites}" if sites else "")
+        )
+        if rapport["depasse_budget"]:
+            st.warning(f"Allocations au-delà du budget de {BUDGET_MO:.0f} Mo par rerun")
+        return
+    with st.sidebar:
+        st.caption(f"🧮 Rerun : {rapport['net_mo']} Mo nets, pic {rapport['pic_mo']} Mo en {rapport['duree_s']} s")
+        if rapport["depasse_budget"]:
+            st.warning(f"Allocations au-delà du budget de {BUDGET_MO:.0f} Mo par rerun")
+        with st.expander("Lignes les plus allocatrices"):
+            st.dataframe(pd.DataFrame(rapport["sites"], columns=["ligne", "Mo"]), width="stretch", hide_index=True)
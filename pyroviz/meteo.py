@@ -0,0 +1,273 @@
+"""Données météorologiques journalières et jointure aux feux.
+
+Les fichiers quotidiens sont déposés dans `data/meteo/` (CSV ou Parquet), une
+ligne par jour et par commune (`code_insee`) ou par station (`station`, avec
+`lat` / `lon`) :
+
+    date, code_insee | station, lat, lon, temperature, vent, humidite, precipitations
+
+Les en-têtes des fichiers quotidiens Météo-France sont reconnus (AAAAMMJJ,
+NUM_POSTE, LAT, LON, TX, FFM, UM, RR). L'ingestion les normalise en un artefact
+unique trié par (clé, date), complété d'indicateurs de sécheresse (pluie
+cumulée sur 30 jours, jours consécutifs sans pluie) :
+
+    python -m pyroviz.meteo            # (re)construit data/meteo/meteo_journaliere.parquet (et le FWI)
+
+Chaque feu est joint aux conditions de son jour d'alerte par une jointure
+« as-of » triée, par commune (`Code INSEE`) ou par station la plus proche de
+son carreau DFCI : une recherche dichotomique vectorisée sur l'artefact trié,
+sans recherche ligne à ligne. Un jour manquant est remplacé par le dernier jour
+connu dans la limite de `TOLERANCE_JOURS`.
+"""
+import argparse
+import os
+import weakref
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from pyroviz.donnees import DATA_DIR
+
+DOSSIER_METEO = DATA_DIR / "meteo"
+CHEMIN_METEO = DOSSIER_METEO / "meteo_journaliere.parquet"
+
+VARIABLES = {
+    "temperature": "Température maximale (°C)",
+    "vent": "Vent moyen (m/s)",
+    "humidite": "Humidité relative (%)",
+    "precipitations": "Précipitations du jour (mm)",
+    "pluie_30j": "Pluie cumulée sur 30 jours (mm)",
+    "jours_sans_pluie": "Jours consécutifs sans pluie",
+}
+ALIAS = {
+    "AAAAMMJJ": "date", "DATE": "date", "jour": "date",
+    "NUM_POSTE": "station", "poste": "station",
+    "LAT": "lat", "latitude": "lat", "LON": "lon", "longitude": "lon",
+    "Code INSEE": "code_insee", "insee": "code_insee", "INSEE": "code_insee",
+    "TX": "temperature", "tmax": "temperature",
+    "FFM": "vent", "FXY": "vent",
+    "UM": "humidite", "UN": "humidite",
+    "RR": "precipitations", "pluie": "precipitations",
+}
+# Jour de pluie à partir de ce cumul (mm)
+SEUIL_PLUIE = 1.0
+FENETRE_PLUIE_JOURS = 30
+TOLERANCE_JOURS = 2
+NB_CLASSES = 8
+
+# Origine des rangs (clé, jour) : les jours antérieurs sont ramenés à 0
+JOUR_ORIGINE = int(np.datetime64("1900-01-01", "D").astype(np.int64))
+
+_memo = {}
+_rangs_memo = {}
+
+
+# =====================
+# INGESTION
+# =====================
+def _rang(codes, dates):
+    """Rang entier (code de clé, jour) : trier par rang revient à trier par (clé, date)."""
+    jours = dates.to_numpy().astype("datetime64[D]").astype(np.int64) - JOUR_ORIGINE
+    return codes.astype(np.int64) << 32 | np.maximum(jours, 0)
+
+
+def _texte(serie, largeur=0):
+    """Clé en texte (complétée de zéros à gauche), convertie une fois par valeur distincte."""
+    codes, valeurs = pd.factorize(serie)
+    valeurs = pd.Index(valeurs.astype(str)).str.zfill(largeur)
+    textes = np.append(np.asarray(valeurs, dtype=object), None)
+    return pd.Series(textes[codes], index=serie.index)
+
+
+def normaliser(brut):
+    """Colonnes renommées (`ALIAS`), dates au jour, clés en texte, variables numériques."""
+    meteo = brut.rename(columns={k: v for k, v in ALIAS.items() if k in brut.columns})
+    if "date" not in meteo.columns or not {"code_insee", "station"} & set(meteo.columns):
+        raise ValueError("Fichier météo sans colonne date ni code_insee / station")
+    dates = meteo["date"]
+    if pd.api.types.is_numeric_dtype(dates):
+        dates = pd.to_datetime(dates.astype("int64").astype(str), format="%Y%m%d")
+    meteo["date"] = pd.to_datetime(dates).dt.normalize()
+    if "code_insee" in meteo.columns:
+        meteo["code_insee"] = _texte(meteo["code_insee"], largeur=5)
+    if "station" in meteo.columns:
+        meteo["station"] = _texte(meteo["station"])
+    for variable in ("temperature", "vent", "humidite", "precipitations"):
+        meteo[variable] = pd.to_numeric(meteo[variable], errors="coerce") if variable in meteo.columns else np.nan
+    cle = "code_insee" if "code_insee" in meteo.columns else "station"
+    colonnes = [cle, *(["lat", "lon"] if cle == "station" else []), "date",
+                "temperature", "vent", "humidite", "precipitations"]
+    return meteo[colonnes].drop_duplicates([cle, "date"], keep="last")
+
+
+def indicateurs_secheresse(meteo, seuil_pluie=SEUIL_PLUIE):
+    """Ajoute `pluie_30j` et `jours_sans_pluie` (par clé, en jours du calendrier).
+
+    `jours_sans_pluie` compte les jours écoulés depuis le dernier relevé pluvieux
+    de la clé (0 le jour même), ou depuis son premier relevé ; un jour sans
+    relevé compte donc comme un jour sec.
+    """
+    cle = "code_insee" if "code_insee" in meteo.columns else "station"
+    meteo = meteo.sort_values([cle, "date"]).reset_index(drop=True)
+    pluie = meteo["precipitations"].fillna(0.0).to_numpy()
+
+    # Cumul glissant sur (date - 30 j, date] : différence de sommes cumulées, les
+    # débuts de fenêtre trouvés par recherche dichotomique sur la clé (clé, jour) triée
+    codes, _ = pd.factorize(meteo[cle], sort=True)
+    rang = _rang(codes, meteo["date"])
+    cumul = np.concatenate([[0.0], np.cumsum(pluie)])
+    debuts = np.searchsorted(rang, rang - (FENETRE_PLUIE_JOURS - 1))
+    meteo["pluie_30j"] = cumul[1:] - cumul[debuts]
+
+    # Numéro d'épisode sec : incrémenté à chaque jour de pluie ou nouvelle clé, puis
+    # écart en jours (différence de rangs, même clé) avec le relevé qui l'a ouvert
+    rupture = (pluie >= seuil_pluie) | np.concatenate([[True], codes[1:] != codes[:-1]])
+    episode = np.cumsum(rupture)
+    premiere = np.flatnonzero(rupture)
+    meteo["jours_sans_pluie"] = rang - rang[premiere[episode - 1]]
+    return meteo
+
+
+def lire_fichiers(dossier=DOSSIER_METEO):
+    """Tous les fichiers CSV / Parquet du dossier (hors artefact), normalisés."""
+    morceaux = []
+    for chemin in sorted(Path(dossier).glob("*")):
+        if chemin == CHEMIN_METEO or chemin.suffix.lower() not in (".csv", ".parquet"):
+            continue
+        brut = pd.read_parquet(chemin) if chemin.suffix.lower() == ".parquet" else pd.read_csv(chemin, sep=None, engine="python")
+        morceaux.append(normaliser(brut))
+    return pd.concat(morceaux, ignore_index=True) if morceaux else None
+
+
+def preparer_meteo(dossier=DOSSIER_METEO, cible=CHEMIN_METEO):
+    """Construit l'artefact trié par (clé, date) ; renvoie le DataFrame (ou `None` sans fichier)."""
+    meteo = lire_fichiers(dossier)
+    if meteo is None:
+        return None
+    meteo = indicateurs_secheresse(meteo)
+    cible = Path(cible)
+    temporaire = cible.with_suffix(f".{os.getpid()}.tmp")
+    meteo.to_parquet(temporaire, index=False)
+    os.replace(temporaire, cible)
+    return meteo
+
+
+def charger_meteo(chemin=CHEMIN_METEO):
+    """Artefact météo (mémorisé tant que le fichier est inchangé), `None` s'il n'existe pas."""
+    chemin = Path(chemin)
+    if not chemin.exists():
+        return None
+    signature = (str(chemin), chemin.stat().st_mtime_ns)
+    if signature not in _memo:
+        _memo.clear()
+        _memo[signature] = pd.read_parquet(chemin)
+    return _memo[signature]
+
+
+# =====================
+# JOINTURE
+# =====================
+def stations_les_plus_proches(df, stations):
+    """Station (ligne de `stations`, colonnes lat / lon) la plus proche du carreau DFCI de chaque feu."""
+    import shapely
+    from pyproj import Transformer
+    from shapely import STRtree
+
+    from pyroviz.dfci import CRS_DFCI, centres_lambert, decoder_carreaux
+
+    colonnes, lignes, valides = decoder_carreaux(df["DFCI_2"])
+    resultat = np.full(len(df), -1, dtype=np.int64)
+    if not valides.any() or len(stations) == 0:
+        return resultat
+    transformer = Transformer.from_crs("EPSG:4326", CRS_DFCI, always_xy=True)
+    sx, sy = transformer.transform(stations["lon"].to_numpy(), stations["lat"].to_numpy())
+    arbre = STRtree(shapely.points(sx, sy))
+    x, y = centres_lambert(colonnes[valides], lignes[valides])
+    resultat[valides] = arbre.query_nearest(shapely.points(x, y), all_matches=False)[1]
+    return resultat
+
+
+def _rangs(meteo):
+    """Clés distinctes triées et rang (clé, jour) de chaque relevé, mémorisés par artefact."""
+    if id(meteo) not in _rangs_memo:
+        cle = "code_insee" if "code_insee" in meteo.columns else "station"
+        codes, valeurs = pd.factorize(meteo[cle], sort=True)
+        rang = _rang(codes, meteo["date"])
+        _rangs_memo[id(meteo)] = (np.asarray(valeurs, dtype=object), rang)
+        weakref.finalize(meteo, _rangs_memo.pop, id(meteo), None)
+    return _rangs_memo[id(meteo)]
+
+
+def joindre_meteo(df, meteo, tolerance_jours=TOLERANCE_JOURS):
+    """Conditions météo du jour d'alerte de chaque feu (DataFrame aligné sur les lignes de `df`).
+
+    Jointure « as-of » arrière : l'artefact étant trié par (clé, date), le
+    dernier relevé de la clé au plus tard le jour de l'alerte est trouvé par
+    recherche dichotomique sur le rang (clé, jour), sans retrier les millions
+    de relevés. Les colonnes de `VARIABLES` valent NaN pour un feu sans relevé
+    à moins de `tolerance_jours` jours pour sa commune ou sa station.
+    """
+    variables = [v for v in VARIABLES if v in meteo.columns]
+    resultat = pd.DataFrame(np.nan, index=df.index, columns=variables)
+    if len(df) == 0 or len(meteo) == 0:
+        return resultat
+
+    valeurs, rang = _rangs(meteo)
+    if "code_insee" in meteo.columns:
+        cles = df["code_insee"].astype(str).to_numpy(dtype=object)
+    else:
+        stations = meteo.drop_duplicates("station")[["station", "lat", "lon"]].reset_index(drop=True)
+        proches = stations_les_plus_proches(df, stations)
+        cles = np.where(proches >= 0, stations["station"].to_numpy()[np.maximum(proches, 0)], "")
+
+    codes = np.minimum(np.searchsorted(valeurs, cles), len(valeurs) - 1)
+    connues = (valeurs[codes] == cles) & df["Alerte"].notna().to_numpy()
+    cible = _rang(codes, df["Alerte"])
+    positions = np.searchsorted(rang, cible, side="right") - 1
+    trouvees = connues & (positions >= 0)
+    positions = np.maximum(positions, 0)
+    # Même clé, au plus `tolerance_jours` jours avant l'alerte
+    trouvees &= (rang[positions] >> 32 == codes) & (cible - rang[positions] <= tolerance_jours)
+    lignes = np.flatnonzero(trouvees)
+    resultat.iloc[lignes] = meteo[variables].to_numpy(dtype=np.float64)[positions[lignes]]
+    return resultat
+
+
+def conditions_feux(df, meteo, variable, nb_classes=NB_CLASSES):
+    """Nombre de feux et surfaces par classe (quantiles) d'une variable météo du jour d'alerte."""
+    colonnes = ["classe", "borne_min", "borne_max", "nb_incendies", "surface_brulee", "surface_moyenne"]
+    if meteo is None or variable not in meteo.columns or len(df) == 0:
+        return pd.DataFrame(columns=colonnes)
+    valeurs = joindre_meteo(df, meteo)[variable]
+    connues = valeurs.notna().to_numpy()
+    if not connues.any():
+        return pd.DataFrame(columns=colonnes)
+    classes = pd.qcut(valeurs[connues], nb_classes, duplicates="drop")
+    groupes = df.loc[connues, "surface_brulee"].groupby(classes.to_numpy(), observed=True)
+    resultat = groupes.agg(nb_incendies="size", surface_brulee="sum", surface_moyenne="mean")
+    intervalles = resultat.index
+    resultat.insert(0, "borne_max", [i.right for i in intervalles])
+    resultat.insert(0, "borne_min", [i.left for i in intervalles])
+    resultat.insert(0, "classe", [f"{i.left:.3g} – {i.right:.3g}" for i in intervalles])
+    return resultat.reset_index(drop=True)[colonnes]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingestion des données météo journalières")
+    parser.add_argument("--dossier", default=str(DOSSIER_METEO))
+    args = parser.parse_args()
+    meteo = preparer_meteo(args.dossier)
+    if meteo is None:
+        print(f"Aucun fichier CSV / Parquet dans {args.dossier}")
+    else:
+        cle = "code_insee" if "code_insee" in meteo.columns else "station"
+        print(f"{len(meteo):,} relevés, {meteo[cle].nunique()} {cle}, "
+              f"{meteo['date'].min():%d/%m/%Y} - {meteo['date'].max():%d/%m/%Y} -> {CHEMIN_METEO}")
+        # Indice forêt-météo recalculé sur les nouveaux relevés
+        from pyroviz.fwi import main as main_fwi
+        main_fwi()
+
+
+if __name__ == "__main__":
+    main()
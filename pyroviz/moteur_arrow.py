@@ -0,0 +1,154 @@
+"""Moteur d'agrégation Arrow (`pyarrow.compute`, `Table.group_by`).
+
+Les agrégations groupées des pages (plans de `pyroviz.plans`) et le comptage
+sont calculés directement sur une table Arrow, sans passer par `groupby`
+pandas : le filtre est un masque calculé par les noyaux `pyarrow.compute`, le
+regroupement un `Table.group_by` (hachage C++). Les résultats sont identiques
+à ceux du moteur pandas (mêmes colonnes, mêmes types, même tri par clés), seul
+le petit DataFrame final est construit.
+
+La table est préparée une fois (`preparer_table`) pour ces noyaux :
+- `departement` et `code_insee` sont encodés en dictionnaire : le regroupement
+  porte sur des indices entiers, et un filtre `isin` est évalué sur les
+  quelques centaines de valeurs du dictionnaire puis reporté sur les indices ;
+- `annee` et `mois` sont réduits en int16 / int8 ;
+- seules les colonnes d'une requête (clés, surface) sont filtrées.
+
+Elle est lue dans l'artefact Parquet nettoyé (`table_incendies`), ou associée
+à la base pandas déjà chargée par une page (`table_de`).
+
+Le moteur est choisi par `PYROVIZ_MOTEUR=arrow` (voir `pyroviz.requetes`) ;
+`bench/agregats.py` le compare aux autres moteurs.
+"""
+import weakref
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from pyroviz.donnees import CHEMIN_PROPRES
+
+# Colonnes lues par les agrégations
+COLONNES_ARROW = ["annee", "mois", "departement", "code_insee", "surface_brulee"]
+COLONNES_GROUPES = ("annee", "mois", "departement", "code_insee")
+# Types de travail des colonnes ; les clés des résultats reprennent le type pandas
+TYPES = {"annee": pa.int16(), "mois": pa.int8()}
+TYPES_RESULTAT = {"annee": pa.int64(), "mois": pa.int64(), "departement": pa.string(), "code_insee": pa.string()}
+DICTIONNAIRES = ("departement", "code_insee")
+AGREGATS = [([], "count_all"), ("surface_brulee", "sum")]
+NOMS_AGREGATS = {"count_all": "nb_incendies", "surface_brulee_sum": "surface_brulee"}
+
+
+# =====================
+# TABLES
+# =====================
+def preparer_table(table):
+    """Colonnes de `table` encodées pour les agrégations (dictionnaires, entiers courts)."""
+    for nom in table.column_names:
+        colonne = table.column(nom)
+        if nom in TYPES:
+            colonne = colonne.cast(TYPES[nom])
+        elif nom in DICTIONNAIRES and not pa.types.is_dictionary(colonne.type):
+            colonne = pc.dictionary_encode(colonne)
+        table = table.set_column(table.column_names.index(nom), nom, colonne)
+    return table
+
+
+def table_incendies(chemin=CHEMIN_PROPRES, colonnes=COLONNES_ARROW):
+    """Table Arrow préparée des `colonnes` de l'artefact nettoyé, fichier projeté en mémoire."""
+    return preparer_table(pq.read_table(chemin, columns=colonnes, memory_map=True, read_dictionary=DICTIONNAIRES))
+
+
+_tables = {}
+
+
+def table_de(df, colonnes=COLONNES_ARROW):
+    """Table Arrow préparée associée à `df` (construite une fois, tant que `df` vit)."""
+    table = _tables.get(id(df))
+    if table is None or table.num_rows != len(df):
+        table = preparer_table(pa.Table.from_pandas(df[[c for c in colonnes if c in df.columns]], preserve_index=False))
+        if id(df) not in _tables:
+            weakref.finalize(df, _tables.pop, id(df), None)
+        _tables[id(df)] = table
+    return table
+
+
+# =====================
+# FILTRAGE
+# =====================
+def _appartient(colonne, valeurs):
+    """Masque `colonne` ∈ `valeurs` ; sur un dictionnaire, test des valeurs distinctes reporté sur les indices."""
+    if not pa.types.is_dictionary(colonne.type):
+        return pc.is_in(colonne, value_set=pa.array(list(valeurs), colonne.type))
+    morceaux = [
+        pc.take(pc.is_in(m.dictionary, value_set=pa.array(list(valeurs), m.dictionary.type)), m.indices)
+        for m in colonne.chunks
+    ]
+    return pa.chunked_array(morceaux, pa.bool_())
+
+
+def masque(table, annees=None, mois=None, departements=None, communes=None):
+    """Masque Arrow des lignes retenues, `None` si aucun filtre n'est actif."""
+    conditions = []
+    if annees is not None:
+        annee = table.column("annee")
+        conditions.append(pc.and_(pc.greater_equal(annee, annees[0]), pc.less_equal(annee, annees[1])))
+    if mois is not None:
+        conditions.append(pc.equal(table.column("mois"), mois))
+    if departements is not None:
+        conditions.append(_appartient(table.column("departement"), departements))
+    if communes is not None:
+        conditions.append(_appartient(table.column("code_insee"), communes))
+    if not conditions:
+        return None
+    selection = conditions[0]
+    for condition in conditions[1:]:
+        selection = pc.and_(selection, condition)
+    return selection
+
+
+def filtrer(table, colonnes=None, **filtres):
+    """Lignes retenues de `table`, réduite aux `colonnes` avant le filtrage."""
+    selection = masque(table, **filtres)
+    if colonnes is not None:
+        table = table.select(list(colonnes))
+    return table if selection is None else table.filter(selection)
+
+
+def compter(table, **filtres):
+    """Nombre de lignes retenues."""
+    selection = masque(table, **filtres)
+    return table.num_rows if selection is None else pc.sum(selection).as_py() or 0
+
+
+# =====================
+# AGRÉGATIONS
+# =====================
+def grouper(table, par):
+    """Nombre d'incendies et surface brûlée par clés `par`, triés par clés (table Arrow).
+
+    Comme `groupby` pandas, les lignes dont une clé est manquante sont écartées ;
+    les clés reprennent le type des colonnes pandas.
+    """
+    for colonne in par:
+        if table.column(colonne).null_count:
+            table = table.filter(pc.is_valid(pc.field(colonne)))
+    resultat = table.group_by(par).aggregate(AGREGATS)
+    resultat = resultat.rename_columns([NOMS_AGREGATS.get(c, c) for c in resultat.column_names])
+    resultat = resultat.select([*par, "nb_incendies", "surface_brulee"])
+    for colonne in par:
+        resultat = resultat.set_column(par.index(colonne), colonne, resultat.column(colonne).cast(TYPES_RESULTAT[colonne]))
+    return resultat.sort_by([(c, "ascending") for c in par])
+
+
+def agreger(table, par=(), **filtres):
+    """Agrégat de la sélection par clés `par` (toute la sélection sans clé), en table Arrow."""
+    par = [c for c in par if c in COLONNES_GROUPES]
+    selection = filtrer(table, [*par, "surface_brulee"], **filtres)
+    if not par:
+        surface = pc.sum(selection.column("surface_brulee")).as_py()
+        return pa.table({
+            "nb_incendies": pa.array([selection.num_rows], pa.int64()),
+            "surface_brulee": pa.array([surface or 0.0], pa.float64()),
+        })
+    return grouper(selection, par)
@@ -0,0 +1,161 @@
+"""Plans de requête des pages, décrits une fois et exécutés par plusieurs moteurs.
+
+Une agrégation des pages se résume à un `Plan` : filtres (période, mois,
+départements, communes), regroupement par clés (`annee`, `mois`, `departement`,
+`code_insee`) avec nombre d'incendies et surface brûlée, puis éventuellement
+tri décroissant sur un indicateur et top-N. Le plan est traduit pour le moteur
+choisi :
+
+- `pandas` : moteur de référence (masque ou index bitmap, puis `groupby`) ;
+- `arrow` : noyaux `pyarrow.compute` sur table préparée (`pyroviz.moteur_arrow`) ;
+- `polars` : requête `LazyFrame` Polars, optimisée avant exécution (filtres et
+  projection poussés au plus tôt, top-N fusionné au tri) et exécutée en
+  parallèle sur tous les cœurs.
+
+Tous les moteurs rendent le même DataFrame (colonnes, types, ordre des
+lignes), aux arrondis de sommation près. Chaque moteur somme les surfaces dans
+un ordre différent : le tri porte donc sur l'indicateur arrondi à
+`DECIMALES_TRI` décimales, puis sur les clés, pour que des groupes quasi égaux
+soient rangés (et coupés au top-N) de la même façon partout. Le moteur des pages
+est choisi par `PYROVIZ_MOTEUR` (`pyroviz.requetes`). Polars est optionnel
+(`pip install polars`).
+"""
+import weakref
+
+import pandas as pd
+import pyarrow.compute as pc
+
+from pyroviz import moteur_arrow
+
+CLES = ("annee", "mois", "departement", "code_insee")
+INDICATEURS = ("nb_incendies", "surface_brulee")
+CLES_CUBE = ["departement", "code_insee", "annee", "mois"]
+MOTEURS = ("pandas", "arrow", "polars")
+COLONNES_POLARS = ["annee", "mois", "departement", "code_insee", "surface_brulee"]
+# Arrondi de l'indicateur de tri (1e-6 ha = 0,01 m²), au-delà des écarts de sommation ;
+# le tri porte sur l'entier round(indicateur × ECHELLE_TRI), identique dans tous les moteurs
+DECIMALES_TRI = 6
+ECHELLE_TRI = 10 ** DECIMALES_TRI
+
+
+# =====================
+# PLAN
+# =====================
+class Plan:
+    """Filtres, clés de regroupement et classement (`tri` décroissant, `n` premiers groupes)."""
+
+    def __init__(self, par=(), tri=None, n=None, annees=None, mois=None, departements=None, communes=None):
+        if tri is not None and tri not in INDICATEURS:
+            raise ValueError(f"Indicateur de tri inconnu : {tri}")
+        self.par = [c for c in par if c in CLES]
+        self.tri, self.n = tri, n
+        filtres = {"annees": annees, "mois": mois, "departements": departements, "communes": communes}
+        self.filtres = {cle: valeur for cle, valeur in filtres.items() if valeur is not None}
+
+    def __repr__(self):
+        return f"Plan(par={self.par}, tri={self.tri}, n={self.n}, filtres={self.filtres})"
+
+    def executer(self, df, moteur="pandas"):
+        """Résultat du plan sur la base pandas `df`, calculé par `moteur`."""
+        if moteur == "arrow":
+            return self.arrow(moteur_arrow.table_de(df))
+        if moteur == "polars":
+            return self.polars(lazy_de(df))
+        if moteur != "pandas":
+            raise ValueError(f"Moteur inconnu : {moteur}")
+        return self.pandas(df)
+
+    # --- pandas (référence) ---
+    def pandas(self, df):
+        from pyroviz.requetes import filtrer  # pyroviz.requetes importe ce module
+
+        selection = filtrer(df, **self.filtres)
+        if not self.par:
+            return pd.DataFrame({
+                "nb_incendies": [len(selection)],
+                "surface_brulee": [selection["surface_brulee"].sum()],
+            })
+        resultat = (
+            selection.groupby(self.par, observed=True)
+            .agg(nb_incendies=("surface_brulee", "size"), surface_brulee=("surface_brulee", "sum"))
+            .reset_index()
+        )
+        if self.tri is not None:
+            resultat = (
+                resultat.assign(_tri=(resultat[self.tri] * ECHELLE_TRI).round().astype("int64"))
+                .sort_values(["_tri", *self.par], ascending=[False] + [True] * len(self.par), kind="stable")
+                .drop(columns="_tri")
+                .reset_index(drop=True)
+            )
+        return resultat if self.n is None else resultat.head(self.n)
+
+    # --- Arrow ---
+    def arrow(self, table):
+        resultat = moteur_arrow.agreger(table, self.par, **self.filtres)
+        if self.tri is not None:
+            resultat = resultat.append_column("_tri", pc.cast(pc.round(pc.multiply(resultat.column(self.tri), ECHELLE_TRI)), "int64"))
+            resultat = resultat.sort_by([("_tri", "descending"), *[(c, "ascending") for c in self.par]])
+            resultat = resultat.drop_columns("_tri")
+        if self.n is not None:
+            resultat = resultat.slice(0, self.n)
+        return resultat.to_pandas()
+
+    # --- Polars ---
+    def requete_polars(self, lazy):
+        """`LazyFrame` du plan (non exécuté) ; `.explain()` montre le plan optimisé."""
+        import polars as pl
+
+        conditions = []
+        if "annees" in self.filtres:
+            conditions.append(pl.col("annee").is_between(*self.filtres["annees"]))
+        if "mois" in self.filtres:
+            conditions.append(pl.col("mois") == self.filtres["mois"])
+        if "departements" in self.filtres:
+            conditions.append(pl.col("departement").is_in(list(self.filtres["departements"])))
+        if "communes" in self.filtres:
+            conditions.append(pl.col("code_insee").is_in(list(self.filtres["communes"])))
+        if conditions:
+            lazy = lazy.filter(pl.all_horizontal(conditions))
+
+        indicateurs = [pl.len().cast(pl.Int64).alias("nb_incendies"), pl.col("surface_brulee").sum()]
+        if not self.par:
+            return lazy.select(indicateurs)
+        lazy = lazy.drop_nulls(self.par).group_by(self.par).agg(indicateurs)
+        if self.tri is not None:
+            lazy = lazy.sort(
+                [(pl.col(self.tri) * ECHELLE_TRI).round().cast(pl.Int64), *self.par], descending=[True] + [False] * len(self.par)
+            )
+        else:
+            lazy = lazy.sort(self.par)
+        return lazy if self.n is None else lazy.head(self.n)
+
+    def polars(self, lazy):
+        return self.requete_polars(lazy).collect().to_pandas()
+
+
+def plan_requete(nom, **params):
+    """Plan d'une requête groupée du catalogue (`agregat`, `cube_communes`)."""
+    if nom == "agregat":
+        return Plan(**params)
+    if nom == "cube_communes":
+        return Plan(par=CLES_CUBE, **params)
+    raise KeyError(f"Requête sans plan : {nom}")
+
+
+# =====================
+# SOURCE POLARS
+# =====================
+_lazy = {}
+
+
+def lazy_de(df, colonnes=COLONNES_POLARS):
+    """`LazyFrame` Polars associé à `df` (colonnes converties une fois, tant que `df` vit)."""
+    import polars as pl
+
+    cadre = _lazy.get(id(df))
+    if cadre is None or cadre.height != len(df):
+        cadre = pl.from_pandas(df[[c for c in colonnes if c in df.columns]])
+        if id(df) not in _lazy:
+            weakref.finalize(df, _lazy.pop, id(df), None)
+        _lazy[id(df)] = cadre
+    return cadre.lazy()
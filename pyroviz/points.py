@@ -0,0 +1,177 @@
+"""Couche des feux individuels, regroupés dans le navigateur.
+
+Un marqueur folium par feu (100 000 et plus) produirait un HTML énorme et une
+carte figée. Ici chaque feu n'est transmis que par quelques valeurs rangées
+en tableaux typés (base64) : position (centre du carreau DFCI, sinon centroïde
+de la commune), jour d'alerte, surface et indice de commune.
+
+Le regroupement se fait côté navigateur, à chaque déplacement ou zoom : les
+points visibles sont répartis sur une grille de `TAILLE_GRILLE` pixels, en une
+passe sur les tableaux, et seul un marqueur par case occupée est dessiné (quelques
+centaines au plus, quel que soit le nombre de feux). Un clic sur un groupe
+zoome sur son emprise ; au zoom maximal, ou si tous ses feux partagent la même
+position, la fenêtre listant les feux n'est construite qu'à ce moment-là.
+"""
+import base64
+import html
+import json
+
+import numpy as np
+import pandas as pd
+
+from pyroviz.communes import centroides_communes
+from pyroviz.dfci import centres_wgs84
+
+TAILLE_GRILLE = 60  # pixels
+NB_FEUX_FENETRE = 10
+
+
+# =====================
+# TABLEAUX DES POINTS
+# =====================
+def points_feux(df):
+    """Position, jour d'alerte, surface et commune de chaque feu (sans position : écarté)."""
+    lon, lat = centres_wgs84(df["DFCI_2"])
+    sans_carreau = np.isnan(lon)
+    if sans_carreau.any():
+        centroides = centroides_communes(df)
+        repli = np.array(
+            [centroides.get(c, (np.nan, np.nan)) for c in df["code_insee"].astype(str).to_numpy()[sans_carreau]],
+            dtype=np.float64,
+        ).reshape(-1, 2)
+        lon, lat = lon.copy(), lat.copy()
+        lon[sans_carreau], lat[sans_carreau] = repli[:, 0], repli[:, 1]
+    points = pd.DataFrame({
+        "lon": lon,
+        "lat": lat,
+        "alerte": df["Alerte"].to_numpy(),
+        "surface_brulee": df["surface_brulee"].to_numpy(),
+        "commune": df["commune"].to_numpy(),
+    })
+    return points.dropna(subset=["lon", "lat"]).reset_index(drop=True)
+
+
+def _base64(tableau):
+    return base64.b64encode(np.ascontiguousarray(tableau).tobytes()).decode("ascii")
+
+
+def encoder_points(points):
+    """Tableaux typés en base64 : lon / lat (Float32), jour (Int32, jours depuis 1970),
+    surface (Float32), commune (Uint16, indice dans `communes`)."""
+    codes, communes = pd.factorize(points["commune"].fillna("?"))
+    jours = points["alerte"].to_numpy().astype("datetime64[D]").astype(np.int64)
+    return {
+        "n": len(points),
+        "lon": _base64(points["lon"].to_numpy(dtype=np.float32)),
+        "lat": _base64(points["lat"].to_numpy(dtype=np.float32)),
+        "jour": _base64(jours.astype(np.int32)),
+        "surface": _base64(points["surface_brulee"].fillna(0).to_numpy(dtype=np.float32)),
+        "commune": _base64(codes.astype(np.uint16 if len(communes) < 2 ** 16 else np.uint32)),
+        "type_commune": "Uint16" if len(communes) < 2 ** 16 else "Uint32",
+        "communes": [html.escape(str(c)) for c in communes],
+    }
+
+
+# =====================
+# COUCHE REGROUPÉE
+# =====================
+_SCRIPT = """
+(function() {
+    var carte = {{ this._parent._parent.get_name() }};
+    var groupe = {{ this._parent.get_name() }};
+    var d = {{ this.donnees }};
+    var TAILLE = {{ this.taille }}, NB_FENETRE = {{ this.nb_fenetre }};
+    function tableau(b64, Type) {
+        var s = atob(b64), octets = new Uint8Array(s.length);
+        for (var i = 0; i < s.length; i++) octets[i] = s.charCodeAt(i);
+        return new Type(octets.buffer);
+    }
+    var lon = tableau(d.lon, Float32Array), lat = tableau(d.lat, Float32Array);
+    var jour = tableau(d.jour, Int32Array), surface = tableau(d.surface, Float32Array);
+    var commune = tableau(d.commune, d.type_commune === "Uint16" ? Uint16Array : Uint32Array);
+
+    // Mercator normalisé (0-1), calculé une fois ; multiplié par l'échelle du zoom à chaque vue
+    var mx = new Float64Array(d.n), my = new Float64Array(d.n);
+    for (var i = 0; i < d.n; i++) {
+        var phi = lat[i] * Math.PI / 180;
+        mx[i] = (lon[i] + 180) / 360;
+        my[i] = (1 - Math.log(Math.tan(phi) + 1 / Math.cos(phi)) / Math.PI) / 2;
+    }
+    var suivant = new Int32Array(d.n);  // chaînage des feux d'une même case
+
+    function fenetre(tete) {
+        var membres = [];
+        for (var i = tete; i >= 0; i = suivant[i]) membres.push(i);
+        membres.sort(function(a, b) { return surface[b] - surface[a]; });
+        var html = '<div style="font-family: Arial; min-width: 220px;">'
+            + '<h4 style="color: #ff6b35; margin: 0 0 10px 0;">🔥 ' + membres.length.toLocaleString("fr-FR") + ' feu(x)</h4>';
+        membres.slice(0, NB_FENETRE).forEach(function(i) {
+            var date = new Date(jour[i] * 86400000).toLocaleDateString("fr-FR", {timeZone: "UTC"});
+            html += '<p style="margin: 3px 0;"><strong>' + date + '</strong> · ' + d.communes[commune[i]]
+                + ' · ' + surface[i].toLocaleString("fr-FR", {maximumFractionDigits: 2}) + ' ha</p>';
+        });
+        if (membres.length > NB_FENETRE) html += '<p style="margin: 3px 0; color: #b0a090;">… et ' + (membres.length - NB_FENETRE).toLocaleString("fr-FR") + ' autres</p>';
+        return html + '</div>';
+    }
+
+    function dessiner() {
+        groupe.clearLayers();
+        if (!carte.hasLayer(groupe)) return;
+        var zoom = carte.getZoom(), echelle = 256 * Math.pow(2, zoom);
+        var vue = carte.getPixelBounds(), marge = TAILLE;
+        var cases = new Map();
+        for (var i = 0; i < d.n; i++) {
+            var x = mx[i] * echelle, y = my[i] * echelle;
+            if (x < vue.min.x - marge || x > vue.max.x + marge || y < vue.min.y - marge || y > vue.max.y + marge) continue;
+            var cle = Math.floor(x / TAILLE) * 1e7 + Math.floor(y / TAILLE);
+            var c = cases.get(cle);
+            if (!c) { c = {n: 0, x: 0, y: 0, surface: 0, tete: -1, x0: x, y0: y, meme: true}; cases.set(cle, c); }
+            c.n++; c.x += x; c.y += y; c.surface += surface[i];
+            if (x !== c.x0 || y !== c.y0) c.meme = false;
+            suivant[i] = c.tete; c.tete = i;
+        }
+        cases.forEach(function(c) {
+            var centre = carte.unproject([c.x / c.n, c.y / c.n], zoom);
+            var marqueur = L.circleMarker(centre, {
+                radius: Math.min(30, 6 + 5 * Math.log10(c.n)),
+                color: "#ffcc00", weight: 1,
+                fillColor: c.surface / c.n > 1 ? "#cc0000" : "#ff6b35", fillOpacity: 0.7
+            });
+            marqueur.bindTooltip(c.n.toLocaleString("fr-FR") + " feu(x) · " + c.surface.toLocaleString("fr-FR", {maximumFractionDigits: 0}) + " ha");
+            marqueur.on("click", function() {
+                if (c.meme || zoom >= carte.getMaxZoom()) {
+                    L.popup({maxWidth: 320}).setLatLng(centre).setContent(fenetre(c.tete)).openOn(carte);
+                } else {
+                    var bornes = L.latLngBounds([]);
+                    for (var i = c.tete; i >= 0; i = suivant[i]) bornes.extend([lat[i], lon[i]]);
+                    carte.fitBounds(bornes, {padding: [20, 20]});
+                }
+            });
+            groupe.addLayer(marqueur);
+        });
+    }
+    // moveend suit aussi chaque zoom
+    carte.on("moveend overlayadd", dessiner);
+    dessiner();
+})();
+"""
+
+
+def couche_points(points, nom="🔥 Feux individuels", show=False):
+    """FeatureGroup folium des feux, regroupés par grille dans le navigateur."""
+    import folium
+    from branca.element import MacroElement
+    from jinja2 import Template
+
+    class Regroupement(MacroElement):
+        _template = Template("{% macro script(this, kwargs) %}" + _SCRIPT + "{% endmacro %}")
+
+        def __init__(self):
+            super().__init__()
+            self.donnees = json.dumps(encoder_points(points))
+            self.taille = TAILLE_GRILLE
+            self.nb_fenetre = NB_FEUX_FENETRE
+
+    groupe = folium.FeatureGroup(name=nom, show=show)
+    Regroupement().add_to(groupe)
+    return groupe
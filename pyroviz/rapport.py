@@ -0,0 +1,336 @@
+"""Dossiers HTML statiques par département (et par commune), générés en lot.
+
+Chaque dossier reprend les indicateurs, graphiques et tableaux des pages pour
+un territoire et une période : chiffres clés et tendance (Mann-Kendall / Sen),
+évolution annuelle, saisonnalité, carte de chaleur mois × année, années les
+plus touchées, communes les plus touchées et communes en hausse significative.
+Les agrégations sont celles du catalogue `pyroviz.requetes`, comme dans les pages.
+
+Les dossiers sont rendus en parallèle par un pool de processus. La base n'est
+pas copiée dans chaque processus : le parent en écrit les colonnes utiles une
+fois au format Arrow IPC non compressé, que chaque processus ouvre en
+`memory_map` ; les colonnes numériques et textuelles restent des vues sur ce
+fichier, dont les pages mémoire sont partagées par le système entre processus.
+
+`plotly.min.js` est écrit une seule fois dans le dossier de sortie et référencé
+par chaque fichier : les dossiers s'ouvrent hors ligne sans embarquer chacun
+plusieurs Mo de JavaScript.
+
+    python -m pyroviz.rapport rapports/ --annees 1973 2022
+    python -m pyroviz.rapport rapports/ --departements 13 83 --communes 13001 83061 --processus 4
+"""
+import argparse
+import html
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+import pyarrow as pa
+
+from pyroviz.donnees import CHEMIN_INCENDIES, DEPARTEMENTS_PACA, charger_incendies
+from pyroviz.index import indexer
+from pyroviz.requetes import compter, executer
+
+NOMS_DEPARTEMENTS = {
+    "04": "Alpes-de-Haute-Provence",
+    "05": "Hautes-Alpes",
+    "06": "Alpes-Maritimes",
+    "13": "Bouches-du-Rhône",
+    "83": "Var",
+    "84": "Vaucluse"
+}
+NOMS_MOIS = {
+    1: "Janvier", 2: "Février", 3: "Mars", 4: "Avril", 5: "Mai", 6: "Juin",
+    7: "Juillet", 8: "Août", 9: "Septembre", 10: "Octobre", 11: "Novembre", 12: "Décembre"
+}
+# Colonnes lues par les requêtes des dossiers
+COLONNES_RAPPORT = ["annee", "mois", "departement", "code_insee", "commune", "surface_brulee"]
+NB_LIGNES_TABLEAUX = 10
+FICHIER_PLOTLY = "plotly.min.js"
+
+# Base ouverte dans chaque processus de travail par `_initialiser`
+_df = None
+
+
+# =====================
+# BASE PARTAGÉE
+# =====================
+def ecrire_arrow(df, chemin, colonnes=COLONNES_RAPPORT):
+    """Écrit les `colonnes` de `df` au format Arrow IPC non compressé (lisible en `memory_map`)."""
+    table = pa.Table.from_pandas(df[colonnes], preserve_index=False)
+    with pa.OSFile(str(chemin), "wb") as sortie:
+        with pa.ipc.new_file(sortie, table.schema) as writer:
+            writer.write_table(table)
+
+
+def ouvrir_arrow(chemin):
+    """DataFrame adossé au fichier Arrow projeté en mémoire, sans copie des colonnes."""
+    table = pa.ipc.open_file(pa.memory_map(str(chemin))).read_all()
+    return table.to_pandas(split_blocks=True)
+
+
+def _initialiser(chemin):
+    global _df
+    _df = indexer(ouvrir_arrow(chemin))
+
+
+def _produire(dossier, repertoire):
+    """Rend `dossier` dans un processus de travail ; renvoie `(fichier, octets, secondes)`."""
+    debut = time.perf_counter()
+    contenu = rapport_html(_df, dossier["titre"], dossier["filtres"])
+    chemin = Path(repertoire) / dossier["fichier"]
+    temporaire = chemin.with_suffix(f".{os.getpid()}.tmp")
+    temporaire.write_text(contenu, encoding="utf-8")
+    os.replace(temporaire, chemin)
+    return dossier["fichier"], len(contenu.encode("utf-8")), time.perf_counter() - debut
+
+
+# =====================
+# GRAPHIQUES ET TABLEAUX
+# =====================
+def _mise_en_forme(fig, titre, height=400, **axes):
+    fig.update_layout(
+        title=dict(text=titre, font=dict(color="#ff6b35")),
+        plot_bgcolor="rgba(0,0,0,0)",
+        paper_bgcolor="rgba(0,0,0,0)",
+        font=dict(color="#e8d8c8"),
+        xaxis=dict(gridcolor="rgba(255,107,53,0.1)", **axes.get("xaxis", {})),
+        yaxis=dict(gridcolor="rgba(255,107,53,0.1)", **axes.get("yaxis", {})),
+        showlegend=False,
+        height=height
+    )
+    return fig.to_html(full_html=False, include_plotlyjs=False, config={"displaylogo": False})
+
+
+def graphiques(annuels, mensuels, annee_mois):
+    """Fragments HTML des graphiques du dossier (Plotly, sans la bibliothèque)."""
+    fig_nb = px.area(annuels, x="annee", y="nb_incendies", labels={"annee": "Année", "nb_incendies": "Nombre d'incendies"})
+    fig_nb.update_traces(fill="tozeroy", fillcolor="rgba(255,107,53,0.3)", line=dict(color="#ff6b35", width=2))
+
+    fig_surface = go.Figure(go.Bar(x=annuels["annee"], y=annuels["surface_brulee"], marker_color="#cc0000"))
+    fig_surface.update_layout(xaxis_title="Année", yaxis_title="Surface brûlée (ha)")
+
+    mensuels = mensuels.assign(mois_nom=mensuels["mois"].map(NOMS_MOIS))
+    fig_mois = px.bar(
+        mensuels,
+        x="mois_nom",
+        y="nb_incendies",
+        labels={"mois_nom": "Mois", "nb_incendies": "Nombre d'incendies"},
+        color="nb_incendies",
+        color_continuous_scale=[[0, "#ffcc00"], [0.5, "#ff6b35"], [1, "#cc0000"]]
+    )
+    fig_mois.update_coloraxes(showscale=False)
+
+    pivot = annee_mois.pivot(index="mois", columns="annee", values="nb_incendies").fillna(0)
+    fig_heatmap = px.imshow(
+        pivot,
+        labels=dict(x="Année", y="Mois", color="Incendies"),
+        x=pivot.columns,
+        y=[NOMS_MOIS.get(m, m) for m in pivot.index],
+        color_continuous_scale=[[0, "#1a0a0a"], [0.2, "#ff9900"], [0.5, "#ff6b35"], [0.8, "#cc0000"], [1, "#ffcc00"]],
+        aspect="auto"
+    )
+    return [
+        _mise_en_forme(fig_nb, "🔥 Nombre d'incendies par année"),
+        _mise_en_forme(fig_surface, "🔥 Surfaces brûlées par année"),
+        _mise_en_forme(fig_mois, "📅 Nombre d'incendies par mois", xaxis=dict(tickangle=45)),
+        _mise_en_forme(fig_heatmap, "🗓️ Incendies par mois et année", height=500),
+    ]
+
+
+def _tableau(table, titre):
+    if len(table) == 0:
+        return ""
+    return f"<h3>{html.escape(titre)}</h3>" + table.to_html(index=False, border=0, classes="tableau", na_rep="-")
+
+
+def tableaux(df, annuels, filtres, une_commune):
+    """Fragments HTML des tableaux : années, communes les plus touchées et communes en hausse."""
+    top_annees = annuels.nlargest(NB_LIGNES_TABLEAUX, "surface_brulee")[["annee", "nb_incendies", "surface_brulee"]]
+    top_annees.columns = ["Année", "Nombre d'Incendies", "Surface (ha)"]
+    top_annees["Surface (ha)"] = top_annees["Surface (ha)"].round(1)
+    fragments = [_tableau(top_annees, "🏆 Années les plus touchées (surface)")]
+    if une_commune:
+        return fragments
+
+    noms = df.drop_duplicates("code_insee").set_index("code_insee")["commune"]
+    top_communes = executer(df, "agregat", par=["code_insee"], tri="surface_brulee", n=NB_LIGNES_TABLEAUX, **filtres)
+    top_communes = top_communes.assign(commune=top_communes["code_insee"].map(noms))
+    top_communes = top_communes[["code_insee", "commune", "nb_incendies", "surface_brulee"]]
+    top_communes.columns = ["Code INSEE", "Commune", "Nombre d'Incendies", "Surface (ha)"]
+    top_communes["Surface (ha)"] = top_communes["Surface (ha)"].round(1)
+    fragments.append(_tableau(top_communes, "🏘️ Communes les plus touchées (surface)"))
+
+    tendances_communes = executer(df, "tendances", cle="code_insee", **filtres)
+    hausse = tendances_communes[tendances_communes["nb_tendance"] == "hausse"]
+    top_hausse = hausse.nlargest(NB_LIGNES_TABLEAUX, "nb_pente").reset_index()
+    top_hausse = top_hausse.assign(commune=top_hausse["code_insee"].map(noms))
+    top_hausse = top_hausse[["code_insee", "commune", "nb_total", "nb_pente", "nb_p"]]
+    top_hausse.columns = ["Code INSEE", "Commune", "Nombre d'Incendies", "Pente (incendies/an)", "p-value"]
+    top_hausse["Pente (incendies/an)"] = top_hausse["Pente (incendies/an)"].round(2)
+    top_hausse["p-value"] = top_hausse["p-value"].round(4)
+    fragments.append(_tableau(top_hausse, "⚠️ Communes en hausse significative"))
+    return fragments
+
+
+# =====================
+# DOSSIER HTML
+# =====================
+_STYLE = """
+    body { background: linear-gradient(135deg, #1a0a0a 0%, #2d1810 50%, #3d1a0a 100%); color: #e8d8c8;
+           font-family: 'Montserrat', Arial, sans-serif; margin: 0; padding: 30px 50px; }
+    h1, h2, h3 { color: #ff6b35; }
+    .sous-titre { color: #b0a090; }
+    .indicateurs { display: flex; gap: 15px; flex-wrap: wrap; margin: 20px 0; }
+    .stat-box { flex: 1; min-width: 160px; text-align: center; padding: 20px; background: rgba(255,107,53,0.1);
+                border-radius: 15px; border: 1px solid rgba(255,107,53,0.2); }
+    .stat-number { font-size: 1.8rem; font-weight: 700; color: #ff6b35; }
+    .stat-label { color: #b0a090; font-size: 0.9rem; margin-top: 5px; }
+    .insight-box { background: linear-gradient(135deg, rgba(255,107,53,0.1), rgba(255,204,0,0.05));
+                   border-left: 4px solid #ff6b35; border-radius: 10px; padding: 15px 20px; margin: 15px 0; }
+    .grille { display: grid; grid-template-columns: 1fr 1fr; gap: 20px; }
+    .tableau { border-collapse: collapse; width: 100%; margin-bottom: 20px; }
+    .tableau th { color: #ff6b35; text-align: left; border-bottom: 1px solid rgba(255,107,53,0.4); padding: 6px; }
+    .tableau td { border-bottom: 1px solid rgba(255,107,53,0.1); padding: 6px; }
+    footer { color: #b0a090; font-size: 0.8rem; margin-top: 40px; }
+"""
+
+
+def _indicateur(valeur, libelle):
+    return f'<div class="stat-box"><div class="stat-number">{valeur}</div><div class="stat-label">{libelle}</div></div>'
+
+
+def rapport_html(df, titre, filtres, plotlyjs=FICHIER_PLOTLY):
+    """Dossier HTML complet d'une sélection (`filtres` des requêtes) ; `plotlyjs` est l'URL de la bibliothèque."""
+    annees = filtres.get("annees")
+    periode = f"{annees[0]} - {annees[1]}" if annees is not None else "tout l'historique"
+    entete = (
+        f"<h1>🔥 {html.escape(titre)}</h1>"
+        f'<p class="sous-titre">Incendies de forêt (base Prométhée) • {periode}</p>'
+    )
+    nb = compter(df, **filtres)
+    if nb == 0:
+        corps = entete + '<div class="insight-box"><p>Aucun incendie pour cette sélection.</p></div>'
+    else:
+        annuels = executer(df, "agregat", par=["annee"], **filtres)
+        mensuels = executer(df, "agregat", par=["mois"], **filtres)
+        annee_mois = executer(df, "agregat", par=["annee", "mois"], **filtres)
+        tendance = executer(df, "tendances", cle=None, **filtres).iloc[0]
+        surface = annuels["surface_brulee"].sum()
+        pic = annuels.loc[annuels["nb_incendies"].idxmax()]
+        libelle_tendance = {
+            "baisse": "une tendance significative à la diminution",
+            "hausse": "une tendance significative à l'augmentation",
+            "stable": "aucune tendance significative"
+        }[tendance["nb_tendance"]]
+        pente = "—" if pd.isna(tendance["nb_pente"]) else f"{tendance['nb_pente']:+.1f}"
+
+        indicateurs = "".join([
+            _indicateur(f"{nb:,}".replace(",", " "), "Incendies"),
+            _indicateur(f"{surface:,.0f}".replace(",", " "), "Hectares brûlés"),
+            _indicateur(f"{surface / nb:.2f}", "Surface moyenne (ha)"),
+            _indicateur(f"{int(pic['annee'])}", f"Année record ({int(pic['nb_incendies'])} feux)"),
+            _indicateur(pente, "Incendies / an (Sen)"),
+        ])
+        figures = graphiques(annuels, mensuels, annee_mois)
+        une_commune = len(filtres.get("communes") or []) == 1
+        corps = (
+            entete
+            + f'<div class="indicateurs">{indicateurs}</div>'
+            + f'<div class="insight-box"><p>💡 <strong>Observation :</strong> Le test de Mann-Kendall indique '
+            + f'{libelle_tendance} du nombre d\'incendies (p = {tendance["nb_p"]:.3f}), avec une pente de Sen de '
+            + f'<strong>{pente} incendies/an</strong>.</p></div>'
+            + figures[0]
+            + f'<div class="grille"><div>{figures[1]}</div><div>{figures[2]}</div></div>'
+            + figures[3]
+            + "".join(tableaux(df, annuels, filtres, une_commune))
+        )
+    genere = datetime.now().strftime("%d/%m/%Y %H:%M")
+    return f"""<!DOCTYPE html>
+<html lang="fr">
+<head>
+<meta charset="utf-8">
+<title>{html.escape(titre)} - Incendies {periode}</title>
+<script src="{plotlyjs}"></script>
+<style>{_STYLE}</style>
+</head>
+<body>
+{corps}
+<footer>PyroViz PACA • Dossier généré le {genere}</footer>
+</body>
+</html>
+"""
+
+
+# =====================
+# GÉNÉRATION EN LOT
+# =====================
+def dossiers(df, annees=None, departements=None, communes=None):
+    """Liste des dossiers à produire : un par département, puis un par commune demandée."""
+    base = {"annees": list(annees)} if annees is not None else {}
+    suffixe = f"_{annees[0]}_{annees[1]}" if annees is not None else ""
+    liste = []
+    for dep in departements or DEPARTEMENTS_PACA:
+        liste.append({
+            "titre": f"{dep} - {NOMS_DEPARTEMENTS.get(dep, dep)}",
+            "filtres": {**base, "departements": [dep]},
+            "fichier": f"departement_{dep}{suffixe}.html",
+        })
+    noms = df.drop_duplicates("code_insee").set_index("code_insee")["commune"] if communes else None
+    for code in communes or []:
+        nom = noms.get(code, code)
+        liste.append({
+            "titre": f"{nom} ({code})",
+            "filtres": {**base, "communes": [code]},
+            "fichier": f"commune_{code}{suffixe}.html",
+        })
+    return liste
+
+
+def generer(repertoire, annees=None, departements=None, communes=None, processus=None,
+            source=CHEMIN_INCENDIES, df=None):
+    """Produit tous les dossiers dans `repertoire` ; renvoie `[(fichier, octets, secondes)]`."""
+    from plotly.offline import get_plotlyjs
+
+    repertoire = Path(repertoire)
+    repertoire.mkdir(parents=True, exist_ok=True)
+    df = charger_incendies(source) if df is None else df
+    liste = dossiers(df, annees, departements, communes)
+    (repertoire / FICHIER_PLOTLY).write_text(get_plotlyjs(), encoding="utf-8")
+
+    resultats = []
+    with tempfile.TemporaryDirectory() as temporaire:
+        chemin = Path(temporaire) / "incendies.arrow"
+        ecrire_arrow(df, chemin)
+        with ProcessPoolExecutor(max_workers=processus, initializer=_initialiser, initargs=(chemin,)) as pool:
+            futurs = [pool.submit(_produire, dossier, repertoire) for dossier in liste]
+            for futur in as_completed(futurs):
+                resultats.append(futur.result())
+    return sorted(resultats)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dossiers HTML par département et par commune")
+    parser.add_argument("sortie", type=Path, help="répertoire des dossiers")
+    parser.add_argument("--annees", type=int, nargs=2, metavar=("DEBUT", "FIN"))
+    parser.add_argument("--departements", nargs="+")
+    parser.add_argument("--communes", nargs="+", help="codes INSEE")
+    parser.add_argument("--processus", type=int, default=None, help="processus de rendu (défaut : nombre de cœurs)")
+    parser.add_argument("--source", type=Path, default=CHEMIN_INCENDIES)
+    args = parser.parse_args()
+
+    debut = time.perf_counter()
+    resultats = generer(args.sortie, args.annees, args.departements, args.communes, args.processus, args.source)
+    for fichier, octets, secondes in resultats:
+        print(f"{fichier:<40} {octets / 1024:>8.0f} Ko  {secondes:5.2f} s")
+    print(f"{len(resultats)} dossiers en {time.perf_counter() - debut:.1f} s -> {args.sortie}")
+
+
+if __name__ == "__main__":
+    main()
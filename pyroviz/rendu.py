@@ -0,0 +1,91 @@
+"""Rendu des longues séries temporelles (journalières, horaires).
+
+Au-delà de quelques milliers de points, les traces SVG de Plotly ralentissent
+le navigateur. `trace_serie` réduit la série côté serveur par LTTB
+(Largest-Triangle-Three-Buckets) à environ un point par pixel, en conservant
+toujours les plus forts pics, et bascule sur une trace WebGL (`Scattergl`)
+quand la série reste longue.
+"""
+import numpy as np
+import plotly.graph_objects as go
+
+# Nombre de points à partir duquel la trace passe en WebGL
+SEUIL_WEBGL = 5_000
+# Nombre de points conservés, de l'ordre de la largeur du graphique en pixels
+LARGEUR_CIBLE = 1_200
+# Plus fortes valeurs toujours conservées (ex. les pics de 2003)
+PICS = 10
+
+
+# =====================
+# SOUS-ÉCHANTILLONNAGE
+# =====================
+def _numerique(x):
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        return x.astype("datetime64[ns]").astype(np.int64).astype(float)
+    return x.astype(float)
+
+
+def lttb(x, y, cible=LARGEUR_CIBLE):
+    """Indices des `cible` points retenus par Largest-Triangle-Three-Buckets.
+
+    Le premier et le dernier point sont gardés ; chaque seau intermédiaire
+    garde le point formant le plus grand triangle avec le point retenu
+    précédemment et la moyenne du seau suivant.
+    """
+    n = len(y)
+    if cible >= n or cible < 3:
+        return np.arange(n)
+    x = _numerique(x)
+    y = np.nan_to_num(np.asarray(y, dtype=float))
+
+    bornes = np.linspace(1, n - 1, cible - 1).astype(np.int64)
+    bornes_suivantes = np.append(bornes[2:], n)
+    # Moyennes de chaque seau suivant, par sommes cumulées
+    cx = np.concatenate([[0.0], np.cumsum(x)])
+    cy = np.concatenate([[0.0], np.cumsum(y)])
+    taille = bornes_suivantes - bornes[1:]
+    moy_x = (cx[bornes_suivantes] - cx[bornes[1:]]) / taille
+    moy_y = (cy[bornes_suivantes] - cy[bornes[1:]]) / taille
+
+    indices = np.empty(cible, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    a = 0
+    for i in range(cible - 2):
+        debut, fin = bornes[i], bornes[i + 1]
+        aires = np.abs(
+            (x[a] - moy_x[i]) * (y[debut:fin] - y[a])
+            - (x[a] - x[debut:fin]) * (moy_y[i] - y[a])
+        )
+        a = debut + int(np.argmax(aires))
+        indices[i + 1] = a
+    return indices
+
+
+def sous_echantillonner(x, y, cible=LARGEUR_CIBLE, pics=PICS):
+    """Indices LTTB complétés par les `pics` plus fortes valeurs, triés (`cible=None` : tout garder)."""
+    if cible is None:
+        return np.arange(len(y))
+    indices = lttb(x, y, cible)
+    if len(indices) < len(y) and pics > 0:
+        valeurs = np.nan_to_num(np.asarray(y, dtype=float), nan=-np.inf)
+        plus_forts = np.argpartition(valeurs, -pics)[-pics:] if pics < len(valeurs) else np.arange(len(valeurs))
+        indices = np.union1d(indices, plus_forts)
+    return indices
+
+
+# =====================
+# TRACES PLOTLY
+# =====================
+def trace_serie(x, y, cible=LARGEUR_CIBLE, seuil=SEUIL_WEBGL, pics=PICS, **proprietes):
+    """Trace Plotly d'une longue série : LTTB au-delà de `cible` points, WebGL au-delà de `seuil`.
+
+    Le seuil WebGL porte sur les points effectivement tracés : il ne joue que si
+    la réduction est désactivée (`cible=None`) ou réglée au-dessus du seuil.
+    `proprietes` est transmis à `go.Scatter` / `go.Scattergl` (mode, line, fill...).
+    """
+    x, y = np.asarray(x), np.asarray(y)
+    indices = sous_echantillonner(x, y, cible, pics)
+    classe = go.Scattergl if len(indices) > seuil else go.Scatter
+    return classe(x=x[indices], y=y[indices], **proprietes)
@@ -0,0 +1,192 @@
+"""Catalogue des requêtes d'agrégation utilisées par les pages.
+
+Chaque requête est une fonction `(df, **params)` dont les paramètres sont des
+valeurs JSON (listes, nombres, chaînes) : elle peut être exécutée sur place par
+une page ou à distance par le service d'agrégation (`pyroviz.service`). Les
+résultats sont des DataFrames, transportés au format `serialiser`.
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from pyroviz.animation import cube_animation
+from pyroviz.distribution import cube_tailles
+from pyroviz.fwi import climatologie
+from pyroviz.episodes import FENETRE_JOURS, detecter_episodes
+from pyroviz.index import index_de
+from pyroviz.meteo import charger_meteo, conditions_feux
+from pyroviz.plans import CLES_CUBE, Plan
+from pyroviz.points import points_feux
+from pyroviz.risque import scores_risque
+from pyroviz.series import serie_journaliere
+from pyroviz.tendances import tendances
+
+# Moteur des agrégations groupées (`pyroviz.plans`) : "pandas" (référence), "arrow" ou "polars"
+MOTEUR = os.environ.get("PYROVIZ_MOTEUR", "pandas")
+
+
+# =====================
+# FILTRAGE
+# =====================
+def masque(df, annees=None, mois=None, departements=None, communes=None):
+    """Masque booléen des lignes retenues, `None` si aucun filtre n'est actif.
+
+    Résolu par l'index bitmap de `df` s'il a été construit (`pyroviz.index`),
+    sinon par comparaisons directes sur les tableaux NumPy des colonnes :
+    aucune copie intermédiaire du DataFrame.
+    """
+    index = index_de(df)
+    if index is not None:
+        return index.masque(annees=annees, mois=mois, departements=departements, communes=communes)
+    conditions = []
+    if annees is not None:
+        annee = df["annee"].to_numpy()
+        conditions.append((annee >= annees[0]) & (annee <= annees[1]))
+    if mois is not None:
+        conditions.append(df["mois"].to_numpy() == mois)
+    if departements is not None:
+        conditions.append(df["departement"].isin(departements).to_numpy())
+    if communes is not None:
+        conditions.append(df["code_insee"].isin(communes).to_numpy())
+    if not conditions:
+        return None
+    return np.logical_and.reduce(conditions)
+
+
+def indices(df, **filtres):
+    """Positions des lignes retenues (tableau d'entiers), sans matérialiser la sélection."""
+    selection = masque(df, **filtres)
+    return np.arange(len(df)) if selection is None else np.flatnonzero(selection)
+
+
+def compter(df, **filtres):
+    """Nombre de lignes retenues, sans matérialiser la sélection."""
+    index = index_de(df)
+    if index is not None:
+        return index.compter(**filtres)
+    selection = masque(df, **filtres)
+    return len(df) if selection is None else int(np.count_nonzero(selection))
+
+
+def filtrer(df, **filtres):
+    """Sélection commune à toutes les pages : période, mois, départements, communes.
+
+    Sans filtre actif (ou si toutes les lignes sont retenues), renvoie `df`
+    lui-même : les appelants ne doivent pas modifier le résultat.
+    """
+    selection = masque(df, **filtres)
+    if selection is None or selection.all():
+        return df
+    return df[selection]
+
+
+# =====================
+# REQUÊTES
+# =====================
+def agregat(df, par=(), tri=None, n=None, **filtres):
+    """Nombre d'incendies et surface brûlée, groupés par les colonnes `par`.
+
+    Avec `tri` (`nb_incendies` ou `surface_brulee`), les groupes sont classés
+    par valeur décroissante et `n` limite le résultat aux premiers.
+    """
+    return Plan(par, tri, n, **filtres).executer(df, MOTEUR)
+
+
+def requete_cube_communes(df, **filtres):
+    """Cube commune × année × mois (`pyroviz.communes.cube_communes`) de la sélection."""
+    return Plan(CLES_CUBE, **filtres).executer(df, MOTEUR)
+
+
+def requete_cube_animation(df, niveau="commune", **filtres):
+    return cube_animation(filtrer(df, **filtres), niveau)
+
+
+def requete_cube_tailles(df, **filtres):
+    return cube_tailles(filtrer(df, **filtres))
+
+
+def requete_serie_journaliere(df, **filtres):
+    return serie_journaliere(filtrer(df, **filtres))
+
+
+def requete_points_feux(df, **filtres):
+    return points_feux(filtrer(df, **filtres))
+
+
+def requete_tendances(df, cle="code_insee", **filtres):
+    """Tendances par `cle` ; la période filtrée sert d'axe des années (années vides = 0)."""
+    annees = filtres.get("annees")
+    axe = range(annees[0], annees[1] + 1) if annees is not None else None
+    return tendances(filtrer(df, **filtres), cle, annees=axe)
+
+
+def requete_episodes(df, fenetre_jours=FENETRE_JOURS, **filtres):
+    _, episodes = detecter_episodes(filtrer(df, **filtres), fenetre_jours)
+    return episodes
+
+
+def requete_meteo(df, variable="vent", **filtres):
+    """Feux et surfaces par classe d'une variable météo du jour d'alerte (vide sans artefact météo)."""
+    return conditions_feux(filtrer(df, **filtres), charger_meteo(), variable)
+
+
+def requete_climatologie_fwi(df, annees=None, departements=None, communes=None):
+    """FWI moyen et part des jours de danger par mois et territoire (artefact FWI, indépendant de `df`)."""
+    return climatologie(annees=annees, departements=departements, communes=communes)
+
+
+def requete_risque_communes(df):
+    """Score de risque par commune, sur tout l'historique (artefact `pyroviz.risque`)."""
+    return scores_risque(df)
+
+
+REQUETES = {
+    "agregat": agregat,
+    "cube_communes": requete_cube_communes,
+    "cube_animation": requete_cube_animation,
+    "cube_tailles": requete_cube_tailles,
+    "serie_journaliere": requete_serie_journaliere,
+    "points_feux": requete_points_feux,
+    "tendances": requete_tendances,
+    "episodes": requete_episodes,
+    "meteo": requete_meteo,
+    "climatologie_fwi": requete_climatologie_fwi,
+    "risque_communes": requete_risque_communes,
+}
+
+
+def executer(df, nom, **params):
+    """Exécute la requête `nom` du catalogue sur `df`."""
+    if nom not in REQUETES:
+        raise KeyError(f"Requête inconnue : {nom}")
+    return REQUETES[nom](df, **params)
+
+
+# =====================
+# TRANSPORT JSON
+# =====================
+def serialiser(resultat):
+    """DataFrame -> dict JSON (colonnes, index, colonnes de dates et données)."""
+    index = [n for n in resultat.index.names if n is not None]
+    plat = resultat.reset_index() if index else resultat
+    dates = [c for c in plat.columns if pd.api.types.is_datetime64_any_dtype(plat[c])]
+    split = json.loads(plat.to_json(orient="split", index=False, date_format="iso", double_precision=15))
+    return {
+        "colonnes": split["columns"],
+        "dates": dates,
+        "index": index,
+        "donnees": split["data"],
+    }
+
+
+def deserialiser(contenu):
+    """dict JSON -> DataFrame, index et colonnes de dates restaurés."""
+    resultat = pd.DataFrame(contenu["donnees"], columns=contenu["colonnes"])
+    for colonne in contenu["dates"]:
+        resultat[colonne] = pd.to_datetime(resultat[colonne])
+    resultat = resultat.infer_objects()
+    if contenu["index"]:
+        resultat = resultat.set_index(contenu["index"])
+    return resultat
@@ -0,0 +1,214 @@
+"""Score de risque incendie par commune, pour l'aide à la décision.
+
+Quatre composantes, calculées sur tout l'historique de chaque commune :
+- `frequence` : nombre moyen de feux par an ;
+- `part_surface` : surface brûlée annuelle moyenne, en % de la surface
+  communale (`surf_ha` de `SHP_meteo`) ;
+- `tendance` : statistique z de Mann-Kendall du nombre de feux sur les
+  `ANNEES_TENDANCE` dernières années (hausse récente > 0) ;
+- `saisonnalite` : part des feux survenus en saison estivale (`MOIS_ETE`).
+
+Chaque composante est convertie en rang centile parmi les communes, puis le
+score (0-100) est la moyenne pondérée des rangs (`POIDS`), sur les composantes
+disponibles ; `classe` en découle par paliers de 25 points.
+
+Le calcul part d'un cube commune × année (feux, surface, feux d'été) conservé
+comme artefact avec les scores. Chaque année du cube garde son empreinte
+(hachage de ses lignes) : à la mise à jour, seules les années nouvelles ou
+modifiées de la base sont réagrégées, les années disparues sont retirées ; les
+scores, qui ne portent que sur ~950 communes, sont ensuite recalculés depuis le cube.
+
+    python -m pyroviz.risque           # met à jour data/incendies/risque_communes.parquet
+"""
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from pyroviz.donnees import CHEMIN_COMMUNES, DATA_DIR, charger_incendies
+from pyroviz.tendances import mann_kendall
+
+CHEMIN_RISQUE = DATA_DIR / "incendies" / "risque_communes.parquet"
+POIDS = {"frequence": 0.35, "part_surface": 0.30, "tendance": 0.20, "saisonnalite": 0.15}
+ANNEES_TENDANCE = 20
+MOIS_ETE = (6, 7, 8, 9)
+CLASSES = ["Faible", "Modéré", "Élevé", "Très élevé"]
+COULEURS_CLASSES = {"Faible": "#ffcc00", "Modéré": "#ff9933", "Élevé": "#ff3300", "Très élevé": "#990000"}
+
+_memo = {}
+
+
+# =====================
+# CUBE COMMUNE × ANNÉE
+# =====================
+def cube_annuel(df):
+    """Feux, surface brûlée et feux d'été par commune et année, avec l'empreinte de l'année."""
+    ete = df["mois"].isin(MOIS_ETE).to_numpy()
+    cube = (
+        df.assign(ete=ete)
+        .groupby(["code_insee", "annee"], observed=True)
+        .agg(nb_incendies=("surface_brulee", "size"), surface_brulee=("surface_brulee", "sum"), nb_ete=("ete", "sum"))
+        .reset_index()
+    )
+    empreintes = empreintes_annuelles(df)
+    cube["empreinte"] = empreintes.reindex(cube["annee"]).to_numpy(dtype=np.uint64)
+    return cube
+
+
+def empreintes_annuelles(df):
+    """Empreinte de chaque année : somme (modulo 2^64) des hachages des lignes agrégées.
+
+    Indépendante de l'ordre des lignes, elle change avec toute correction de
+    commune, de mois ou de surface, même à totaux annuels constants.
+    """
+    lignes = df[df["code_insee"].notna().to_numpy()]
+    hachages = pd.util.hash_pandas_object(
+        lignes[["code_insee", "annee", "mois", "surface_brulee"]], index=False
+    ).to_numpy()
+    annees, positions = np.unique(lignes["annee"].to_numpy(), return_inverse=True)
+    sommes = np.zeros(len(annees), dtype=np.uint64)
+    np.add.at(sommes, positions, hachages)
+    return pd.Series(sommes, index=pd.Index(annees, name="annee"), name="empreinte")
+
+
+def actualiser_cube(df, cube=None):
+    """Cube à jour pour `df` : seules les années nouvelles ou modifiées de la base sont réagrégées,
+    les années disparues de la base sont retirées.
+
+    Renvoie `(cube, annees_recalculees, modifie)` ; `modifie` est vrai dès que le
+    cube diffère de celui reçu, y compris par le seul retrait d'années.
+    """
+    base = empreintes_annuelles(df)
+    if cube is None or len(cube) == 0 or "empreinte" not in cube.columns:
+        return cube_annuel(df), sorted(base.index.tolist()), True
+    existant = cube.groupby("annee")["empreinte"].first()
+    communes = base.index.intersection(existant.index)
+    differentes = communes[existant[communes].to_numpy() != base[communes].to_numpy()]
+    modifiees = base.index.difference(existant.index).union(differentes)
+    retirees = existant.index.difference(base.index)
+    if len(modifiees) == 0 and len(retirees) == 0:
+        return cube, [], False
+    conserve = cube[cube["annee"].isin(base.index) & ~cube["annee"].isin(modifiees)]
+    nouveau = cube_annuel(df[df["annee"].isin(modifiees).to_numpy()])
+    cube = pd.concat([conserve, nouveau], ignore_index=True).sort_values(["code_insee", "annee"], ignore_index=True)
+    return cube, sorted(modifiees.tolist()), True
+
+
+# =====================
+# SCORES
+# =====================
+def charger_surfaces(chemin=CHEMIN_COMMUNES):
+    """Surface (ha) et nom de chaque commune, lus dans la table attributaire de `SHP_meteo`."""
+    import geopandas as gpd
+
+    table = Path(chemin).with_suffix(".dbf")
+    if not table.exists():
+        return None
+    attributs = gpd.read_file(table, ignore_geometry=True)[["insee", "nom", "surf_ha"]]
+    return attributs.rename(columns={"insee": "code_insee"}).drop_duplicates("code_insee").set_index("code_insee")
+
+
+def scores(cube, surfaces=None, annees_tendance=ANNEES_TENDANCE, poids=POIDS):
+    """Composantes, score (0-100) et classe de risque par commune (index `code_insee`).
+
+    Avec `surfaces`, toutes les communes du fond sont notées, y compris celles
+    sans aucun feu ; sans elles, `part_surface` est manquante et le score
+    repose sur les trois autres composantes.
+    """
+    codes = pd.Index(sorted(cube["code_insee"].unique()), name="code_insee")
+    if surfaces is not None:
+        codes = codes.union(surfaces.index).rename("code_insee")
+    annees = np.arange(cube["annee"].min(), cube["annee"].max() + 1)
+    lignes = codes.get_indexer(cube["code_insee"])
+    colonnes = cube["annee"].to_numpy() - annees[0]
+    nb = np.zeros((len(codes), len(annees)))
+    np.add.at(nb, (lignes, colonnes), cube["nb_incendies"].to_numpy())
+
+    totaux = cube.groupby("code_insee")[["nb_incendies", "surface_brulee", "nb_ete"]].sum().reindex(codes, fill_value=0)
+    resultat = pd.DataFrame(index=codes)
+    resultat["nb_incendies"] = totaux["nb_incendies"].astype(np.int64)
+    resultat["surface_brulee"] = totaux["surface_brulee"]
+    resultat["frequence"] = totaux["nb_incendies"] / len(annees)
+    if surfaces is not None:
+        surf_ha = surfaces["surf_ha"].reindex(codes)
+        resultat["part_surface"] = 100.0 * totaux["surface_brulee"] / len(annees) / surf_ha.where(surf_ha > 0)
+    else:
+        resultat["part_surface"] = np.nan
+    resultat["tendance"] = mann_kendall(nb[:, -annees_tendance:])["z"]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        resultat["saisonnalite"] = (totaux["nb_ete"] / totaux["nb_incendies"]).where(totaux["nb_incendies"] > 0, 0.0)
+
+    rangs = resultat[list(poids)].rank(pct=True)
+    ponderes = rangs.mul(pd.Series(poids), axis=1)
+    disponibles = rangs.notna().mul(pd.Series(poids), axis=1).sum(axis=1)
+    resultat["score"] = (100.0 * ponderes.sum(axis=1) / disponibles).round(1)
+    resultat["classe"] = pd.cut(resultat["score"], [-0.1, 25, 50, 75, 100], labels=CLASSES).astype(str)
+    if surfaces is not None:
+        resultat.insert(0, "nom", surfaces["nom"].reindex(codes))
+    return resultat
+
+
+# =====================
+# ARTEFACT
+# =====================
+def chemin_cube(cible):
+    """Cube associé à l'artefact de scores `cible`, rangé à côté de lui."""
+    cible = Path(cible)
+    return cible.with_name(f"{cible.stem}_cube.parquet")
+
+
+CHEMIN_CUBE_RISQUE = chemin_cube(CHEMIN_RISQUE)
+
+
+def _ecrire(table, cible, index):
+    cible = Path(cible)
+    temporaire = cible.with_suffix(f".{os.getpid()}.tmp")
+    table.to_parquet(temporaire, index=index)
+    os.replace(temporaire, cible)
+
+
+def mettre_a_jour(df=None, cible=CHEMIN_RISQUE, chemin_communes=CHEMIN_COMMUNES):
+    """Met à jour le cube et les scores ; renvoie `(scores, annees_recalculees)`.
+
+    Si le cube est inchangé (aucune année nouvelle, modifiée ou retirée),
+    l'artefact existant est relu tel quel. Les scores sont écrits avant le
+    cube : après une interruption entre les deux, le cube ancien fait
+    réagréger les mêmes années et recalculer les scores.
+    """
+    df = charger_incendies() if df is None else df
+    cible = Path(cible)
+    fichier_cube = chemin_cube(cible)
+    cube = pd.read_parquet(fichier_cube) if fichier_cube.exists() else None
+    cube, recalculees, modifie = actualiser_cube(df, cube)
+    if not modifie and cible.exists():
+        return pd.read_parquet(cible), []
+    resultat = scores(cube, charger_surfaces(chemin_communes))
+    _ecrire(resultat, cible, index=True)
+    _ecrire(cube, fichier_cube, index=False)
+    return resultat, recalculees
+
+
+def scores_risque(df, cible=CHEMIN_RISQUE):
+    """Scores à jour pour `df` (artefact mis à jour au besoin), mémorisés par base chargée."""
+    if len(df) == 0:
+        return pd.DataFrame(columns=["score", "classe"])
+    cle = (id(df), len(df), str(cible))
+    if cle not in _memo:
+        _memo.clear()
+        _memo[cle], _ = mettre_a_jour(df, cible)
+    return _memo[cle]
+
+
+def main():
+    resultat, recalculees = mettre_a_jour()
+    if recalculees:
+        print(f"Années réagrégées : {recalculees[0]}-{recalculees[-1]} ({len(recalculees)})")
+    else:
+        print("Aucune année nouvelle ou modifiée")
+    print(resultat["classe"].value_counts().reindex(CLASSES).to_string())
+    print(f"-> {CHEMIN_RISQUE}")
+
+
+if __name__ == "__main__":
+    main()
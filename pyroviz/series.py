@@ -0,0 +1,136 @@
+"""Séries temporelles journalières construites à partir de l'horodatage `Alerte`.
+
+Les cumuls glissants (7, 15, 30 jours) sont obtenus par différence de sommes
+cumulées sur un index dense de jours : le coût est linéaire en nombre de jours,
+quelle que soit la taille de la fenêtre, et le calcul s'applique d'un bloc à une
+matrice (groupes × jours), par exemple les 946 communes sur 50 ans.
+"""
+import numpy as np
+import pandas as pd
+
+FENETRES = (7, 15, 30)
+
+
+# =====================
+# INDEX DENSE DES JOURS
+# =====================
+def index_journalier(alertes, debut=None, fin=None):
+    """Construit l'index dense des jours et la position de chaque alerte dans cet index.
+
+    Retourne `(jours, positions, valides)` : `jours` couvre chaque jour de `debut`
+    à `fin` inclus, `positions[i]` est l'indice du jour de l'alerte i, et `valides`
+    masque les alertes datées et comprises dans l'intervalle. Sans alerte datée
+    pour borner l'index, `jours` est vide et aucune alerte n'est valide.
+    """
+    alertes = pd.to_datetime(pd.Series(alertes)).dt.normalize()
+    debut = pd.Timestamp(debut) if debut is not None else alertes.min()
+    fin = pd.Timestamp(fin) if fin is not None else alertes.max()
+    if pd.isna(debut) or pd.isna(fin):
+        return pd.DatetimeIndex([], freq="D"), np.zeros(len(alertes), dtype=np.int64), np.zeros(len(alertes), dtype=bool)
+    jours = pd.date_range(debut, fin, freq="D")
+
+    jour_ns = alertes.to_numpy(dtype="datetime64[D]")
+    valides = ~np.isnat(jour_ns)
+    positions = np.zeros(len(jour_ns), dtype=np.int64)
+    positions[valides] = (jour_ns[valides] - np.datetime64(debut.date(), "D")).astype(np.int64)
+    valides &= (positions >= 0) & (positions < len(jours))
+    return jours, positions, valides
+
+
+# =====================
+# CUMULS GLISSANTS
+# =====================
+def cumuls_glissants(valeurs, fenetre):
+    """Somme glissante sur les `fenetre` derniers jours (dernier axe), en O(n).
+
+    La valeur au jour t est la somme des jours t-fenetre+1 à t ; les premiers
+    jours de la série portent une fenêtre tronquée.
+    """
+    valeurs = np.asarray(valeurs)
+    cumul = np.cumsum(valeurs, axis=-1, dtype=np.float64)
+    resultat = cumul.copy()
+    resultat[..., fenetre:] -= cumul[..., :-fenetre]
+    return resultat
+
+
+def serie_journaliere(df, debut=None, fin=None, fenetres=FENETRES):
+    """Nombre d'incendies et surface brûlée par jour, avec leurs cumuls glissants.
+
+    Retourne un DataFrame indexé par jour (sans trou) avec les colonnes
+    `nb_incendies`, `surface_brulee`, puis `nb_<w>j` et `surface_<w>j` pour
+    chaque fenêtre.
+    """
+    jours, positions, valides = index_journalier(df["Alerte"], debut, fin)
+    pos = positions[valides]
+    surfaces = df["surface_brulee"].to_numpy(dtype=np.float64)[valides]
+
+    nb = np.bincount(pos, minlength=len(jours))
+    surface = np.bincount(pos, weights=surfaces, minlength=len(jours))
+
+    serie = pd.DataFrame({"nb_incendies": nb, "surface_brulee": surface}, index=jours)
+    serie.index.name = "jour"
+    for w in fenetres:
+        serie[f"nb_{w}j"] = cumuls_glissants(nb, w).astype(np.int64)
+        serie[f"surface_{w}j"] = cumuls_glissants(surface, w)
+    return serie
+
+
+def matrice_journaliere(df, cle="code_insee", debut=None, fin=None):
+    """Comptes et surfaces journaliers par groupe (commune, département...).
+
+    Retourne `(codes, jours, nb, surface)` où `nb` (int32) et `surface` (float32)
+    sont des matrices (groupes × jours) remplies par un unique `bincount` sur
+    l'indice aplati groupe × jour.
+    """
+    jours, positions, valides = index_journalier(df["Alerte"], debut, fin)
+    codes, groupes = np.unique(df[cle].astype(str).to_numpy()[valides], return_inverse=True)
+    n_jours = len(jours)
+    plat = groupes.astype(np.int64) * n_jours + positions[valides]
+    taille = len(codes) * n_jours
+
+    nb = np.bincount(plat, minlength=taille).astype(np.int32)
+    surfaces = df["surface_brulee"].to_numpy(dtype=np.float64)[valides]
+    surface = np.bincount(plat, weights=surfaces, minlength=taille).astype(np.float32)
+    return codes, jours, nb.reshape(len(codes), n_jours), surface.reshape(len(codes), n_jours)
+
+
+# =====================
+# PIRES FENÊTRES
+# =====================
+def pires_fenetres(serie, fenetre=7, colonne="surface"):
+    """Classement des années selon leur pire fenêtre glissante.
+
+    Pour chaque année, retient la fenêtre de `fenetre` jours (datée par son
+    dernier jour) qui maximise `<colonne>_<fenetre>j`, puis trie les années par
+    valeur décroissante.
+    """
+    valeurs = serie[f"{colonne}_{fenetre}j"].to_numpy()
+    annees = serie.index.year.to_numpy()
+
+    # Tri par année puis valeur décroissante : la première ligne de chaque année est son maximum
+    ordre = np.lexsort((-valeurs, annees))
+    premiers = ordre[np.r_[True, annees[ordre][1:] != annees[ordre][:-1]]] if len(ordre) else ordre
+
+    fins = serie.index[premiers]
+    classement = pd.DataFrame({
+        "annee": annees[premiers],
+        "debut": fins - pd.Timedelta(days=fenetre - 1),
+        "fin": fins,
+        "nb_incendies": serie[f"nb_{fenetre}j"].to_numpy()[premiers],
+        "surface_brulee": serie[f"surface_{fenetre}j"].to_numpy()[premiers],
+    })
+    tri = "surface_brulee" if colonne == "surface" else "nb_incendies"
+    return classement.sort_values(tri, ascending=False).reset_index(drop=True)
+
+
+def pires_fenetres_par_groupe(matrice, jours, fenetre=7):
+    """Maximum annuel de la somme glissante pour chaque groupe.
+
+    `matrice` est une matrice (groupes × jours) issue de `matrice_journaliere`.
+    Retourne `(annees, maxima)` avec `maxima` de forme (groupes × années),
+    calculé par `np.maximum.reduceat` sur les bornes d'années.
+    """
+    glissant = cumuls_glissants(matrice, fenetre)
+    annees_jours = jours.year.to_numpy()
+    bornes = np.flatnonzero(np.r_[True, annees_jours[1:] != annees_jours[:-1]])
+    return annees_jours[bornes], np.maximum.reduceat(glissant, bornes, axis=-1)
@@ -0,0 +1,152 @@
+"""Service local d'agrégation, indépendant du script Streamlit.
+
+Le service charge la base une fois par processus de travail et répond en JSON
+aux requêtes du catalogue `pyroviz.requetes`. Les connexions HTTP sont servies
+par des threads, les calculs par un pool de processus : plusieurs sessions
+Streamlit (ou plusieurs instances du dashboard) partagent ainsi les mêmes
+agrégations sans se disputer le GIL de leur propre processus.
+
+    python -m pyroviz.service --port 8765 --workers 4
+    PYROVIZ_SERVICE=http://127.0.0.1:8765 streamlit run app.py
+
+API :
+    GET  /sante                               -> {"statut": "ok", "requetes": [...]}
+    POST /requete {"nom": ..., "params": {}}  -> {"resultat": <DataFrame sérialisé>}
+"""
+import argparse
+import json
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from pyroviz.donnees import CHEMIN_INCENDIES, charger_incendies
+from pyroviz.index import indexer
+from pyroviz.requetes import REQUETES, executer, serialiser
+
+PORT = 8765
+TAILLE_CACHE = 256
+
+# Base chargée dans chaque processus de travail par `_initialiser`
+_df = None
+
+
+# =====================
+# PROCESSUS DE TRAVAIL
+# =====================
+def _initialiser(chemin):
+    global _df
+    _df = indexer(charger_incendies(chemin))
+
+
+def _calculer(nom, params):
+    """Exécute une requête dans un processus de travail et renvoie le JSON prêt à envoyer."""
+    return json.dumps({"resultat": serialiser(executer(_df, nom, **params))}).encode("utf-8")
+
+
+# =====================
+# SERVEUR HTTP
+# =====================
+class ServiceAgregation(ThreadingHTTPServer):
+    """Serveur HTTP multi-thread adossé à un pool de processus et à un cache LRU."""
+
+    daemon_threads = True
+
+    def __init__(self, adresse, chemin=CHEMIN_INCENDIES, workers=None, taille_cache=TAILLE_CACHE):
+        super().__init__(adresse, _Gestionnaire)
+        self.pool = ProcessPoolExecutor(max_workers=workers, initializer=_initialiser, initargs=(chemin,))
+        self.cache = OrderedDict()
+        self.taille_cache = taille_cache
+        self.verrou = threading.Lock()
+        self.en_cours = {}
+
+    def repondre(self, nom, params):
+        """Réponse JSON d'une requête : cache, calcul déjà en cours, ou nouveau calcul."""
+        cle = json.dumps([nom, params], sort_keys=True)
+        with self.verrou:
+            if cle in self.cache:
+                self.cache.move_to_end(cle)
+                return self.cache[cle]
+            # Des requêtes identiques simultanées attendent le même calcul
+            futur = self.en_cours.get(cle)
+            if futur is None:
+                futur = self.pool.submit(_calculer, nom, params)
+                self.en_cours[cle] = futur
+
+        try:
+            reponse = futur.result()
+        finally:
+            with self.verrou:
+                self.en_cours.pop(cle, None)
+
+        with self.verrou:
+            self.cache[cle] = reponse
+            while len(self.cache) > self.taille_cache:
+                self.cache.popitem(last=False)
+        return reponse
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(cancel_futures=True)
+
+
+class _Gestionnaire(BaseHTTPRequestHandler):
+    def _envoyer(self, code, corps):
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(corps)))
+        self.end_headers()
+        self.wfile.write(corps)
+
+    def _erreur(self, code, message):
+        self._envoyer(code, json.dumps({"erreur": message}).encode("utf-8"))
+
+    def do_GET(self):
+        if self.path != "/sante":
+            return self._erreur(404, f"Chemin inconnu : {self.path}")
+        self._envoyer(200, json.dumps({"statut": "ok", "requetes": sorted(REQUETES)}).encode("utf-8"))
+
+    def do_POST(self):
+        if self.path != "/requete":
+            return self._erreur(404, f"Chemin inconnu : {self.path}")
+        try:
+            longueur = int(self.headers.get("Content-Length", 0))
+            demande = json.loads(self.rfile.read(longueur))
+            nom, params = demande["nom"], demande.get("params", {})
+        except (ValueError, KeyError) as e:
+            return self._erreur(400, f"Requête invalide : {e}")
+        if nom not in REQUETES:
+            return self._erreur(404, f"Requête inconnue : {nom}")
+
+        try:
+            reponse = self.server.repondre(nom, params)
+        except Exception as e:
+            return self._erreur(500, f"{type(e).__name__}: {e}")
+        self._envoyer(200, reponse)
+
+    def log_message(self, format, *args):
+        if os.environ.get("PYROVIZ_SERVICE_LOG"):
+            super().log_message(format, *args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Service local d'agrégation PyroViz")
+    parser.add_argument("--hote", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--workers", type=int, default=None, help="processus de calcul (défaut : nombre de cœurs)")
+    parser.add_argument("--source", default=str(CHEMIN_INCENDIES))
+    args = parser.parse_args()
+
+    serveur = ServiceAgregation((args.hote, args.port), args.source, args.workers)
+    print(f"Service d'agrégation sur http://{args.hote}:{args.port}")
+    try:
+        serveur.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        serveur.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""Tendances de long terme : test de Mann-Kendall et pente de Sen.
+
+Toutes les séries annuelles (une ligne par département ou par commune) sont
+traitées d'un bloc : les différences x[j] - x[i] de toutes les paires i < j
+sont calculées en une seule matrice (séries × paires), d'où se déduisent la
+statistique S, sa variance corrigée des ex-aequo et la pente médiane de Sen.
+"""
+import math
+
+import numpy as np
+import pandas as pd
+
+SEUIL_SIGNIFICATIVITE = 0.05
+
+
+# =====================
+# MATRICES ANNUELLES
+# =====================
+def matrice_annuelle(df, cle="code_insee", annees=None):
+    """Nombre d'incendies et surface brûlée par groupe et par année.
+
+    Retourne `(codes, annees, nb, surface)` où `nb` et `surface` sont des
+    matrices (groupes × années) ; une année sans incendie vaut 0. Avec
+    `cle=None`, toute la sélection forme une seule série nommée "ensemble".
+    """
+    if annees is None:
+        annees = np.arange(df["annee"].min(), df["annee"].max() + 1)
+    annees = np.asarray(annees, dtype=np.int64)
+
+    if cle is None:
+        codes, groupes = np.array(["ensemble"]), np.zeros(len(df), dtype=np.int64)
+    else:
+        codes, groupes = np.unique(df[cle].astype(str).to_numpy(), return_inverse=True)
+    positions = df["annee"].to_numpy(dtype=np.int64) - annees[0]
+    valides = (positions >= 0) & (positions < len(annees))
+    plat = groupes[valides].astype(np.int64) * len(annees) + positions[valides]
+    taille = len(codes) * len(annees)
+
+    nb = np.bincount(plat, minlength=taille).reshape(len(codes), len(annees))
+    surfaces = df["surface_brulee"].to_numpy(dtype=np.float64)[valides]
+    surface = np.bincount(plat, weights=surfaces, minlength=taille).reshape(len(codes), len(annees))
+    return codes, annees, nb.astype(np.float64), surface
+
+
+# =====================
+# STATISTIQUES
+# =====================
+_erfc = np.frompyfunc(math.erfc, 1, 1)
+
+
+def erfc(x):
+    """Fonction d'erreur complémentaire, élément par élément (`math.erfc`).
+
+    Précise en erreur relative jusque dans les queues (p-values très faibles),
+    à la différence des approximations polynomiales ; SciPy n'est pas requis.
+    """
+    return np.asarray(_erfc(np.asarray(x, dtype=np.float64)), dtype=np.float64)
+
+
+def mann_kendall(matrice):
+    """Test de Mann-Kendall appliqué à chaque ligne de `matrice` (séries × années).
+
+    Retourne un dict de tableaux : `s`, `variance`, `z`, `p_value` (bilatérale)
+    et `tau` de Kendall.
+    """
+    x = np.asarray(matrice, dtype=np.float64)
+    n = x.shape[1]
+    i, j = np.triu_indices(n, k=1)
+    s = np.sign(x[:, j] - x[:, i]).sum(axis=1)
+
+    # Correction des ex-aequo : chaque valeur d'un groupe de taille t contribue (t-1)(2t+5)
+    multiplicite = (x[:, :, None] == x[:, None, :]).sum(axis=2)
+    correction = ((multiplicite - 1) * (2 * multiplicite + 5)).sum(axis=1)
+    variance = (n * (n - 1) * (2 * n + 5) - correction) / 18.0
+
+    ecart = np.sqrt(np.where(variance > 0, variance, np.nan))
+    z = np.where(s > 0, (s - 1) / ecart, np.where(s < 0, (s + 1) / ecart, 0.0))
+    z = np.nan_to_num(z)
+    p_value = erfc(np.abs(z) / np.sqrt(2.0))
+    return {
+        "s": s,
+        "variance": variance,
+        "z": z,
+        "p_value": p_value,
+        "tau": s / (n * (n - 1) / 2.0) if n > 1 else np.full(len(x), np.nan),
+    }
+
+
+def pente_sen(matrice):
+    """Pente de Sen (médiane des pentes entre toutes les paires d'années) par ligne.
+
+    Manquante (NaN) avec moins de deux années : aucune paire.
+    """
+    x = np.asarray(matrice, dtype=np.float64)
+    if x.shape[1] < 2:
+        return np.full(x.shape[0], np.nan)
+    i, j = np.triu_indices(x.shape[1], k=1)
+    return np.median((x[:, j] - x[:, i]) / (j - i), axis=1)
+
+
+def classer_tendance(z, p_value, alpha=SEUIL_SIGNIFICATIVITE):
+    """Libellé 'hausse', 'baisse' ou 'stable' selon le signe et la significativité."""
+    significatif = p_value < alpha
+    return np.where(significatif & (z > 0), "hausse", np.where(significatif & (z < 0), "baisse", "stable"))
+
+
+def tendances(df, cle="code_insee", annees=None, alpha=SEUIL_SIGNIFICATIVITE):
+    """Tendances du nombre d'incendies et de la surface brûlée pour chaque groupe.
+
+    Retourne un DataFrame indexé par code avec, pour `nb` et `surface` :
+    `<ind>_z`, `<ind>_p`, `<ind>_pente` (unités par an) et `<ind>_tendance`.
+    """
+    codes, annees, nb, surface = matrice_annuelle(df, cle, annees)
+    resultats = pd.DataFrame(index=pd.Index(codes, name=cle or "serie"))
+    resultats["nb_total"] = nb.sum(axis=1).astype(np.int64)
+    resultats["surface_totale"] = surface.sum(axis=1)
+
+    for prefixe, matrice in (("nb", nb), ("surface", surface)):
+        mk = mann_kendall(matrice)
+        resultats[f"{prefixe}_z"] = mk["z"]
+        resultats[f"{prefixe}_p"] = mk["p_value"]
+        resultats[f"{prefixe}_pente"] = pente_sen(matrice)
+        resultats[f"{prefixe}_tendance"] = classer_tendance(mk["z"], mk["p_value"], alpha)
+    return resultats
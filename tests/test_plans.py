@@ -0,0 +1,68 @@
+"""Équivalence des moteurs de `pyroviz.plans` (pandas, Arrow, Polars) sur plans tirés au hasard.
+
+Les surfaces sont tirées parmi quelques valeurs décimales : beaucoup de groupes
+ont des sommes égales, calculées dans un ordre différent par chaque moteur, ce
+qui exerce le classement (`tri`) et la coupe du top-N (`n`).
+"""
+import itertools
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+
+from pyroviz.index import indexer
+from pyroviz.plans import CLES, INDICATEURS, Plan
+
+MOTEURS = ["arrow", "polars"]
+NB_PLANS = 200
+
+
+def base_synthetique(lignes=20_000, graine=0):
+    rng = np.random.default_rng(graine)
+    departements = np.array(["04", "05", "06", "13", "83", "84"])
+    communes = np.array([f"{d}{i:03d}" for d in departements for i in range(1, 16)], dtype=object)
+    code_insee = communes[rng.integers(0, len(communes), lignes)]
+    code_insee[rng.random(lignes) < 0.01] = None
+    return pd.DataFrame({
+        "annee": rng.integers(1973, 2023, lignes),
+        "mois": rng.integers(1, 13, lignes),
+        "departement": pd.Series([c[:2] if c else "13" for c in code_insee], dtype="str"),
+        "code_insee": pd.Series(code_insee, dtype="str"),
+        "surface_brulee": rng.choice([0.0, 0.01, 0.1, 0.3, 0.7, 1.1, 2.2], lignes),
+    })
+
+
+def plans_aleatoires(nombre, graine=0):
+    rng = random.Random(graine)
+    regroupements = [list(c) for r in range(len(CLES) + 1) for c in itertools.combinations(CLES, r)]
+    for _ in range(nombre):
+        filtres = {}
+        if rng.random() < 0.5:
+            debut = rng.randint(1973, 2022)
+            filtres["annees"] = [debut, rng.randint(debut, 2022)]
+        if rng.random() < 0.3:
+            filtres["mois"] = rng.randint(1, 12)
+        if rng.random() < 0.3:
+            filtres["departements"] = rng.sample(["04", "05", "06", "13", "83", "84"], rng.randint(0, 3))
+        par = rng.choice(regroupements)
+        rng.shuffle(par)
+        tri = rng.choice([None, *INDICATEURS]) if par else None
+        n = rng.choice([None, 1, 5, 20]) if tri else None
+        yield Plan(par, tri, n, **filtres)
+
+
+@pytest.fixture(scope="module")
+def base():
+    return indexer(base_synthetique())
+
+
+@pytest.mark.parametrize("moteur", MOTEURS)
+def test_moteurs_equivalents(base, moteur):
+    if moteur == "polars":
+        pytest.importorskip("polars")
+    for plan in plans_aleatoires(NB_PLANS):
+        reference = plan.pandas(base).reset_index(drop=True)
+        resultat = plan.executer(base, moteur).reset_index(drop=True)
+        assert_frame_equal(reference, resultat, rtol=1e-9, obj=f"{moteur} {plan}")